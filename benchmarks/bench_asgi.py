@@ -0,0 +1,216 @@
+"""
+Benchmark das APIs públicas de JSON servidas por WSGI e por ASGI, com
+conexões simultâneas.
+Uso: python benchmarks/bench_asgi.py [--connections 50] [--seconds 10]
+Precisa de: pip install uvicorn gunicorn (só para o benchmark)
+
+Configurações, cada uma num processo com um worker:
+- wsgi:       gunicorn core.wsgi (gthread, --threads threads) nas views síncronas;
+- asgi-sync:  uvicorn core.asgi nas mesmas views síncronas (sync_to_async);
+- asgi-async: uvicorn core.asgi nas views *_async (api/async/...).
+
+Cada conexão (HTTP/1.1 keep-alive) alterna entre o cardápio de um
+restaurante, o cardápio em lote e a busca. Mede requisições por segundo e
+latência p50/p99. O gerador de carga roda na mesma máquina, então divide o
+CPU com o servidor. Os servidores usam uma cópia migrada do db.sqlite3,
+por um módulo de settings temporário que só troca o caminho do banco.
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = {
+    'sync': [
+        '/puceats/api/restaurante/{id}/menu/',
+        '/puceats/api/restaurantes/menu/?ids={ids}',
+        '/puceats/api/search/?q={q}',
+    ],
+    'async': [
+        '/puceats/api/async/restaurante/{id}/menu/',
+        '/puceats/api/async/restaurantes/menu/?ids={ids}',
+        '/puceats/api/async/search/?q={q}',
+    ],
+}
+QUERIES = ['pizza', 'cafe', 'vegano', 'lanche', 'suco']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--connections', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--threads', type=int, default=8, help='Threads do gunicorn (WSGI)')
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def prepare_database(workdir):
+    """Copia e migra o banco; retorna os ids de restaurante usados nas URLs"""
+    db = os.path.join(workdir, 'db.sqlite3')
+    shutil.copy(os.path.join(ROOT, 'db.sqlite3'), db)
+    with open(os.path.join(workdir, 'bench_settings.py'), 'w') as settings_file:
+        # A cópia pode ficar em WAL: o perfil de produção não depende de DEBUG aqui
+        settings_file.write(
+            f'from core.settings import *  # noqa: F401,F403\nDATABASES["default"]["NAME"] = {db!r}\n'
+            'PUCEATS_SQLITE_PROFILE = "production"\n'
+        )
+
+    sys.path[:0] = [ROOT, workdir]
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'bench_settings'
+    import django
+
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connections
+    from puceats.models import Restaurant
+
+    call_command('migrate', verbosity=0)
+    ids = list(Restaurant.objects.order_by('id').values_list('id', flat=True)[:20])
+    connections.close_all()
+    return ids
+
+
+def start_server(kind, port, args, workdir):
+    if kind == 'wsgi':
+        command = [
+            sys.executable, '-m', 'gunicorn', 'core.wsgi:application', '--bind', f'127.0.0.1:{port}',
+            '--workers', '1', '--worker-class', 'gthread', '--threads', str(args.threads), '--log-level', 'warning',
+        ]
+    else:
+        command = [
+            sys.executable, '-m', 'uvicorn', 'core.asgi:application', '--host', '127.0.0.1', '--port', str(port),
+            '--workers', '1', '--log-level', 'warning', '--no-access-log',
+        ]
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join([ROOT, workdir]), 'DJANGO_SETTINGS_MODULE': 'bench_settings'}
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'{kind} não subiu na porta {port}')
+
+
+async def request(reader, writer, path):
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept-Encoding: identity\r\n\r\n'.encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    chunked = False
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'transfer-encoding' and b'chunked' in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(length)
+    return status
+
+
+async def client(port, paths, stop_at, latencies, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    n = 0
+    try:
+        while time.perf_counter() < stop_at:
+            path = paths[n % len(paths)]
+            n += 1
+            start = time.perf_counter()
+            try:
+                status = await request(reader, writer, path)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                errors.append(path)
+                writer.close()
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                continue
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(path)
+    finally:
+        writer.close()
+
+
+def build_paths(mode, ids):
+    paths = []
+    for i, restaurant_id in enumerate(ids):
+        for template in PATHS[mode]:
+            paths.append(template.format(
+                id=restaurant_id,
+                ids=','.join(str(id) for id in ids[i:i + 5] or ids[:5]),
+                q=QUERIES[i % len(QUERIES)],
+            ))
+    return paths
+
+
+async def load(port, paths, args):
+    # Aquecimento: cache de cardápios e conexões com o banco
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for path in paths:
+        await request(reader, writer, path)
+    writer.close()
+
+    latencies = []
+    errors = []
+    stop_at = time.perf_counter() + args.seconds
+    await asyncio.gather(*[
+        client(port, paths[i % len(paths):] + paths[:i % len(paths)], stop_at, latencies, errors)
+        for i in range(args.connections)
+    ])
+    return latencies, errors
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float('nan')
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='puceats-bench-asgi-')
+    rows = []
+    try:
+        ids = prepare_database(workdir)
+        for label, kind, mode in (('wsgi', 'wsgi', 'sync'), ('asgi-sync', 'asgi', 'sync'), ('asgi-async', 'asgi', 'async')):
+            port = free_port()
+            server = start_server(kind, port, args, workdir)
+            try:
+                latencies, errors = asyncio.run(load(port, build_paths(mode, ids), args))
+            finally:
+                server.terminate()
+                server.wait(10)
+            rows.append((label, len(latencies) / args.seconds, percentile(latencies, 0.5), percentile(latencies, 0.99), len(errors)))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f'{args.connections} conexões, {args.seconds:.0f} s por configuração, 1 worker, {os.cpu_count()} CPU')
+    print(f'  {"servidor":<11} {"req/s":>8} {"p50 (ms)":>9} {"p99 (ms)":>9} {"erros":>6}')
+    for label, rate, p50, p99, errors in rows:
+        print(f'  {label:<11} {rate:>8.0f} {p50 * 1000:>9.1f} {p99 * 1000:>9.1f} {errors:>6}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Teste de carga do stream de eventos ao vivo (/puceats/api/live/, puceats/live.py)
+num worker do uvicorn.
+Uso: python benchmarks/bench_live.py [--connections 100,1000,5000] [--events 20]
+Precisa de: pip install uvicorn (só para o benchmark)
+
+Para cada quantidade de conexões:
+- abre todas as conexões SSE, cada uma inscrita no restaurante de teste e
+  em mais alguns, e mede a memória (RSS) e os descritores do servidor;
+- alterna --events vezes a disponibilidade de um prato pelo lote do CRUD
+  (/puceats/crud/dishes/batch/, logado como dono do restaurante) e mede o
+  tempo até cada conexão receber o evento, e até a última receber.
+
+O save tem de acontecer dentro do worker: o pub/sub é do processo. O
+gerador de carga roda na mesma máquina, então divide o CPU com o servidor.
+Usa uma cópia migrada do db.sqlite3, como o bench_asgi.py, e liga
+PUCEATS_LIVE_ENABLED no servidor.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from bench_asgi import free_port, percentile, prepare_database, start_server
+
+CSRF_TOKEN = 'b' * 32
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--connections', default='100,1000,5000', help='Quantidades de conexões, separadas por vírgula')
+    parser.add_argument('--events', type=int, default=20)
+    args = parser.parse_args()
+    args.connections = [int(n) for n in args.connections.split(',')]
+    return args
+
+
+def owner_session():
+    """Cria o dono de um restaurante com um prato; retorna (cookie de sessão, restaurante, prato)"""
+    from django.contrib.auth.models import User
+    from django.db import connections
+    from django.test import Client
+    from puceats.models import Dish, Restaurant
+
+    owner, _ = User.objects.get_or_create(username='bench-live', defaults={'email': 'bench-live@puceats.test'})
+    restaurant = Restaurant.objects.filter(dishes__isnull=False).order_by('id').first()
+    restaurant.owner = owner
+    restaurant.save()
+    dish = Dish.objects.filter(restaurant=restaurant).order_by('id').first()
+    client = Client()
+    client.force_login(owner)
+    connections.close_all()
+    return client.cookies['sessionid'].value, restaurant.id, dish.id
+
+
+def server_usage(pid):
+    with open(f'/proc/{pid}/status') as status:
+        rss = next(int(line.split()[1]) for line in status if line.startswith('VmRSS:'))
+    return rss, len(os.listdir(f'/proc/{pid}/fd'))
+
+
+async def subscribe(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n'.encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    if b' 200 ' not in head.split(b'\r\n', 1)[0]:
+        raise RuntimeError(head.split(b'\r\n', 1)[0].decode())
+    await reader.readuntil(b'retry: 3000\n\n')
+    return reader, writer
+
+
+async def listen(reader, arrivals):
+    """Anota a hora de chegada de cada evento de prato desta conexão"""
+    buffer = b''
+    while True:
+        chunk = await reader.read(65536)
+        if not chunk:
+            return
+        buffer += chunk
+        while b'"field":"available"' in buffer:
+            _, _, buffer = buffer.partition(b'"field":"available"')
+            arrivals.append(time.perf_counter())
+
+
+async def toggle(port, session, dish_id):
+    body = json.dumps({'operations': [{'op': 'toggle', 'id': dish_id}]}).encode()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(
+        f'POST /puceats/crud/dishes/batch/ HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n'
+        f'Cookie: sessionid={session}; csrftoken={CSRF_TOKEN}\r\nX-CSRFToken: {CSRF_TOKEN}\r\n'
+        f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    if b' 200 ' not in response.split(b'\r\n', 1)[0]:
+        raise RuntimeError(response[:200].decode(errors='replace'))
+
+
+async def run(port, pid, count, restaurant_ids, session, dish_id, args):
+    idle_rss, idle_fds = server_usage(pid)
+    others = [id for id in restaurant_ids if id != restaurant_ids[0]] or restaurant_ids
+    start = time.perf_counter()
+    streams = []
+    # Em grupos, para não estourar o backlog de conexões do servidor
+    for offset in range(0, count, 200):
+        streams += await asyncio.gather(*[
+            subscribe(port, '/puceats/api/live/?restaurants=' + ','.join(
+                str(id) for id in [restaurant_ids[0], *others[i % len(others):i % len(others) + 4]]
+            ))
+            for i in range(offset, min(count, offset + 200))
+        ])
+    connect_time = time.perf_counter() - start
+    rss, fds = server_usage(pid)
+
+    arrivals = [[] for _ in streams]
+    listeners = [asyncio.create_task(listen(reader, arrival)) for (reader, _), arrival in zip(streams, arrivals)]
+    latencies = []
+    fanouts = []
+    for n in range(args.events):
+        sent = time.perf_counter()
+        await toggle(port, session, dish_id)
+        deadline = sent + 30
+        while any(len(arrival) <= n for arrival in arrivals) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.005)
+        received = [arrival[n] - sent for arrival in arrivals if len(arrival) > n]
+        latencies += received
+        fanouts.append(max(received) if len(received) == len(arrivals) else float('inf'))
+
+    for task in listeners:
+        task.cancel()
+    for _, writer in streams:
+        writer.close()
+    await asyncio.sleep(1)
+    return {
+        'connections': count,
+        'connect': connect_time,
+        'rss_per_conn': (rss - idle_rss) / count,
+        'rss': rss,
+        'fds': fds - idle_fds,
+        'p50': percentile(latencies, 0.5),
+        'p99': percentile(latencies, 0.99),
+        'fanout': percentile(fanouts, 0.5),
+        'lost': args.events * count - len(latencies),
+    }
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='puceats-bench-live-')
+    # Herdado pelo uvicorn; o stream vem desligado por padrão
+    os.environ['PUCEATS_LIVE_ENABLED'] = 'True'
+    rows = []
+    try:
+        restaurant_ids = prepare_database(workdir)
+        session, restaurant_id, dish_id = owner_session()
+        restaurant_ids = [restaurant_id] + [id for id in restaurant_ids if id != restaurant_id]
+        for count in args.connections:
+            port = free_port()
+            server = start_server('asgi', port, args, workdir)
+            try:
+                rows.append(asyncio.run(run(port, server.pid, count, restaurant_ids, session, dish_id, args)))
+            finally:
+                server.terminate()
+                server.wait(10)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f'uvicorn, 1 worker, {os.cpu_count()} CPU; {args.events} eventos por rodada')
+    print(f'  {"conexões":>8} {"abrir (s)":>9} {"RSS (MB)":>9} {"KB/conexão":>10} {"fds":>6} '
+          f'{"p50 (ms)":>9} {"p99 (ms)":>9} {"última (ms)":>11} {"perdidos":>8}')
+    for row in rows:
+        print(f'  {row["connections"]:>8} {row["connect"]:>9.2f} {row["rss"] / 1024:>9.1f} {row["rss_per_conn"]:>10.1f} '
+              f'{row["fds"]:>6} {row["p50"] * 1000:>9.1f} {row["p99"] * 1000:>9.1f} {row["fanout"] * 1000:>11.1f} '
+              f'{row["lost"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
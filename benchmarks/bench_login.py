@@ -0,0 +1,122 @@
+"""
+Benchmark de logins por segundo num núcleo, com o hasher PBKDF2 padrão.
+Uso: python benchmarks/bench_login.py [--logins 10]
+
+- antes: a view antiga (authenticate pelo username com o ModelBackend e,
+  se falhar, User.objects.get(email=...) e outro authenticate);
+- depois: um authenticate com o EmailOrUsernameBackend (puceats/backends.py).
+
+Cenários: login pelo username, pelo email e tentativa com senha errada
+pelo email. Também conta quantos hashes PBKDF2 cada login custou. Roda numa
+cópia temporária do db.sqlite3.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import authenticate  # noqa: E402
+from django.contrib.auth import hashers  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+MODEL_BACKEND = ['django.contrib.auth.backends.ModelBackend']
+USERNAME = 'bench-login'
+EMAIL = 'bench-login@puceats.test'
+PASSWORD = 'senha-forte-123'
+
+hash_calls = 0
+_pbkdf2 = hashers.pbkdf2
+
+
+def counting_pbkdf2(*args, **kwargs):
+    global hash_calls
+    hash_calls += 1
+    return _pbkdf2(*args, **kwargs)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=10)
+    return parser.parse_args()
+
+
+def old_login(identifier, password):
+    with override_settings(AUTHENTICATION_BACKENDS=MODEL_BACKEND):
+        user = authenticate(None, username=identifier, password=password)
+        if not user:
+            try:
+                user_obj = User.objects.get(email=identifier)
+                user = authenticate(None, username=user_obj.username, password=password)
+            except User.DoesNotExist:
+                pass
+        return user
+
+
+def new_login(identifier, password):
+    return authenticate(None, username=identifier, password=password)
+
+
+def measure(login, identifier, password, expected, count):
+    global hash_calls
+    login(identifier, password)  # aquecimento
+    hash_calls = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        assert (login(identifier, password) is not None) == expected
+    elapsed = time.perf_counter() - start
+    return count / elapsed, hash_calls / count
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='puceats-bench-login-')
+    rows = []
+    try:
+        db = os.path.join(workdir, 'db.sqlite3')
+        shutil.copy(settings.DATABASES['default']['NAME'], db)
+        connections.close_all()
+        settings.DATABASES['default']['NAME'] = db
+        connections['default'].settings_dict['NAME'] = db
+        call_command('migrate', verbosity=0)
+        User.objects.filter(username=USERNAME).delete()
+        User.objects.create_user(USERNAME, EMAIL, PASSWORD)
+
+        hashers.pbkdf2 = counting_pbkdf2
+        for label, identifier, password, expected in (
+            ('username', USERNAME, PASSWORD, True),
+            ('email', EMAIL, PASSWORD, True),
+            ('email, senha errada', EMAIL, 'errada', False),
+        ):
+            before = measure(old_login, identifier, password, expected, args.logins)
+            after = measure(new_login, identifier, password, expected, args.logins)
+            rows.append((label, before, after))
+    finally:
+        hashers.pbkdf2 = _pbkdf2
+        connections.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f'{args.logins} logins por cenário, um núcleo, PBKDF2 padrão')
+    print(f'  {"cenário":<22} {"antes":>18} {"depois":>18}')
+    for label, (before_rate, before_hashes), (after_rate, after_hashes) in rows:
+        print(
+            f'  {label:<22} {before_rate:6.2f}/s ({before_hashes:.0f} hash) '
+            f'{after_rate:6.2f}/s ({after_hashes:.0f} hash)'
+        )
+
+
+if __name__ == '__main__':
+    main()
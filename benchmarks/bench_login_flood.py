@@ -0,0 +1,169 @@
+"""
+Teste de carga de um ataque ao /puceats/login/ com e sem o limite de
+tentativas (puceats/throttle.py), com o hasher PBKDF2 padrão.
+Uso: python benchmarks/bench_login_flood.py [--threads 8] [--rate 20] [--seconds 20]
+
+Os atacantes mandam --rate tentativas por segundo no total (ritmo fixo,
+como um ataque de fora, que não espera a resposta para mandar a próxima).
+Cenários, cada um por --seconds segundos:
+- um IP testando senhas numa conta;
+- um IP testando uma senha em contas diferentes (credential stuffing);
+- 50 IPs testando senhas numa conta.
+
+Mede tentativas atendidas, recusadas (429), hashes PBKDF2 feitos e o CPU
+gasto pelo processo. No fim, confere que outra conta ainda entra de outro
+IP durante o ataque (a conta atacada fica bloqueada até a janela passar).
+Roda numa cópia temporária do db.sqlite3.
+"""
+
+import argparse
+import itertools
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import hashers  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from puceats import throttle  # noqa: E402
+
+VICTIM = 'vitima@puceats.test'
+OTHER = 'outro@puceats.test'
+PASSWORD = 'senha-forte-123'
+
+hash_calls = 0
+hash_lock = threading.Lock()
+_pbkdf2 = hashers.pbkdf2
+
+
+def counting_pbkdf2(*args, **kwargs):
+    global hash_calls
+    with hash_lock:
+        hash_calls += 1
+    return _pbkdf2(*args, **kwargs)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=20)
+    parser.add_argument('--seconds', type=float, default=20)
+    return parser.parse_args()
+
+
+def attacker(worker, scenario, interval, start_at, stop, stats, lock):
+    attempts = itertools.count()
+    served = throttled = 0
+    next_at = start_at
+    try:
+        while not stop.wait(max(0, next_at - time.perf_counter())):
+            next_at += interval
+            n = next(attempts)
+            ip = '203.0.113.7'
+            identifier = VICTIM
+            password = f'chute-{worker}-{n}'
+            if scenario == 'stuffing':
+                identifier = f'aluno{worker}-{n}@puceats.test'
+                password = 'senha123'
+            elif scenario == 'distributed':
+                ip = f'198.51.100.{(worker * 7 + n) % 50}'
+            response = Client(REMOTE_ADDR=ip).post('/puceats/login/', {'email': identifier, 'senha': password})
+            if response.status_code == 429:
+                throttled += 1
+            else:
+                served += 1
+    finally:
+        connections.close_all()
+        with lock:
+            stats['served'] += served
+            stats['throttled'] += throttled
+
+
+def run(scenario, args):
+    global hash_calls
+    cache.clear()
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {'served': 0, 'throttled': 0}
+    interval = args.threads / args.rate
+    start = time.perf_counter()
+    threads = [
+        # Escalonados para as tentativas saírem espalhadas, não em rajadas
+        threading.Thread(target=attacker, args=(worker, scenario, interval, start + worker * interval / args.threads, stop, stats, lock))
+        for worker in range(args.threads)
+    ]
+    hash_calls = 0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+    return stats['served'], stats['throttled'], hash_calls, cpu
+
+
+def main():
+    args = parse_args()
+    setup_test_environment()
+    workdir = tempfile.mkdtemp(prefix='puceats-bench-flood-')
+    limits = (throttle.IP_LIMIT, throttle.IDENTIFIER_LIMIT)
+    rows = []
+    try:
+        db = os.path.join(workdir, 'db.sqlite3')
+        shutil.copy(settings.DATABASES['default']['NAME'], db)
+        connections.close_all()
+        settings.DATABASES['default']['NAME'] = db
+        connections['default'].settings_dict['NAME'] = db
+        call_command('migrate', verbosity=0)
+        User.objects.filter(username__in=[VICTIM, OTHER]).delete()
+        User.objects.create_user(VICTIM, VICTIM, PASSWORD)
+        User.objects.create_user(OTHER, OTHER, PASSWORD)
+
+        hashers.pbkdf2 = counting_pbkdf2
+        for scenario in ('single-ip', 'stuffing', 'distributed'):
+            for throttled in (False, True):
+                if throttled:
+                    throttle.IP_LIMIT, throttle.IDENTIFIER_LIMIT = limits
+                else:
+                    throttle.IP_LIMIT = throttle.IDENTIFIER_LIMIT = 10 ** 9
+                rows.append((scenario, throttled, *run(scenario, args)))
+
+        # Logins legítimos de outro IP logo depois do último ataque (limite ligado)
+        other = Client(REMOTE_ADDR='192.0.2.10').post('/puceats/login/', {'email': OTHER, 'senha': PASSWORD})
+        victim = Client(REMOTE_ADDR='192.0.2.11').post('/puceats/login/', {'email': VICTIM, 'senha': PASSWORD})
+    finally:
+        hashers.pbkdf2 = _pbkdf2
+        connections.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f'{args.threads} atacantes, {args.rate:.0f} tentativas/s, {args.seconds:.0f} s por cenário; limites: '
+          f'{limits[0]}/IP e {limits[1]}/conta a cada {throttle.WINDOW} s')
+    print(f'  {"cenário":<12} {"limite":<7} {"atendidas":>9} {"429":>7} {"hashes":>7} {"CPU (s)":>8}')
+    for scenario, throttled, served, refused, hashes, cpu in rows:
+        print(f'  {scenario:<12} {"sim" if throttled else "não":<7} {served:>9} {refused:>7} {hashes:>7} {cpu:>8.1f}')
+    print(f'  outra conta, de outro IP, durante o ataque: {other.status_code} (302 = entrou)')
+    print(f'  conta atacada, de outro IP:                 {victim.status_code} (429 = bloqueada até a janela passar)')
+
+
+if __name__ == '__main__':
+    main()
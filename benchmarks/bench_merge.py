@@ -0,0 +1,166 @@
+"""
+Benchmark do merge_databases com várias origens: 1 processo vs N processos.
+Uso: python benchmarks/bench_merge.py [--sources 8] [--restaurants 300] [--dishes 40] [--workers 4]
+
+Gera bancos de origem sintéticos (com parte dos restaurantes repetida entre
+eles) e mede, para cada quantidade de processos, só a leitura/normalização
+das origens (a parte paralela) e o comando inteiro numa cópia temporária do
+db.sqlite3, conferindo que o resultado é o mesmo.
+"""
+
+import argparse
+import io
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+
+from puceats.management.commands.merge_databases import read_source  # noqa: E402
+
+
+TABLES = ['auth_user', 'puceats_token', 'puceats_restaurant', 'puceats_category', 'puceats_dish', 'puceats_marker']
+
+
+def use_database(path):
+    connections.close_all()
+    settings.DATABASES['default']['NAME'] = path
+    connections['default'].settings_dict['NAME'] = path
+
+
+def make_source(path, template, index, args, rng):
+    shutil.copy(template, path)
+    conn = sqlite3.connect(path)
+    for table in reversed(TABLES):
+        conn.execute(f'DELETE FROM {table}')
+
+    conn.executemany(
+        """INSERT INTO auth_user (id, username, first_name, last_name, email, password,
+           is_superuser, is_staff, is_active, date_joined)
+           VALUES (?, ?, '', '', '', '!', 0, 0, 1, '2024-01-01')""",
+        [(i, f'dono{index}_{i}') for i in range(1, args.restaurants + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO puceats_token (code, is_used, created_at, expires_at) VALUES (?, 0, '2024-01-01', '2030-01-01')",
+        [(f'T{index:03d}{i:06d}',) for i in range(args.restaurants)]
+    )
+    conn.executemany(
+        "INSERT INTO puceats_category (id, name, icon) VALUES (?, ?, '')",
+        [(i, f'Categoria {i}') for i in range(1, 21)]
+    )
+    restaurants = []
+    for i in range(1, args.restaurants + 1):
+        # Um terço dos nomes se repete em todas as origens
+        name = f'Restaurante {i}' if i % 3 == 0 else f'Restaurante {index}-{i}'
+        restaurants.append((
+            i, name, f'restaurante-{index}-{i}', '', '', 'brasileira', 'restaurante',
+            rng.uniform(-22.985, -22.975), rng.uniform(-43.236, -43.228),
+            'Leme', '', '', '', '', 2, '2024-01-01', i,
+        ))
+    conn.executemany(
+        """INSERT INTO puceats_restaurant (id, name, slug, logo, description, cuisine_type,
+           establishment_type, latitude, longitude, building, opening_hours, phone,
+           instagram, website, price_level, created_at, owner_id)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        restaurants
+    )
+    conn.executemany(
+        """INSERT INTO puceats_dish (name, slug, description, price, image, is_vegan,
+           is_vegetarian, is_gluten_free, restaurant_id, category_id, available, created_at)
+           VALUES (?, '', '', ?, '', 0, 0, 0, ?, ?, 1, '2024-01-01')""",
+        [
+            (f'Prato {j}', round(rng.uniform(5, 60), 2), i, rng.randint(1, 20))
+            for i in range(1, args.restaurants + 1) for j in range(args.dishes)
+        ]
+    )
+    conn.executemany(
+        """INSERT INTO puceats_marker (restaurant_id, name, marker_type, latitude, longitude,
+           description, icon_color, is_active, created_at)
+           VALUES (?, ?, 'restaurant', ?, ?, '', '#9CCC65', 1, '2024-01-01')""",
+        [(r[0], r[1], r[7], r[8]) for r in restaurants[::2]]
+    )
+    conn.commit()
+    conn.close()
+
+
+def snapshot(path):
+    conn = sqlite3.connect(path)
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in TABLES}
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sources', type=int, default=8)
+    parser.add_argument('--restaurants', type=int, default=300)
+    parser.add_argument('--dishes', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='puceats-bench-merge-')
+    try:
+        template = os.path.join(workdir, 'template.sqlite3')
+        shutil.copy(settings.DATABASES['default']['NAME'], template)
+        use_database(template)
+        call_command('migrate', verbosity=0)
+        connections.close_all()
+
+        rng = random.Random(args.seed)
+        sources = []
+        for index in range(args.sources):
+            path = os.path.join(workdir, f'origem{index}.sqlite3')
+            make_source(path, template, index, args, rng)
+            sources.append(path)
+        rows = sum(sum(snapshot(path).values()) for path in sources)
+        print(f'{args.sources} origens, {rows} linhas no total')
+
+        results = {}
+        for workers in sorted({1, args.workers}):
+            started = time.perf_counter()
+            if workers == 1:
+                list(map(read_source, sources, repeat(False), repeat(workdir)))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(read_source, sources, repeat(False), repeat(workdir)))
+            read_elapsed = time.perf_counter() - started
+
+            target = os.path.join(workdir, f'destino{workers}.sqlite3')
+            shutil.copy(template, target)
+            use_database(target)
+            started = time.perf_counter()
+            call_command('merge_databases', *sources, '--workers', str(workers), stdout=io.StringIO())
+            elapsed = time.perf_counter() - started
+            connections.close_all()
+            results[workers] = snapshot(target)
+            print(
+                f'  {workers} processo(s): leitura {read_elapsed:.2f}s, '
+                f'merge completo {elapsed:.2f}s ({rows / elapsed:,.0f} linhas/s)'
+            )
+
+        if len({tuple(counts.items()) for counts in results.values()}) != 1:
+            print('ATENÇÃO: resultados diferentes entre as execuções')
+    finally:
+        connections.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
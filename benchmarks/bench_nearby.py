@@ -0,0 +1,76 @@
+"""
+Benchmark da busca k-NN (puceats/nearby.py) com pontos sintéticos.
+Uso: python benchmarks/bench_nearby.py [--points 100000] [--queries 5000] [--k 10]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from puceats import nearby  # noqa: E402
+
+
+# Retângulo em volta do campus da Gávea (e um pouco do Rio)
+LAT_RANGE = (-23.05, -22.90)
+LNG_RANGE = (-43.35, -43.15)
+
+
+def random_point(rng):
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--radius', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    entries = []
+    for i in range(args.points):
+        lat, lng = random_point(rng)
+        entries.append({'id': i, 'lat': lat, 'lng': lng})
+
+    start = time.perf_counter()
+    index = nearby.NearbyIndex(entries)
+    build = time.perf_counter() - start
+
+    queries = [random_point(rng) for _ in range(args.queries)]
+    timings = []
+    for lat, lng in queries:
+        start = time.perf_counter()
+        index.nearest(lat, lng, args.k, args.radius)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    # Confere algumas respostas contra a força bruta
+    for lat, lng in queries[:20]:
+        got = [e['id'] for e in index.nearest(lat, lng, args.k, args.radius)]
+        brute = sorted((nearby.haversine(lat, lng, e['lat'], e['lng']), e['id']) for e in entries)
+        expected = [i for d, i in brute if args.radius is None or d <= args.radius][:args.k]
+        assert got == expected, 'resultado diferente da força bruta'
+
+    def ms(seconds):
+        return f'{seconds * 1000:.3f} ms'
+
+    print(f'Pontos: {args.points}  Consultas: {args.queries}  k={args.k}  radius={args.radius}')
+    print(f'Montagem do índice: {build:.2f} s')
+    print(f'Média: {ms(sum(timings) / len(timings))}')
+    print(f'p50:   {ms(timings[len(timings) // 2])}')
+    print(f'p99:   {ms(timings[int(len(timings) * 0.99)])}')
+
+
+if __name__ == '__main__':
+    main()
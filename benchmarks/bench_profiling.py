@@ -0,0 +1,95 @@
+"""
+Benchmark do custo do ProfilingMiddleware (puceats/profiling.py) por
+requisição.
+Uso: python benchmarks/bench_profiling.py [--requests 500]
+
+Compara, nas APIs de listagem e numa cópia temporária do db.sqlite3:
+- sem o middleware;
+- com o middleware e sem amostragem (só o header Server-Timing);
+- com o middleware e amostragem de 100% (cProfile + arquivo .prof).
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from puceats import profiling  # noqa: E402
+
+PROFILING_MIDDLEWARE = 'puceats.profiling.ProfilingMiddleware'
+URLS = ['/puceats/api/restaurants/', '/puceats/api/dishes/']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    return parser.parse_args()
+
+
+def run(client, requests):
+    for url in URLS:
+        client.get(url)  # aquecimento
+    start = time.perf_counter()
+    for i in range(requests):
+        client.get(URLS[i % len(URLS)])
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    args = parse_args()
+    setup_test_environment()
+    workdir = tempfile.mkdtemp(prefix='puceats-bench-profiling-')
+    middleware = [m for m in settings.MIDDLEWARE if m != PROFILING_MIDDLEWARE]
+    try:
+        db = os.path.join(workdir, 'db.sqlite3')
+        shutil.copy(settings.DATABASES['default']['NAME'], db)
+        connections.close_all()
+        settings.DATABASES['default']['NAME'] = db
+        connections['default'].settings_dict['NAME'] = db
+        call_command('migrate', verbosity=0)
+        profiling.PROFILE_DIR = os.path.join(workdir, 'profiles')
+        profiling.ENABLED = True
+
+        results = []
+        for label, enabled, sample_rate in (
+            ('sem middleware', False, 0.0),
+            ('middleware, sem amostragem', True, 0.0),
+            ('middleware, amostragem 100%', True, 1.0),
+        ):
+            settings.MIDDLEWARE = middleware + [PROFILING_MIDDLEWARE] if enabled else middleware
+            profiling.SAMPLE_RATE = sample_rate
+            results.append((label, run(Client(), args.requests)))
+
+        client = Client()
+        client.get(URLS[0])
+        header = client.get(URLS[0])['Server-Timing']
+        dumps = sum(len(files) for _, _, files in os.walk(profiling.PROFILE_DIR))
+    finally:
+        connections.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    base = results[0][1]
+    print(f'{args.requests} requisições em {", ".join(URLS)}')
+    for label, seconds in results:
+        print(f'  {label:<28} {seconds * 1e6:8.0f} µs/req  ({(seconds - base) * 1e6:+6.0f} µs)')
+    print(f'  Server-Timing: {header}')
+    print(f'  arquivos .prof gravados: {dumps}')
+
+
+if __name__ == '__main__':
+    main()
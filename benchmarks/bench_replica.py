@@ -0,0 +1,148 @@
+"""
+Benchmark de carga mista (páginas públicas + edição de pratos) com e sem o
+roteador de réplica (puceats/replica.py).
+Uso: python benchmarks/bench_replica.py [--readers 4] [--seconds 5] [--refresh-writes 50]
+
+Leitores pedem /puceats/restaurantes/ e o cardápio em lote; um escritor
+edita pratos pelo endpoint do CRUD. Tudo roda em cópias temporárias do
+db.sqlite3.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ['PUCEATS_REPLICA_ENABLED'] = 'True'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--refresh-writes', type=int, default=50)
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ['PUCEATS_REPLICA_REFRESH_WRITES'] = str(args.refresh_writes)
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections, router  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from puceats.models import Dish, Restaurant  # noqa: E402
+from puceats.replica import ReplicaRouter  # noqa: E402
+
+REPLICA_MIDDLEWARE = 'puceats.replica.ReplicaMiddleware'
+SOURCE_DB = settings.DATABASES['default']['NAME']
+
+
+def use_databases(primary, replica):
+    connections.close_all()
+    for alias, path in (('default', primary), ('replica', replica)):
+        settings.DATABASES[alias]['NAME'] = path
+        connections[alias].settings_dict['NAME'] = path
+
+
+def configure(with_router):
+    cache.clear()
+    router.routers = [ReplicaRouter()] if with_router else []
+    middleware = [m for m in settings.MIDDLEWARE if m != REPLICA_MIDDLEWARE]
+    settings.MIDDLEWARE = middleware + [REPLICA_MIDDLEWARE] if with_router else middleware
+
+
+def reader(stop, stats, lock, ids):
+    client = Client()
+    reads = errors = 0
+    try:
+        while not stop.is_set():
+            for url in ('/puceats/restaurantes/', f'/puceats/api/restaurantes/menu/?ids={ids}'):
+                if client.get(url).status_code == 200:
+                    reads += 1
+                else:
+                    errors += 1
+    finally:
+        connections.close_all()
+        with lock:
+            stats['reads'] += reads
+            stats['read_errors'] += errors
+
+
+def writer(stop, stats, dishes):
+    client = Client()
+    try:
+        while not stop.is_set():
+            for dish in dishes:
+                response = client.post(f'/puceats/crud/dish/{dish["id"]}/edit/', {
+                    'name': dish['name'],
+                    'price': str(dish['price']),
+                    'restaurant': dish['restaurant_id'],
+                })
+                stats['writes' if response.status_code == 200 else 'write_errors'] += 1
+                if stop.is_set():
+                    break
+    finally:
+        connections.close_all()
+
+
+def run(label, with_router, workdir):
+    primary = os.path.join(workdir, f'{label}.sqlite3')
+    replica = os.path.join(workdir, f'{label}.replica.sqlite3')
+    shutil.copy(SOURCE_DB, primary)
+    use_databases(primary, replica)
+    call_command('migrate', verbosity=0)
+    configure(with_router)
+    if with_router:
+        from puceats import replica as replica_module
+        replica_module.refresh()
+
+    ids = ','.join(str(id) for id in Restaurant.objects.values_list('id', flat=True)[:10])
+    dishes = list(Dish.objects.values('id', 'name', 'price', 'restaurant_id')[:20])
+    connections.close_all()
+
+    stats = {'reads': 0, 'read_errors': 0, 'writes': 0, 'write_errors': 0}
+    stop = threading.Event()
+    lock = threading.Lock()
+    threads = [threading.Thread(target=writer, args=(stop, stats, dishes))]
+    threads += [threading.Thread(target=reader, args=(stop, stats, lock, ids)) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    connections.close_all()
+
+    print(
+        f'{label:>12}: {stats["reads"] / args.seconds:7,.0f} leituras/s '
+        f'({stats["read_errors"]} erros), {stats["writes"] / args.seconds:6,.0f} escritas/s '
+        f'({stats["write_errors"]} erros)'
+    )
+
+
+def main():
+    setup_test_environment()
+    workdir = tempfile.mkdtemp(prefix='puceats-bench-replica-')
+    try:
+        run('sem réplica', False, workdir)
+        run('com réplica', True, workdir)
+    finally:
+        connections.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark de concorrência no SQLite: leituras por segundo com um escritor
+rodando ao mesmo tempo, para cada perfil de puceats/sqlite.py.
+Uso: python benchmarks/bench_sqlite.py [--readers 4] [--seconds 5] [--profiles default production]
+
+Cada perfil roda numa cópia temporária do db.sqlite3 (voltada para o
+journal padrão antes de começar, já que o WAL fica gravado no arquivo).
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import OperationalError, connections, transaction  # noqa: E402
+from django.db.models import F  # noqa: E402
+
+from puceats.models import Dish, Restaurant  # noqa: E402
+
+
+def use_database(path, profile):
+    connections.close_all()
+    settings.PUCEATS_SQLITE_PROFILE = profile
+    settings.DATABASES['default']['NAME'] = path
+    connections['default'].settings_dict['NAME'] = path
+
+
+def writer(stop, stats, batch):
+    dish_ids = list(Dish.objects.values_list('id', flat=True)[:batch])
+    try:
+        while not stop.is_set():
+            try:
+                # Uma transação por "salvar cardápio", como no dish_add/crud
+                with transaction.atomic():
+                    for dish_id in dish_ids:
+                        Dish.objects.filter(id=dish_id).update(price=F('price') + 0)
+                stats['writes'] += 1
+            except OperationalError:
+                stats['write_errors'] += 1
+    finally:
+        connections.close_all()
+
+
+def reader(stop, stats, lock):
+    reads = errors = 0
+    try:
+        while not stop.is_set():
+            try:
+                list(Restaurant.objects.values('id', 'name', 'building')[:50])
+                list(Dish.objects.filter(available=True).values('id', 'name', 'price')[:100])
+                reads += 1
+            except OperationalError:
+                errors += 1
+    finally:
+        connections.close_all()
+        with lock:
+            stats['reads'] += reads
+            stats['read_errors'] += errors
+
+
+def run(profile, args, workdir):
+    path = os.path.join(workdir, f'{profile}.sqlite3')
+    shutil.copy(settings.DATABASES['default']['NAME'], path)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = DELETE')
+    conn.close()
+    use_database(path, profile)
+
+    stats = {'reads': 0, 'read_errors': 0, 'writes': 0, 'write_errors': 0}
+    stop = threading.Event()
+    lock = threading.Lock()
+    threads = [threading.Thread(target=writer, args=(stop, stats, args.batch))]
+    threads += [threading.Thread(target=reader, args=(stop, stats, lock)) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    connections.close_all()
+
+    print(
+        f'{profile:>12}: {stats["reads"] / args.seconds:8,.0f} leituras/s '
+        f'({stats["read_errors"]} erros), {stats["writes"] / args.seconds:6,.0f} escritas/s '
+        f'({stats["write_errors"]} erros)'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--batch', type=int, default=20, help='Pratos alterados por transação do escritor')
+    parser.add_argument('--profiles', nargs='+', default=['default', 'production'])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='puceats-bench-sqlite-')
+    try:
+        for profile in args.profiles:
+            run(profile, args, workdir)
+    finally:
+        connections.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
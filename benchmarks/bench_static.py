@@ -0,0 +1,99 @@
+"""
+Benchmark dos bytes transferidos num carregamento de /puceats/ sem cache
+no navegador, e das requisições de revalidação na visita seguinte.
+Uso: python benchmarks/bench_static.py
+
+- antes: arquivos originais servidos como no runserver (sem hash, sem
+  compressão, revalidados a cada página);
+- depois: collectstatic com puceats.staticfiles.CompressedManifestStorage
+  num diretório temporário, servido pelo StaticFilesMiddleware.
+
+Só entram os arquivos de /static/; CDNs externos ficam de fora.
+"""
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.staticfiles.views import serve  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.http import HttpResponseNotFound  # noqa: E402
+from django.test import Client, RequestFactory, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from puceats.staticfiles import StaticFilesMiddleware  # noqa: E402
+
+ACCEPT_ENCODING = 'gzip, deflate, br'
+PLAIN_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def index_assets():
+    cache.clear()
+    html = Client().get('/puceats/').content
+    prefix = '/' + settings.STATIC_URL.lstrip('/')
+    urls = re.findall(rb'(?:href|src)="(' + re.escape(prefix.encode()) + rb'[^"]+)"', html)
+    return len(html), list(dict.fromkeys(url.decode() for url in urls))
+
+
+def body_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def load(label, fetch, urls, html_size):
+    factory = RequestFactory()
+    total = html_size
+    revalidate = 0
+    for url in urls:
+        response = fetch(factory.get(url, HTTP_ACCEPT_ENCODING=ACCEPT_ENCODING))
+        size = body_size(response)
+        total += size
+        if 'immutable' not in response.get('Cache-Control', ''):
+            revalidate += 1
+        encoding = response.get('Content-Encoding', '-')
+        print(f'    {response.status_code} {encoding:>5} {size:>8,} B  {url}')
+    print(f'  {label}: {total:,} B no primeiro acesso (HTML {html_size:,} B), '
+          f'{revalidate} revalidações na visita seguinte\n')
+    return total
+
+
+def main():
+    setup_test_environment()
+    prefix = '/' + settings.STATIC_URL.lstrip('/')
+
+    print('antes')
+    with override_settings(STORAGES=PLAIN_STORAGES):
+        html_size, urls = index_assets()
+        before = load('antes', lambda request: serve(request, request.path[len(prefix):], insecure=True), urls, html_size)
+
+    static_root = tempfile.mkdtemp(prefix='puceats-bench-static-')
+    try:
+        with override_settings(STATIC_ROOT=static_root, DEBUG=False):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            print('depois')
+            html_size, urls = index_assets()
+            middleware = StaticFilesMiddleware(lambda request: HttpResponseNotFound())
+            after = load('depois', middleware, urls, html_size)
+    finally:
+        shutil.rmtree(static_root, ignore_errors=True)
+
+    print(f'Redução: {before - after:,} B ({(before - after) / before:.0%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Teste de estresse do resgate de tokens no /puceats/cadastro/ com cadastros
+simultâneos (puceats/tokens.py).
+Uso: python benchmarks/bench_token_redeem.py [--threads 8] [--tokens 20]
+
+Para cada token, todas as threads tentam se cadastrar com ele ao mesmo
+tempo (cada uma com o seu email). No fim confere que cada token foi
+resgatado por exatamente um usuário e que as tentativas recusadas não
+deixaram usuário nem restaurante no banco. Roda numa cópia temporária do
+db.sqlite3, com hasher MD5 para o hash de senha não dominar o tempo.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from puceats import throttle, tokens  # noqa: E402
+from puceats.models import Restaurant, Token  # noqa: E402
+
+EMAIL_DOMAIN = 'stress.puceats.test'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--tokens', type=int, default=20)
+    return parser.parse_args()
+
+
+def signup(worker, codes, barrier, outcomes, lock):
+    client = Client()
+    try:
+        for code in codes:
+            email = f'w{worker}-{code[:8].lower()}@{EMAIL_DOMAIN}'
+            barrier.wait()
+            response = client.post('/puceats/cadastro/', {
+                'token': code,
+                'nome': f'Teste {worker}',
+                'email': email,
+                'senha': 'senha-forte-123',
+                'confirmar': 'senha-forte-123',
+                'nome_restaurante': f'Estresse {worker} {code[:8]}',
+            })
+            # Sucesso redireciona para o CRUD; recusa renderiza o formulário de novo
+            with lock:
+                outcomes.append((code, email, response.status_code == 302))
+    finally:
+        connections.close_all()
+
+
+def main():
+    args = parse_args()
+    setup_test_environment()
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    # Todas as tentativas saem do mesmo IP: sem o limite de tentativas do cadastro
+    throttle.IP_LIMIT = throttle.IDENTIFIER_LIMIT = 10 ** 9
+    workdir = tempfile.mkdtemp(prefix='puceats-bench-tokens-')
+    try:
+        db = os.path.join(workdir, 'db.sqlite3')
+        shutil.copy(settings.DATABASES['default']['NAME'], db)
+        connections.close_all()
+        settings.DATABASES['default']['NAME'] = db
+        connections['default'].settings_dict['NAME'] = db
+        call_command('migrate', verbosity=0)
+
+        codes = tokens.issue(args.tokens)
+        connections.close_all()
+
+        outcomes = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(args.threads)
+        threads = [
+            threading.Thread(target=signup, args=(worker, codes, barrier, outcomes, lock))
+            for worker in range(args.threads)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        winners = {}
+        for code, email, success in outcomes:
+            if success:
+                winners.setdefault(code, []).append(email)
+        double = {code: emails for code, emails in winners.items() if len(emails) > 1}
+
+        users = set(User.objects.filter(email__endswith=EMAIL_DOMAIN).values_list('email', flat=True))
+        owners = set(Restaurant.objects.filter(owner__email__endswith=EMAIL_DOMAIN).values_list('owner__email', flat=True))
+        redeemed = dict(Token.objects.filter(code__in=codes, is_used=True).values_list('code', 'used_by__email'))
+        expected = {emails[0] for emails in winners.values()}
+        mismatched = [code for code, emails in winners.items() if redeemed.get(code) != emails[0]]
+    finally:
+        connections.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f'{args.threads} threads x {args.tokens} tokens: {len(outcomes)} tentativas em {elapsed:.2f} s '
+          f'({len(outcomes) / elapsed:.0f}/s)')
+    print(f'  cadastros aceitos:            {sum(success for _, _, success in outcomes)}')
+    print(f'  tokens resgatados:            {len(redeemed)} de {len(codes)}')
+    print(f'  tokens com mais de um dono:   {len(double)}')
+    print(f'  used_by diferente do vencedor: {len(mismatched)}')
+    print(f'  usuários sem o token:         {len(users - expected)}')
+    print(f'  usuários sem restaurante:     {len(users - owners)}')
+    ok = not double and not mismatched and users == expected == owners and len(redeemed) == len(codes)
+    print('OK' if ok else 'FALHOU')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import django
 import os
 from dotenv import load_dotenv
 
@@ -64,10 +65,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "puceats.staticfiles.StaticFilesMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "puceats.profiling.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -101,9 +104,37 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {},
     }
 }
 
+# Transações que escrevem pegam o lock logo no início (Django 5.1+), para o
+# busy_timeout valer também quando uma leitura vira escrita
+if django.VERSION >= (5, 1):
+    DATABASES["default"]["OPTIONS"]["transaction_mode"] = "IMMEDIATE"
+
+
+# Cache compartilhado entre os workers: contadores do limite de tentativas e
+# versões dos cardápios, páginas e tiles. Sem PUCEATS_REDIS_URL fica o
+# LocMem, que é por processo e só serve para desenvolvimento (puceats.W001)
+PUCEATS_REDIS_URL = os.getenv('PUCEATS_REDIS_URL', '')
+if PUCEATS_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": PUCEATS_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
+# Login pelo email ou pelo nome de usuário (ver puceats/backends.py)
+AUTHENTICATION_BACKENDS = ["puceats.backends.EmailOrUsernameBackend"]
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -143,6 +174,18 @@ STATIC_URL = "static/"
 STATICFILES_DIRS = [
     BASE_DIR / "puceats" / "static",
 ]
+# Destino do collectstatic: nomes com hash + variantes .gz/.br, servidos
+# pelo puceats.staticfiles.StaticFilesMiddleware (ver puceats/staticfiles.py)
+STATIC_ROOT = os.getenv('STATIC_ROOT', str(BASE_DIR / "staticfiles"))
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "puceats.staticfiles.CompressedManifestStorage",
+    },
+}
 
 # Media files (uploaded by users)
 MEDIA_URL = '/media/'
@@ -157,3 +200,65 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 LOGIN_URL = '/puceats/login/'
 LOGIN_REDIRECT_URL = '/puceats/crud/'
 LOGOUT_REDIRECT_URL = '/puceats/'
+
+# PUC Eats
+# Máximo de restaurantes aceitos por /puceats/api/restaurantes/menu/?ids=...
+PUCEATS_MENU_BATCH_MAX = int(os.getenv('PUCEATS_MENU_BATCH_MAX', '50'))
+# Segundos que o JSON pronto de cada cardápio fica no cache
+PUCEATS_MENU_CACHE_TIMEOUT = int(os.getenv('PUCEATS_MENU_CACHE_TIMEOUT', '3600'))
+# Itens por página (padrão e máximo) em /puceats/api/restaurants/ e /api/dishes/
+PUCEATS_LIST_PAGE_SIZE = int(os.getenv('PUCEATS_LIST_PAGE_SIZE', '20'))
+PUCEATS_LIST_PAGE_MAX = int(os.getenv('PUCEATS_LIST_PAGE_MAX', '100'))
+# Máximo de operações por lote em /puceats/crud/dishes/batch/
+PUCEATS_BATCH_MAX_OPERATIONS = int(os.getenv('PUCEATS_BATCH_MAX_OPERATIONS', '500'))
+# Segundos que a página inteira (visitante anônimo) fica no cache
+PUCEATS_PAGE_CACHE_TIMEOUT = int(os.getenv('PUCEATS_PAGE_CACHE_TIMEOUT', '600'))
+# Larguras (px) das miniaturas/WebP geradas para Dish.image e Restaurant.logo
+# e threads que as geram em segundo plano (ver puceats/thumbnails.py)
+PUCEATS_THUMBNAIL_WIDTHS = [int(w) for w in os.getenv('PUCEATS_THUMBNAIL_WIDTHS', '160,480').split(',')]
+PUCEATS_THUMBNAIL_WORKERS = int(os.getenv('PUCEATS_THUMBNAIL_WORKERS', '2'))
+# PRAGMAs aplicados em cada conexão com o SQLite (ver puceats/sqlite.py):
+# "production" (WAL, busy_timeout, mmap...) ou "default" (padrões do SQLite).
+# Em DEBUG fica "default", para o db.sqlite3 do repositório não virar WAL
+PUCEATS_SQLITE_PROFILE = os.getenv('PUCEATS_SQLITE_PROFILE', 'default' if DEBUG else 'production')
+# Ajustes pontuais por cima do perfil, ex.: {'busy_timeout': 10000}
+PUCEATS_SQLITE_PRAGMAS = {}
+# Tentativas de login/cadastro por janela de PUCEATS_THROTTLE_WINDOW segundos,
+# por IP e por email/usuário digitado (ver puceats/throttle.py)
+PUCEATS_THROTTLE_WINDOW = int(os.getenv('PUCEATS_THROTTLE_WINDOW', '300'))
+PUCEATS_THROTTLE_IP_LIMIT = int(os.getenv('PUCEATS_THROTTLE_IP_LIMIT', '30'))
+PUCEATS_THROTTLE_IDENTIFIER_LIMIT = int(os.getenv('PUCEATS_THROTTLE_IDENTIFIER_LIMIT', '10'))
+# Header Server-Timing (tempo total, SQL e templates) em toda resposta e
+# cProfile de uma fração das requisições e das de staff (ver puceats/profiling.py).
+# Segue o DEBUG: em produção o header entregaria tempos e contagem de queries a qualquer um
+PUCEATS_PROFILING_ENABLED = os.getenv('PUCEATS_PROFILING_ENABLED', str(DEBUG)) == 'True'
+PUCEATS_PROFILE_SAMPLE_RATE = float(os.getenv('PUCEATS_PROFILE_SAMPLE_RATE', '0'))
+PUCEATS_PROFILE_STAFF = os.getenv('PUCEATS_PROFILE_STAFF', 'False') == 'True'
+PUCEATS_PROFILE_DIR = os.getenv('PUCEATS_PROFILE_DIR', str(BASE_DIR / 'profiles'))
+# Eventos ao vivo dos cardápios por SSE, só com ASGI (ver puceats/live.py):
+# liga só com o site servido por ASGI; conexões abertas por processo e
+# segundos entre os keep-alives
+PUCEATS_LIVE_ENABLED = os.getenv('PUCEATS_LIVE_ENABLED', 'False') == 'True'
+PUCEATS_LIVE_MAX_SUBSCRIBERS = int(os.getenv('PUCEATS_LIVE_MAX_SUBSCRIBERS', '5000'))
+PUCEATS_LIVE_HEARTBEAT = int(os.getenv('PUCEATS_LIVE_HEARTBEAT', '15'))
+
+# Réplica somente leitura para as páginas públicas (ver puceats/replica.py)
+PUCEATS_REPLICA_ENABLED = os.getenv('PUCEATS_REPLICA_ENABLED', 'False') == 'True'
+# Atualiza a réplica depois desse número de requisições com escrita...
+PUCEATS_REPLICA_REFRESH_WRITES = int(os.getenv('PUCEATS_REPLICA_REFRESH_WRITES', '50'))
+# ...ou quando ela passa dessa idade em segundos
+PUCEATS_REPLICA_MAX_AGE = int(os.getenv('PUCEATS_REPLICA_MAX_AGE', '300'))
+# Por quanto tempo, no máximo, quem escreveu continua lendo do primário
+PUCEATS_REPLICA_PIN_SECONDS = int(os.getenv('PUCEATS_REPLICA_PIN_SECONDS', '600'))
+# Intervalo (s) entre as conferências de escritas/idade de cada processo
+PUCEATS_REPLICA_CHECK_INTERVAL = float(os.getenv('PUCEATS_REPLICA_CHECK_INTERVAL', '1'))
+
+if PUCEATS_REPLICA_ENABLED:
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": BASE_DIR / "db.replica.sqlite3",
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_ROUTERS = ["puceats.replica.ReplicaRouter"]
+    MIDDLEWARE.append("puceats.replica.ReplicaMiddleware")
@@ -1,5 +1,10 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+from .forms import TokenBatchForm
 from .models import Restaurant, Dish, Category, Token, Marker
+from . import tokens
 
 
 @admin.register(Restaurant)
@@ -34,6 +39,32 @@ class TokenAdmin(admin.ModelAdmin):
     search_fields = ['code', 'used_by__username']
     readonly_fields = ['code', 'created_at', 'used_at']
     list_per_page = 20
+    # Botão "Gerar tokens em lote" na listagem. É uma URL própria e não uma
+    # action: actions agem sobre linhas selecionadas e aqui nada existe ainda
+    change_list_template = 'admin/puceats/token/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('generate/', self.admin_site.admin_view(self.generate_view), name='puceats_token_generate'),
+        ] + super().get_urls()
+
+    def generate_view(self, request):
+        """Cria N tokens com tokens.issue e mostra os códigos para copiar"""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = TokenBatchForm(request.POST or None)
+        codes = None
+        if request.method == 'POST' and form.is_valid():
+            codes = tokens.issue(form.cleaned_data['count'], days=form.cleaned_data['days'])
+            self.message_user(request, f'{len(codes)} tokens criados.', messages.SUCCESS)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Gerar tokens em lote',
+            'form': form,
+            'codes': codes,
+        }
+        return TemplateResponse(request, 'admin/puceats/token/generate.html', context)
 
 @admin.register(Marker)
 class MarkerAdmin(admin.ModelAdmin):
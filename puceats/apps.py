@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PuceatsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "puceats"
+
+    def ready(self):
+        from . import checks, signals, sqlite  # noqa: F401
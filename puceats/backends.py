@@ -0,0 +1,45 @@
+"""
+Backend de autenticação do login do PUC Eats: o campo "email" do formulário
+aceita o email ou o nome de usuário.
+
+O usuário é encontrado numa query só (username = ? OR email = ?, com o
+índice de auth_user.email da migração 0010) e a senha passa pelo hasher uma
+vez só, acerto ou erro. Quando ninguém bate, o hash roda numa senha fictícia,
+como no ModelBackend, para o tempo de resposta não revelar se a conta existe.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        user = self._find_user(UserModel, username)
+        if user is None:
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def _find_user(self, UserModel, identifier):
+        """Username exato primeiro; senão a conta mais antiga com esse email"""
+        username_field = UserModel.USERNAME_FIELD
+        email_field = UserModel.get_email_field_name()
+        candidates = UserModel._default_manager.filter(
+            Q(**{username_field: identifier}) | Q(**{email_field: identifier})
+        ).order_by('pk')
+        email_match = None
+        for user in candidates:
+            if getattr(user, username_field) == identifier:
+                return user
+            if email_match is None:
+                email_match = user
+        return email_match
@@ -0,0 +1,144 @@
+"""
+Manutenção do RestaurantCard (resumo desnormalizado usado nas listagens).
+
+Quando um prato muda algum campo do resumo, os signals recontam o resumo
+do(s) restaurante(s) afetado(s) com agregações no banco, em vez de aplicar
+a diferença entre o estado anterior e o novo: a fotografia do post_init
+pode estar velha (outro processo salvou o prato no meio) e uma diferença
+errada ficaria para sempre no resumo.
+"""
+
+import functools
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+
+from . import pagecache
+from .models import Restaurant, Dish, Category, RestaurantCard
+
+
+STATE_FIELDS = [
+    'restaurant_id', 'category_id', 'price', 'available',
+    'is_vegan', 'is_vegetarian', 'is_gluten_free',
+]
+
+COUNTERS = [
+    ('available', 'available_dish_count'),
+    ('is_vegan', 'vegan_count'),
+    ('is_vegetarian', 'vegetarian_count'),
+    ('is_gluten_free', 'gluten_free_count'),
+]
+
+
+def _to_price(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def dish_state(dish):
+    """
+    Fotografia dos campos do prato que entram no resumo.
+    Retorna None se algum campo não foi carregado (ex.: .only()) ou se o
+    prato ainda não tem preço (Dish() vazio, como o de um ModelForm).
+    """
+    values = dish.__dict__
+    if any(field not in values for field in STATE_FIELDS) or values['price'] is None:
+        return None
+    state = {field: values[field] for field in STATE_FIELDS}
+    state['price'] = _to_price(state['price'])
+    return state
+
+
+def owner_name(user):
+    if user is None:
+        return ''
+    return user.first_name or user.username
+
+
+def summarize(restaurant, dishes, category_names):
+    """
+    Monta um RestaurantCard (não salvo) do zero.
+    `dishes` são dicts com STATE_FIELDS; `category_names` mapeia id -> nome.
+    """
+    card = RestaurantCard(
+        restaurant_id=restaurant.id,
+        name=restaurant.name,
+        establishment_type=restaurant.establishment_type,
+        owner_name=owner_name(restaurant.owner),
+    )
+    prices = []
+    for dish in dishes:
+        price = _to_price(dish['price'])
+        prices.append(price)
+        card.dish_count += 1
+        card.price_total += price
+        for flag, counter in COUNTERS:
+            if dish[flag]:
+                setattr(card, counter, getattr(card, counter) + 1)
+        name = category_names.get(dish['category_id'])
+        if name:
+            card.category_counts[name] = card.category_counts.get(name, 0) + 1
+    if prices:
+        card.min_price = min(prices)
+        card.max_price = max(prices)
+    return card
+
+
+def refresh(restaurant_id):
+    """Recalcula o resumo de um restaurante a partir do banco"""
+    try:
+        restaurant = Restaurant.objects.select_related('owner').get(id=restaurant_id)
+    except Restaurant.DoesNotExist:
+        return None
+    dishes = list(Dish.objects.filter(restaurant_id=restaurant_id).values(*STATE_FIELDS))
+    category_ids = {dish['category_id'] for dish in dishes if dish['category_id']}
+    category_names = dict(Category.objects.filter(id__in=category_ids).values_list('id', 'name'))
+    card = summarize(restaurant, dishes, category_names)
+    card.save()
+    return card
+
+
+def sync_restaurant(restaurant):
+    """Atualiza os campos copiados do restaurante (cria o resumo se não existir)"""
+    updated = RestaurantCard.objects.filter(restaurant_id=restaurant.id).update(
+        name=restaurant.name,
+        establishment_type=restaurant.establishment_type,
+        owner_name=owner_name(restaurant.owner),
+    )
+    if not updated:
+        refresh(restaurant.id)
+
+
+def sync_owner(user):
+    RestaurantCard.objects.filter(restaurant__owner=user).update(owner_name=owner_name(user))
+
+
+def recount(*restaurant_ids):
+    """
+    Recalcula contadores, preços e categorias dos resumos: uma agregação e
+    um GROUP BY por categoria por restaurante. Cria o resumo se não existir.
+    """
+    for restaurant_id in {id for id in restaurant_ids if id is not None}:
+        dishes = Dish.objects.filter(restaurant_id=restaurant_id)
+        totals = dishes.aggregate(
+            dish_count=Count('id'),
+            price_total=Sum('price'),
+            min_price=Min('price'),
+            max_price=Max('price'),
+            **{counter: Count('id', filter=Q(**{flag: True})) for flag, counter in COUNTERS},
+        )
+        totals['price_total'] = totals['price_total'] or Decimal('0')
+        category_counts = dict(
+            dishes.filter(category__isnull=False).exclude(category__name='')
+            .values_list('category__name')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        updated = RestaurantCard.objects.filter(restaurant_id=restaurant_id).update(
+            category_counts=category_counts, **totals
+        )
+        if not updated:
+            refresh(restaurant_id)
+        else:
+            # O update() não dispara o post_save do RestaurantCard, que limpa as páginas
+            transaction.on_commit(functools.partial(pagecache.purge, pagecache.card_tag(restaurant_id)))
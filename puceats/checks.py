@@ -0,0 +1,32 @@
+"""
+Checagens do Django (manage.py check, runserver, migrate) da configuração
+do PUC Eats.
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+# Backends que guardam os dados em cada processo (ou não guardam)
+PER_PROCESS_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    O limite de tentativas (puceats/throttle.py) e as versões de cardápios,
+    páginas e tiles contam com um cache visto por todos os workers. Com um
+    cache por processo, o limite efetivo cresce com o número de workers (e
+    zera a cada restart) e uma invalidação num worker não chega aos outros.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if settings.DEBUG or backend not in PER_PROCESS_CACHES:
+        return []
+    return [Warning(
+        f'O cache padrão ({backend}) é por processo.',
+        hint='Defina PUCEATS_REDIS_URL para usar um cache compartilhado entre os workers.',
+        id='puceats.W001',
+    )]
@@ -0,0 +1,263 @@
+"""
+Lote de edições de pratos do CRUD (/puceats/crud/dishes/batch/).
+
+O corpo é um JSON {"operations": [...]} com, em cada item:
+
+    {"op": "create", "data": {"restaurant": 3, "name": "...", "price": "12.50", ...}}
+    {"op": "update", "id": 41, "data": {"price": "13.00", "category": 2}}
+    {"op": "delete", "id": 42}
+    {"op": "toggle", "id": 43}                      (inverte "available")
+    {"op": "toggle", "id": 43, "available": false}
+
+Tudo é validado antes de gravar: os restaurantes do usuário vêm de uma
+query só e cada prato citado precisa pertencer a um deles. Se algum item
+falha, nada é gravado; se não, os itens são aplicados numa transação com
+bulk_create, bulk_update e um DELETE só. A resposta traz o resultado de
+cada item, na ordem recebida.
+"""
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils.text import slugify
+
+from .forms import clean_dish_data
+from .models import Category, Dish, Restaurant
+from . import cards, live, menus, pagecache, search
+
+
+MAX_OPERATIONS = getattr(settings, 'PUCEATS_BATCH_MAX_OPERATIONS', 500)
+
+OPERATIONS = ('create', 'update', 'delete', 'toggle')
+
+NOT_APPLIED = 'Não aplicado: há erros em outros itens do lote'
+
+# Campos do prato aceitos em "data" (além de restaurant e category)
+DATA_FIELDS = ['name', 'description', 'price', 'is_vegan', 'is_vegetarian', 'is_gluten_free', 'available']
+BOOLEAN_FIELDS = {'is_vegan', 'is_vegetarian', 'is_gluten_free', 'available'}
+
+
+class BatchError(ValueError):
+    """Corpo do lote malformado (vira 400 na view)"""
+
+
+def _as_id(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).isdigit():
+        return None
+    return int(value)
+
+
+def parse(payload):
+    """Confere a estrutura do lote e retorna a lista de operações"""
+    if not isinstance(payload, dict) or not isinstance(payload.get('operations'), list):
+        raise BatchError('Envie {"operations": [...]}')
+    operations = payload['operations']
+    if not operations:
+        raise BatchError('Nenhuma operação enviada')
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError(f'Máximo de {MAX_OPERATIONS} operações por lote')
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+            raise BatchError(f'Cada operação deve ter "op" entre {", ".join(OPERATIONS)}')
+    return operations
+
+
+# === Validação ===
+
+def _clean_data(data, partial):
+    """(campos do prato, erro ou None) de um "data" de create/update"""
+    if not isinstance(data, dict):
+        return None, '"data" deve ser um objeto'
+    unknown = set(data) - set(DATA_FIELDS) - {'restaurant', 'category'}
+    if unknown:
+        return None, f'Campos desconhecidos: {", ".join(sorted(unknown))}'
+
+    present = [field for field in DATA_FIELDS if field in data]
+    form_data = {}
+    for field in present:
+        value = data[field]
+        if field in BOOLEAN_FIELDS:
+            if not isinstance(value, bool):
+                return None, f'{field} deve ser true ou false'
+        elif value is not None:
+            value = str(value)
+        form_data[field] = value
+    if not partial:
+        form_data.setdefault('available', True)
+
+    fields, errors = clean_dish_data(form_data, None if not partial else present)
+    if errors:
+        return None, '; '.join(f'{field}: {" ".join(messages)}' for field, messages in errors.items())
+    return fields, None
+
+
+def _validate(operations, user):
+    """
+    Confere cada item. Retorna (itens prontos, pratos citados por id, erros
+    por posição); um item pronto é (op, dish_id, campos).
+    """
+    owned = set(Restaurant.objects.filter(owner=user).values_list('id', flat=True))
+
+    dish_ids = {_as_id(operation.get('id')) for operation in operations if operation['op'] != 'create'}
+    dish_ids.discard(None)
+    # Só os pratos dos restaurantes do usuário: o resto conta como não encontrado
+    dishes = Dish.objects.filter(id__in=dish_ids, restaurant_id__in=owned).in_bulk() if dish_ids and owned else {}
+
+    category_ids = set()
+    for operation in operations:
+        data = operation.get('data')
+        if isinstance(data, dict) and data.get('category') is not None:
+            category_ids.add(_as_id(data['category']))
+    category_ids.discard(None)
+    categories = set(Category.objects.filter(id__in=category_ids).values_list('id', flat=True)) if category_ids else set()
+
+    ready = []
+    errors = {}
+    deleted = set()
+    for index, operation in enumerate(operations):
+        op = operation['op']
+        dish_id = None
+        if op != 'create':
+            dish_id = _as_id(operation.get('id'))
+            if dish_id not in dishes:
+                errors[index] = 'Prato não encontrado ou você não tem permissão'
+                continue
+            if dish_id in deleted:
+                errors[index] = 'Prato já apagado neste lote'
+                continue
+
+        if op == 'delete':
+            deleted.add(dish_id)
+            ready.append((op, dish_id, {}))
+            continue
+
+        if op == 'toggle':
+            available = operation.get('available')
+            if available is not None and not isinstance(available, bool):
+                errors[index] = 'available deve ser true ou false'
+                continue
+            ready.append((op, dish_id, {'available': available}))
+            continue
+
+        data = operation.get('data')
+        fields, error = _clean_data(data, partial=(op == 'update'))
+        if error:
+            errors[index] = error
+            continue
+
+        if 'restaurant' in data or op == 'create':
+            restaurant_id = _as_id(data.get('restaurant'))
+            if restaurant_id not in owned:
+                errors[index] = 'Restaurante não encontrado ou você não tem permissão'
+                continue
+            fields['restaurant_id'] = restaurant_id
+        if 'category' in data:
+            category_id = None if data['category'] in (None, '') else _as_id(data['category'])
+            if data['category'] not in (None, '') and category_id not in categories:
+                errors[index] = 'Categoria inválida'
+                continue
+            fields['category_id'] = category_id
+        ready.append((op, dish_id, fields))
+    return ready, dishes, errors
+
+
+# === Gravação ===
+
+def apply(operations, user):
+    """
+    Valida e aplica o lote. Retorna (sucesso, resultados), um resultado por
+    operação: {"index", "op", "id", "success", "error"?}.
+    """
+    ready, dishes, errors = _validate(operations, user)
+    if errors:
+        results = []
+        for index, operation in enumerate(operations):
+            results.append({
+                'index': index,
+                'op': operation['op'],
+                'id': operation.get('id'),
+                'success': False,
+                'error': errors.get(index, NOT_APPLIED),
+            })
+        return False, results
+
+    to_create = []
+    updated = {}
+    update_fields = set()
+    deleted = []
+    touched = set()
+    for op, dish_id, fields in ready:
+        if op == 'create':
+            to_create.append(Dish(slug=slugify(fields['name']), **fields))
+            touched.add(fields['restaurant_id'])
+            continue
+
+        dish = dishes[dish_id]
+        touched.add(dish.restaurant_id)
+        if op == 'delete':
+            deleted.append(dish_id)
+            updated.pop(dish_id, None)
+            continue
+        if op == 'toggle':
+            available = fields['available']
+            fields = {'available': (not dish.available) if available is None else available}
+        for field, value in fields.items():
+            setattr(dish, field, value)
+        update_fields.update(fields)
+        touched.add(dish.restaurant_id)
+        updated[dish_id] = dish
+
+    with transaction.atomic():
+        created = Dish.objects.bulk_create(to_create)
+        if updated:
+            Dish.objects.bulk_update(list(updated.values()), sorted(update_fields))
+        if deleted:
+            # DELETE direto: o delete() do queryset dispararia os signals prato a prato
+            placeholders = ', '.join(['%s'] * len(deleted))
+            with connections[router.db_for_write(Dish)].cursor() as cursor:
+                cursor.execute(f'DELETE FROM {Dish._meta.db_table} WHERE id IN ({placeholders})', deleted)
+
+        # bulk_* não disparam signals: índice de busca e resumos aqui
+        search.unindex_dishes(deleted)
+        search.index_dishes(created, replace=False)
+        search.index_dishes(list(updated.values()))
+        for restaurant_id in touched:
+            cards.refresh(restaurant_id)
+        events = _live_events(created, updated.values(), [dishes[dish_id] for dish_id in deleted])
+        transaction.on_commit(lambda: _invalidate(touched, events))
+
+    created = iter(created)
+    results = []
+    for index, (op, dish_id, _) in enumerate(ready):
+        results.append({
+            'index': index,
+            'op': op,
+            'id': next(created).id if op == 'create' else dish_id,
+            'success': True,
+        })
+    return True, results
+
+
+def _live_events(created, updated, deleted):
+    """Os mesmos eventos que os signals de Dish publicariam prato a prato"""
+    events = [live.event(dish.restaurant_id, 'created', dish_id=dish.id) for dish in created]
+    for dish in updated:
+        if dish.restaurant_id != dish._loaded_restaurant_id:
+            events.append(live.event(dish.restaurant_id, 'created', dish_id=dish.id))
+            events.append(live.event(dish._loaded_restaurant_id, 'deleted', dish_id=dish.id))
+            continue
+        events += [
+            live.event(dish.restaurant_id, field, value, dish.id)
+            for field, value in live.changes(dish._loaded_live, dish, live.DISH_FIELDS)
+        ]
+    events += [live.event(dish._loaded_restaurant_id, 'deleted', dish_id=dish.id) for dish in deleted]
+    return events
+
+
+def _invalidate(restaurant_ids, events):
+    menus.invalidate(*restaurant_ids)
+    pagecache.purge(*[
+        tag for restaurant_id in restaurant_ids
+        for tag in (pagecache.restaurant_tag(restaurant_id), pagecache.card_tag(restaurant_id))
+    ])
+    # Depois de invalidar, para quem recarregar o cardápio pelo evento já ver a versão nova
+    live.publish(events)
@@ -1,7 +1,7 @@
 from django import forms
 from django.forms import inlineformset_factory
 
-from .models import Restaurant, Dish, Category
+from .models import TOKEN_VALID_DAYS, Restaurant, Dish, Category
 
 
 class RestaurantForm(forms.ModelForm):
@@ -46,12 +46,43 @@ class DishForm(forms.ModelForm):
         }
 
 
+class DishImportForm(DishForm):
+    """Regras do DishForm para as linhas do import_menu (categoria e imagem são resolvidas à parte)"""
+    class Meta(DishForm.Meta):
+        fields = [field for field in DishForm.Meta.fields if field not in ("category", "image")]
+
+
+def clean_dish_data(data, fields=None):
+    """
+    Limpa `data` com os campos do DishImportForm sem instanciar o formulário
+    a cada linha (deepcopy dos campos + instância do modelo). `fields` limita
+    aos campos enviados, para atualizações parciais. Retorna (cleaned, errors).
+    """
+    cleaned = {}
+    errors = {}
+    for name, field in DishImportForm.base_fields.items():
+        if fields is not None and name not in fields:
+            continue
+        try:
+            cleaned[name] = field.clean(field.widget.value_from_datadict(data, {}, name))
+        except forms.ValidationError as e:
+            errors[name] = e.messages
+    return cleaned, errors
+
+
 class CategoryForm(forms.ModelForm):
     class Meta:
         model = Category
         fields = ["name", "icon"]
 
 
+class TokenBatchForm(forms.Form):
+    """Emissão de tokens em lote pelo admin"""
+    count = forms.IntegerField(label="Quantidade", min_value=1, max_value=50000)
+    # Dez anos no máximo: um timedelta enorme estoura o datetime no tokens.issue
+    days = forms.IntegerField(label="Validade (dias)", min_value=1, max_value=3650, initial=TOKEN_VALID_DAYS)
+
+
 DishFormSet = inlineformset_factory(
     parent_model=Restaurant,
     model=Dish,
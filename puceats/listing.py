@@ -0,0 +1,232 @@
+"""
+Listagens JSON paginadas de restaurantes e pratos (/puceats/api/restaurants/
+e /puceats/api/dishes/).
+
+A paginação é por cursor (keyset) sobre (name, id): a próxima página começa
+depois do último item da anterior, com WHERE em vez de OFFSET, então o
+custo é o mesmo na primeira página e na milésima. `fields=` limita as
+colunas do SELECT.
+"""
+
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Restaurant, Dish
+
+
+PAGE_SIZE = getattr(settings, 'PUCEATS_LIST_PAGE_SIZE', 20)
+PAGE_MAX = getattr(settings, 'PUCEATS_LIST_PAGE_MAX', 100)
+
+# Nome na API -> caminho no ORM
+RESTAURANT_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'slug': 'slug',
+    'logo': 'logo',
+    'description': 'description',
+    'cuisine_type': 'cuisine_type',
+    'establishment_type': 'establishment_type',
+    'building': 'building',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'opening_hours': 'opening_hours',
+    'phone': 'phone',
+    'instagram': 'instagram',
+    'website': 'website',
+    'price_level': 'price_level',
+}
+RESTAURANT_DEFAULT_FIELDS = [
+    'id', 'name', 'slug', 'logo', 'cuisine_type', 'establishment_type', 'building', 'price_level',
+]
+
+DISH_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'slug': 'slug',
+    'description': 'description',
+    'price': 'price',
+    'image': 'image',
+    'is_vegan': 'is_vegan',
+    'is_vegetarian': 'is_vegetarian',
+    'is_gluten_free': 'is_gluten_free',
+    'available': 'available',
+    'restaurant_id': 'restaurant_id',
+    'restaurant': 'restaurant__name',
+    'category_id': 'category_id',
+    'category': 'category__name',
+}
+DISH_DEFAULT_FIELDS = [
+    'id', 'name', 'price', 'restaurant_id', 'restaurant', 'category',
+    'is_vegan', 'is_vegetarian', 'is_gluten_free', 'available',
+]
+
+DIETARY_FLAGS = ['is_vegan', 'is_vegetarian', 'is_gluten_free']
+
+FILE_FIELDS = {'logo', 'image'}
+
+
+# === Parâmetros ===
+
+def encode_cursor(name, id):
+    raw = json.dumps([name, id], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        name, id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError('Cursor inválido')
+    # bool é int para o isinstance; fora de 1..2**63-1 o SQLite estoura
+    if not isinstance(name, str) or not isinstance(id, int) or isinstance(id, bool) or not 0 < id < 2 ** 63:
+        raise ValueError('Cursor inválido')
+    return name, id
+
+
+def parse_limit(value):
+    if not value:
+        return PAGE_SIZE
+    if not value.isdigit() or not 1 <= int(value) <= PAGE_MAX:
+        raise ValueError(f'limit deve estar entre 1 e {PAGE_MAX}')
+    return int(value)
+
+
+def parse_fields(value, allowed, default):
+    if not value:
+        return list(default)
+    fields = []
+    for field in value.split(','):
+        field = field.strip()
+        if field not in allowed:
+            raise ValueError(f'Campo desconhecido: {field}')
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+
+def parse_list(value, cast=str):
+    """"a,b" -> ['a', 'b'] (None se o parâmetro não veio)"""
+    if value is None or value == '':
+        return None
+    try:
+        return [cast(item.strip()) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise ValueError(f'Valor inválido: {value}')
+
+
+def parse_bool(name, value):
+    if value is None or value == '':
+        return None
+    if value.lower() in ('1', 'true', 'sim'):
+        return True
+    if value.lower() in ('0', 'false', 'nao', 'não'):
+        return False
+    raise ValueError(f'{name} deve ser true ou false')
+
+
+# === Filtros ===
+
+def _restaurant_filters(params, prefix=''):
+    """Filtros sobre o restaurante; `prefix` = 'restaurant__' quando a base é Dish"""
+    q = Q()
+    for name in ('establishment_type', 'cuisine_type'):
+        values = parse_list(params.get(name))
+        if values is not None:
+            q &= Q(**{f'{prefix}{name}__in': values})
+    price_levels = parse_list(params.get('price_level'), int)
+    if price_levels is not None:
+        q &= Q(**{f'{prefix}price_level__in': price_levels})
+    return q
+
+
+def filter_restaurants(params):
+    restaurants = Restaurant.objects.filter(_restaurant_filters(params))
+
+    # Filtros de prato: restaurantes que têm ao menos um prato que atende
+    dishes = Dish.objects.filter(restaurant=OuterRef('pk'))
+    dish_filtered = False
+    categories = parse_list(params.get('category'), int)
+    if categories is not None:
+        dishes = dishes.filter(category_id__in=categories)
+        dish_filtered = True
+    for flag in DIETARY_FLAGS:
+        value = parse_bool(flag, params.get(flag))
+        if value is not None:
+            dishes = dishes.filter(**{flag: value})
+            dish_filtered = True
+    if dish_filtered:
+        restaurants = restaurants.filter(Exists(dishes))
+    return restaurants
+
+
+def filter_dishes(params):
+    dishes = Dish.objects.filter(_restaurant_filters(params, 'restaurant__'))
+    restaurant_ids = parse_list(params.get('restaurant'), int)
+    if restaurant_ids is not None:
+        dishes = dishes.filter(restaurant_id__in=restaurant_ids)
+    categories = parse_list(params.get('category'), int)
+    if categories is not None:
+        dishes = dishes.filter(category_id__in=categories)
+    for flag in DIETARY_FLAGS + ['available']:
+        value = parse_bool(flag, params.get(flag))
+        if value is not None:
+            dishes = dishes.filter(**{flag: value})
+    return dishes
+
+
+# === Página ===
+
+def paginate(queryset, field_map, fields, cursor=None, limit=PAGE_SIZE):
+    """
+    Uma página de `queryset` ordenada por (name, id), a partir do cursor.
+    Retorna (itens, próximo cursor ou None).
+    """
+    if cursor:
+        name, id = decode_cursor(cursor)
+        # O name >= separado deixa o SQLite começar a leitura do índice no cursor
+        queryset = queryset.filter(Q(name__gte=name) & (Q(name__gt=name) | Q(id__gt=id)))
+
+    # name e id sempre entram no SELECT para montar o próximo cursor
+    columns = {field: field_map[field] for field in fields}
+    lookups = sorted(set(columns.values()) | {'name', 'id'})
+    rows = list(queryset.order_by('name', 'id').values(*lookups)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['name'], rows[-1]['id'])
+
+    items = []
+    for row in rows:
+        item = {}
+        for field, lookup in columns.items():
+            value = row[lookup]
+            if field in FILE_FIELDS:
+                value = default_storage.url(value) if value else None
+            elif field == 'price':
+                value = str(value)
+            item[field] = value
+        items.append(item)
+    return items, next_cursor
+
+
+def list_restaurants(params):
+    fields = parse_fields(params.get('fields'), RESTAURANT_FIELDS, RESTAURANT_DEFAULT_FIELDS)
+    return paginate(
+        filter_restaurants(params), RESTAURANT_FIELDS, fields,
+        params.get('cursor'), parse_limit(params.get('limit')),
+    )
+
+
+def list_dishes(params):
+    fields = parse_fields(params.get('fields'), DISH_FIELDS, DISH_DEFAULT_FIELDS)
+    return paginate(
+        filter_dishes(params), DISH_FIELDS, fields,
+        params.get('cursor'), parse_limit(params.get('limit')),
+    )
@@ -0,0 +1,181 @@
+"""
+Eventos ao vivo dos cardápios (/puceats/api/live/?restaurants=1,2,3), por
+Server-Sent Events.
+
+Os signals de Dish e Restaurant (e o lote do CRUD, que não dispara signals)
+publicam, depois do commit, um evento compacto por campo que mudou:
+
+    {"dish": 41, "restaurant": 3, "field": "available", "value": false}
+    {"dish": 41, "restaurant": 3, "field": "price", "value": "13.00"}
+    {"dish": 42, "restaurant": 3, "field": "created", "value": null}
+    {"dish": null, "restaurant": 3, "field": "opening_hours", "value": "..."}
+
+"created" e "deleted" avisam que o cardápio mudou de forma: o cliente busca
+o cardápio de novo. O pub/sub é do processo: cada conexão aberta é uma fila
+no event loop do servidor, inscrita nos restaurantes pedidos. Cada evento
+é serializado uma vez e a mesma linha vai para todas as filas.
+
+Só funciona servido por ASGI (uvicorn/daphne), num processo só ou com os
+clientes de um restaurante no mesmo worker: um save feito em outro
+processo não chega aqui. Vem desligado (PUCEATS_LIVE_ENABLED); ligado,
+a view ainda responde 501 a requisições WSGI, em que o Django leria o
+stream infinito antes de enviar qualquer byte.
+Se um cliente não consome os eventos e a fila enche, a conexão é fechada
+com um evento "reset"; o EventSource reconecta e o cliente recarrega o
+cardápio.
+"""
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+# Liga a view e o EventSource da página; só com o site servido por ASGI
+ENABLED = getattr(settings, 'PUCEATS_LIVE_ENABLED', False)
+
+DISH_FIELDS = ('available', 'price', 'name')
+RESTAURANT_FIELDS = ('name', 'opening_hours')
+
+# Conexões abertas por processo; acima disso a view responde 503
+MAX_SUBSCRIBERS = getattr(settings, 'PUCEATS_LIVE_MAX_SUBSCRIBERS', 5000)
+# Restaurantes por conexão
+MAX_RESTAURANTS = getattr(settings, 'PUCEATS_LIVE_MAX_RESTAURANTS', 200)
+# Segundos entre comentários de keep-alive, para proxies não fecharem a conexão parada
+HEARTBEAT = getattr(settings, 'PUCEATS_LIVE_HEARTBEAT', 15)
+# Eventos pendentes por conexão antes de ela ser derrubada
+QUEUE_SIZE = getattr(settings, 'PUCEATS_LIVE_QUEUE_SIZE', 100)
+
+RETRY = b'retry: 3000\n\n'
+PING = b': ping\n\n'
+RESET = b'event: reset\ndata: {}\n\n'
+
+# restaurante -> inscrições
+_subscribers = defaultdict(set)
+_count = 0
+_lock = threading.Lock()
+
+
+class Subscriber:
+    """Uma conexão aberta: a fila dela e o event loop onde ela é lida"""
+
+    def __init__(self, restaurant_ids):
+        self.restaurant_ids = frozenset(restaurant_ids)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, message):
+        # Roda no event loop da conexão
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+def subscriber_count():
+    return _count
+
+
+def subscribe(restaurant_ids):
+    """Inscreve a conexão atual; None se o processo já está no limite"""
+    global _count
+    subscriber = Subscriber(restaurant_ids)
+    with _lock:
+        if _count >= MAX_SUBSCRIBERS:
+            return None
+        _count += 1
+        for restaurant_id in subscriber.restaurant_ids:
+            _subscribers[restaurant_id].add(subscriber)
+    return subscriber
+
+
+def unsubscribe(subscriber):
+    global _count
+    with _lock:
+        _count -= 1
+        for restaurant_id in subscriber.restaurant_ids:
+            subscribers = _subscribers.get(restaurant_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del _subscribers[restaurant_id]
+
+
+def event(restaurant_id, field, value=None, dish_id=None):
+    return {'dish': dish_id, 'restaurant': restaurant_id, 'field': field, 'value': value}
+
+
+def publish(events):
+    """Entrega os eventos às conexões inscritas. Pode ser chamado de qualquer thread"""
+    if not _count:
+        return
+    for item in events:
+        with _lock:
+            subscribers = list(_subscribers.get(item['restaurant'], ()))
+        if not subscribers:
+            continue
+        data = json.dumps(item, cls=DjangoJSONEncoder, separators=(',', ':'))
+        message = f'data: {data}\n\n'.encode()
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, message)
+            except RuntimeError:
+                # Event loop já fechado; a conexão sai no finally do stream
+                pass
+
+
+def _normalized(instance, field, value):
+    # Um preço atribuído como float ou str vira o Decimal que o banco guarda
+    model_field = instance._meta.get_field(field)
+    if value is not None and isinstance(model_field, models.DecimalField):
+        return Decimal(str(value)).quantize(Decimal(1).scaleb(-model_field.decimal_places))
+    return value
+
+
+def changes(loaded, instance, fields):
+    """(campo, valor novo) dos campos que mudaram desde `loaded`"""
+    current = instance.__dict__
+    result = []
+    for field in fields:
+        # Campo adiado no carregamento (ou depois): não dá para comparar
+        if field not in current or field not in loaded:
+            continue
+        value = _normalized(instance, field, current[field])
+        if _normalized(instance, field, loaded[field]) != value:
+            result.append((field, value))
+    return result
+
+
+def loaded_values(instance, fields):
+    # Do __dict__, para não disparar query em campos adiados com .only()
+    return {field: instance.__dict__[field] for field in fields if field in instance.__dict__}
+
+
+async def stream(restaurant_ids):
+    """
+    Corpo da resposta text/event-stream. A inscrição é feita aqui dentro,
+    para o finally sempre desfazê-la (inclusive quando o cliente desconecta
+    e o Django cancela o gerador).
+    """
+    subscriber = subscribe(restaurant_ids)
+    if subscriber is None:
+        yield RESET
+        return
+    try:
+        yield RETRY
+        while not subscriber.overflowed:
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield PING
+                continue
+            yield message
+        yield RESET
+    finally:
+        unsubscribe(subscriber)
@@ -0,0 +1,190 @@
+"""
+Comando para manter o armazenamento de imagens por conteúdo (puceats/storage.py).
+Uso: python manage.py collect_images [--adopt] [--dry-run] [--grace 3600]
+
+- --adopt: move as imagens antigas (pratos/, restaurantes/logos/) para
+  blobs/, apontando os campos para o blob e apagando as cópias repetidas.
+- Sempre: apaga blobs e derivados sem nenhuma referência, mais velhos que
+  --grace segundos, e informa quanto disco a deduplicação economiza.
+"""
+
+import hashlib
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from puceats import menus, nearby, pagecache, thumbnails, tiles
+from puceats.models import Restaurant, Dish, Marker
+from puceats.storage import BLOB_DIR, blob_name, image_storage, is_blob, reference_counts
+
+
+def _format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GB'
+
+
+def _digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _walk(root):
+    """Nomes (relativos ao MEDIA_ROOT) dos arquivos abaixo de `root`"""
+    base = image_storage.path('')
+    for directory, _, files in os.walk(image_storage.path(root)):
+        for filename in files:
+            yield os.path.relpath(os.path.join(directory, filename), base).replace(os.sep, '/')
+
+
+class Command(BaseCommand):
+    help = 'Deduplica as imagens enviadas e apaga os blobs sem referência'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--adopt',
+            action='store_true',
+            help='Move as imagens gravadas antes do armazenamento por conteúdo para blobs/',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só mostra o que seria feito',
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=60 * 60,
+            help='Idade mínima (segundos) de um arquivo sem referência para ser apagado (padrão: 3600)',
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.cutoff = time.time() - options['grace']
+
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING('⚠ MODO SIMULAÇÃO - Nenhum arquivo será alterado\n'))
+
+        if options['adopt']:
+            self._adopt()
+        self._collect()
+        self._report()
+
+    # === Imagens antigas ===
+
+    def _adopt(self):
+        self.stdout.write('--- IMAGENS ANTIGAS ---')
+        renamed = {}
+        missing = 0
+        for name in sorted(reference_counts()):
+            if is_blob(name):
+                continue
+            if not image_storage.exists(name):
+                # Ex.: prato cadastrado com URL externa no campo de imagem
+                missing += 1
+                continue
+            if self.dry_run:
+                renamed[name] = blob_name(_digest(image_storage.path(name)), os.path.splitext(name)[1].lower())
+            else:
+                renamed[name] = image_storage.save_path(image_storage.path(name))
+
+        blobs = set(renamed.values())
+        self.stdout.write(
+            f'  {len(renamed)} arquivos -> {len(blobs)} blobs'
+            f' ({len(renamed) - len(blobs)} cópias repetidas), {missing} referências sem arquivo'
+        )
+        if self.dry_run or not renamed:
+            return
+
+        # update() não dispara signals: os caches são invalidados no fim
+        with transaction.atomic():
+            for old, new in renamed.items():
+                Dish.objects.filter(image=old).update(image=new)
+                Restaurant.objects.filter(logo=old).update(logo=new)
+        for old in renamed:
+            image_storage.delete(old)
+            thumbnails.delete(old)
+
+        restaurants = Restaurant.objects.only('id', 'latitude', 'longitude', 'building')
+        menus.invalidate(*[restaurant.id for restaurant in restaurants])
+        positions = [
+            tiles.restaurant_position(restaurant.latitude, restaurant.longitude, restaurant.building)
+            for restaurant in restaurants
+        ]
+        positions.extend(Marker.objects.values_list('latitude', 'longitude'))
+        tiles.invalidate_positions(*positions)
+        nearby.invalidate()
+        pagecache.purge_all()
+        self.stdout.write(self.style.SUCCESS(
+            '  ✓ Campos atualizados. Rode generate_thumbnails para gerar as miniaturas dos blobs.'
+        ))
+
+    # === Coleta ===
+
+    def _is_old(self, name):
+        try:
+            return os.path.getmtime(image_storage.path(name)) < self.cutoff
+        except OSError:
+            return False
+
+    def _delete(self, name):
+        size = image_storage.size(name)
+        if not self.dry_run:
+            image_storage.delete(name)
+        return size
+
+    def _collect(self):
+        self.stdout.write('\n--- COLETA ---')
+        referenced = set(reference_counts())
+        orphans = freed = 0
+
+        for name in _walk(BLOB_DIR):
+            if name in referenced or not self._is_old(name):
+                continue
+            # Inclui uploads interrompidos (.upload-*)
+            freed += self._delete(name)
+            orphans += 1
+            if not self.dry_run:
+                thumbnails.delete(name)
+
+        expected = {
+            thumbnails.derivative_name(name, width, ext)
+            for name in referenced
+            for width in thumbnails.WIDTHS
+            for ext in ('jpg', 'webp')
+        }
+        derivatives = 0
+        for name in _walk(thumbnails.PREFIX):
+            if name in expected or not self._is_old(name):
+                continue
+            freed += self._delete(name)
+            derivatives += 1
+
+        verb = 'seriam apagados' if self.dry_run else 'apagados'
+        self.stdout.write(f'  {orphans} blobs e {derivatives} derivados sem referência {verb} ({_format_size(freed)})')
+
+    # === Relatório ===
+
+    def _report(self):
+        counts = reference_counts()
+        logical = physical = files = 0
+        for name, count in counts.items():
+            if not image_storage.exists(name):
+                continue
+            size = image_storage.size(name)
+            logical += size * count
+            physical += size
+            files += 1
+
+        self.stdout.write('\n--- DISCO ---')
+        self.stdout.write(f'  {sum(counts.values())} referências para {files} arquivos')
+        self.stdout.write(f'  Sem deduplicação: {_format_size(logical)}')
+        self.stdout.write(f'  Em disco:         {_format_size(physical)}')
+        self.stdout.write(self.style.SUCCESS(f'  ✓ Economia: {_format_size(logical - physical)}'))
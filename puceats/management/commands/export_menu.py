@@ -0,0 +1,88 @@
+"""
+Comando para exportar os pratos em CSV ou NDJSON.
+Uso: python manage.py export_menu cardapio.csv
+     python manage.py export_menu cardapio.ndjson --restaurant bandejao --restaurant 12
+     python manage.py export_menu - --format ndjson > cardapio.ndjson
+
+Os pratos são lidos com iterator(chunk_size=...) e escritos em blocos, então
+a memória não cresce com o tamanho do catálogo.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from puceats import menu_files
+from puceats.models import Dish, Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Exporta os pratos em CSV ou NDJSON (formato aceito pelo import_menu)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Arquivo de saída ("-" para a saída padrão)')
+        parser.add_argument(
+            '--format',
+            choices=menu_files.FORMATS,
+            help='Padrão: pela extensão do arquivo (.ndjson/.jsonl) ou csv',
+        )
+        parser.add_argument(
+            '--restaurant',
+            action='append',
+            default=[],
+            help='Só os pratos deste restaurante (id, slug ou nome; pode repetir)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Pratos lidos do banco por vez (padrão: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        format = menu_files.detect_format(None if output == '-' else output, options['format'])
+        chunk_size = max(1, options['chunk_size'])
+
+        dishes = Dish.objects.order_by('restaurant_id', 'id')
+        if options['restaurant']:
+            dishes = dishes.filter(restaurant_id__in=self._restaurant_ids(options['restaurant']))
+
+        # values_list com os nomes já no JOIN: nenhum objeto de modelo por linha
+        rows = dishes.values_list(
+            'restaurant__slug', 'name', 'category__name', 'description', 'price',
+            'is_vegan', 'is_vegetarian', 'is_gluten_free', 'available', 'image',
+        ).iterator(chunk_size=chunk_size)
+
+        if output == '-':
+            stream = None
+            write = lambda content: self.stdout.write(content, ending='')  # noqa: E731
+            log = self.stderr
+        else:
+            stream = open(output, 'w', newline='', encoding='utf-8')
+            write = stream.write
+            log = self.stdout
+
+        count = 0
+        try:
+            writer = menu_files.RowWriter(write, format, buffer_rows=chunk_size)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+            writer.flush()
+        finally:
+            if stream:
+                stream.close()
+
+        log.write(self.style.SUCCESS(f'✓ {count} pratos exportados ({format})'))
+
+    def _restaurant_ids(self, values):
+        ids = []
+        for value in values:
+            q = Q(slug=value) | Q(name=value)
+            if value.isdigit():
+                q |= Q(id=int(value))
+            found = list(Restaurant.objects.filter(q).values_list('id', flat=True))
+            if not found:
+                raise CommandError(f'Restaurante não encontrado: {value}')
+            ids.extend(found)
+        return ids
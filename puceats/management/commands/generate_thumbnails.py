@@ -0,0 +1,70 @@
+"""
+Comando para gerar as miniaturas e variantes WebP das imagens já enviadas
+(uploads novos são processados em segundo plano pelos signals).
+Uso: python manage.py generate_thumbnails [--force] [--workers 4]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from puceats import menus, pagecache, thumbnails, tiles
+from puceats.models import Restaurant, Dish, Marker
+
+
+class Command(BaseCommand):
+    help = 'Gera miniaturas JPEG e WebP de Dish.image e Restaurant.logo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Gera de novo mesmo quando os derivados já existem',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=thumbnails.WORKERS,
+            help=f'Threads de geração (padrão: {thumbnails.WORKERS})',
+        )
+
+    def handle(self, *args, **options):
+        names = set(Restaurant.objects.exclude(logo='').values_list('logo', flat=True))
+        names.update(Dish.objects.exclude(image='').values_list('image', flat=True))
+        # URLs externas não têm arquivo de onde gerar
+        names = sorted(name for name in names if name and not thumbnails.is_external(name))
+        if not options['force']:
+            names = [name for name in names if not thumbnails.is_ready(name)]
+
+        missing = [name for name in names if not default_storage.exists(name)]
+        for name in missing:
+            self.stdout.write(self.style.WARNING(f'  ⚠ Arquivo não encontrado: {name}'))
+        names = [name for name in names if name not in set(missing)]
+
+        generated = errors = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            futures = {name: executor.submit(thumbnails.generate, name) for name in names}
+            for name, future in futures.items():
+                try:
+                    future.result()
+                    generated += 1
+                except Exception as e:
+                    errors += 1
+                    self.stdout.write(self.style.ERROR(f'  ✗ {name}: {e}'))
+
+        if generated:
+            # As URLs de miniatura mudam nos caches de cardápio, mapa e páginas
+            restaurants = Restaurant.objects.only('id', 'latitude', 'longitude', 'building')
+            menus.invalidate(*[restaurant.id for restaurant in restaurants])
+            positions = [
+                tiles.restaurant_position(restaurant.latitude, restaurant.longitude, restaurant.building)
+                for restaurant in restaurants
+            ]
+            positions.extend(Marker.objects.values_list('latitude', 'longitude'))
+            tiles.invalidate_positions(*positions)
+            pagecache.purge_all()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {generated} imagens processadas, {errors} erros, {len(missing)} arquivos ausentes'
+        ))
@@ -0,0 +1,48 @@
+"""
+Comando para emitir tokens de cadastro em lote (puceats/tokens.py).
+Uso: python manage.py generate_tokens 20000
+     python manage.py generate_tokens 500 --days 90 --output tokens.txt
+
+Os códigos saem um por linha (na saída padrão ou em --output), para
+distribuir aos responsáveis pelos restaurantes.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from puceats import tokens
+
+
+class Command(BaseCommand):
+    help = 'Cria tokens de cadastro em lote e lista os códigos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='Quantidade de tokens')
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=tokens.TOKEN_VALID_DAYS,
+            help=f'Validade em dias (padrão: {tokens.TOKEN_VALID_DAYS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=tokens.BATCH_SIZE,
+            help=f'Tokens gravados por INSERT (padrão: {tokens.BATCH_SIZE})',
+        )
+        parser.add_argument('--output', help='Arquivo para os códigos (padrão: saída padrão)')
+
+    def handle(self, *args, **options):
+        if options['count'] < 1:
+            raise CommandError('Informe uma quantidade maior que zero')
+        if options['days'] < 1:
+            raise CommandError('A validade deve ser de pelo menos um dia')
+
+        codes = tokens.issue(options['count'], days=options['days'], batch_size=max(1, options['batch_size']))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write('\n'.join(codes) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'✓ {len(codes)} tokens criados em {options["output"]}'))
+        else:
+            self.stdout.write('\n'.join(codes))
+            self.stderr.write(self.style.SUCCESS(f'✓ {len(codes)} tokens criados'))
@@ -0,0 +1,282 @@
+"""
+Comando para importar pratos em lote de um CSV ou NDJSON.
+Uso: python manage.py import_menu cardapio.csv --restaurant bandejao
+     python manage.py import_menu cardapio.ndjson --batch-size 5000
+     python manage.py import_menu cardapio.csv --dry-run
+
+Colunas: as do export_menu (puceats/menu_files.py); name e price são
+obrigatórias. Sem --restaurant, cada linha diz o restaurante (slug, nome ou id). Um prato com o mesmo nome no
+mesmo restaurante é atualizado, só nas colunas presentes na linha; os
+outros são criados.
+
+As linhas são validadas em blocos com os campos do DishForm, as categorias
+novas são criadas a partir de um mapa em memória e a gravação usa
+bulk_create/bulk_update, tudo numa transação. Com erro em alguma linha nada
+é gravado, a não ser com --skip-invalid.
+"""
+
+import sys
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.text import slugify
+
+from puceats import cards, menu_files, menus, pagecache, search
+from puceats.forms import DishImportForm, clean_dish_data
+from puceats.models import Category, Dish, Restaurant
+
+
+FORM_FIELDS = DishImportForm.Meta.fields
+MAX_ERRORS_SHOWN = 20
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Importa pratos de um CSV ou NDJSON (cria ou atualiza pelo nome)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Arquivo de entrada ("-" para a entrada padrão)')
+        parser.add_argument(
+            '--format',
+            choices=menu_files.FORMATS,
+            help='Padrão: pela extensão do arquivo (.ndjson/.jsonl) ou csv',
+        )
+        parser.add_argument(
+            '--restaurant',
+            help='Restaurante de todas as linhas (id, slug ou nome); sem ele, vale a coluna "restaurant"',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Linhas validadas e gravadas por vez (padrão: 1000)',
+        )
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help='Grava as linhas válidas mesmo com erros em outras',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Valida tudo e desfaz a transação no final',
+        )
+
+    def handle(self, *args, **options):
+        path = options['input']
+        format = menu_files.detect_format(None if path == '-' else path, options['format'])
+        self.batch_size = max(1, options['batch_size'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('⚠ MODO SIMULAÇÃO - Nenhuma alteração será gravada\n'))
+
+        self._load_maps()
+        self.default_restaurant = None
+        if options['restaurant']:
+            self.default_restaurant = self._find_restaurant(options['restaurant'])
+            if self.default_restaurant is None:
+                raise CommandError(f'Restaurante não encontrado: {options["restaurant"]}')
+
+        self.stats = {'created': 0, 'updated': 0, 'invalid': 0, 'categories': 0}
+        self.errors = []
+        self.touched = set()
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            with transaction.atomic():
+                for batch in _batches(menu_files.read_rows(stream, format), self.batch_size):
+                    self._import_batch(batch)
+                if self.errors and not options['skip_invalid']:
+                    self._show_errors()
+                    raise CommandError(f'{len(self.errors)} linhas inválidas; nada foi gravado (use --skip-invalid)')
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self._show_errors()
+        if not options['dry_run']:
+            self._refresh_derived_data()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {self.stats["created"]} pratos criados, {self.stats["updated"]} atualizados, '
+            f'{self.stats["categories"]} categorias novas, {self.stats["invalid"]} linhas inválidas'
+        ))
+
+    # === Mapas em memória ===
+
+    def _load_maps(self):
+        self.categories = {}
+        for id, name in Category.objects.values_list('id', 'name'):
+            self.categories.setdefault(name.strip().lower(), id)
+
+        self.restaurants = {}
+        for id, slug, name in Restaurant.objects.values_list('id', 'slug', 'name'):
+            self.restaurants.setdefault(str(id), id)
+            self.restaurants.setdefault(slug, id)
+            self.restaurants.setdefault(name, id)
+
+        # restaurant_id -> {nome do prato: id}, carregado no primeiro uso
+        self.dishes = {}
+
+    def _find_restaurant(self, value):
+        return self.restaurants.get(str(value).strip())
+
+    def _dishes_of(self, restaurant_id):
+        if restaurant_id not in self.dishes:
+            # Em nomes repetidos, vale o prato mais antigo
+            rows = Dish.objects.filter(restaurant_id=restaurant_id).order_by('-id').values_list('name', 'id')
+            self.dishes[restaurant_id] = dict(rows)
+        return self.dishes[restaurant_id]
+
+    # === Validação ===
+
+    def _clean_row(self, row):
+        """(restaurant_id, campos do prato, nome da categoria ou None, colunas presentes)"""
+        restaurant_id = self.default_restaurant
+        if restaurant_id is None:
+            restaurant_id = self._find_restaurant(row.get('restaurant') or '')
+            if restaurant_id is None:
+                raise ValueError(f'restaurante não encontrado: {row.get("restaurant")!r}')
+
+        data = {}
+        present = set()
+        for field in FORM_FIELDS:
+            if field not in row:
+                continue
+            present.add(field)
+            value = row[field]
+            if field in menu_files.BOOLEAN_COLUMNS:
+                value = menu_files.parse_bool(value)
+                if value is None:
+                    raise ValueError(f'{field}: use true/false')
+            elif value is not None:
+                value = str(value)
+            data[field] = value
+        # Linha sem a coluna: o padrão do modelo (só entra na validação/criação)
+        data.setdefault('available', True)
+
+        fields, errors = clean_dish_data(data)
+        if errors:
+            raise ValueError('; '.join(f'{field}: {" ".join(messages)}' for field, messages in errors.items()))
+
+        category = None
+        if 'category' in row:
+            present.add('category')
+            category = str(row['category'] or '').strip() or None
+            if category and len(category) > Category._meta.get_field('name').max_length:
+                raise ValueError('category: nome muito longo')
+        if 'image' in row:
+            present.add('image')
+            fields['image'] = str(row['image'] or '').strip() or None
+            if fields['image'] and len(fields['image']) > Dish._meta.get_field('image').max_length:
+                raise ValueError('image: caminho muito longo')
+        return restaurant_id, fields, category, present
+
+    # === Gravação ===
+
+    def _import_batch(self, batch):
+        cleaned = []
+        for line_num, row in batch:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                cleaned.append(self._clean_row(row))
+            except ValueError as e:
+                self.stats['invalid'] += 1
+                self.errors.append((line_num, str(e)))
+        if not cleaned:
+            return
+
+        self._create_categories({category for _, _, category, _ in cleaned if category})
+
+        # Chave (restaurante, nome): repetições no arquivo valem a última linha
+        to_create = {}
+        to_update = {}
+        for restaurant_id, fields, category, present in cleaned:
+            if 'category' in present:
+                fields['category_id'] = self.categories[category.lower()] if category else None
+                present = present | {'category_id'}
+            existing_id = self._dishes_of(restaurant_id).get(fields['name'])
+            if existing_id is None:
+                to_create[(restaurant_id, fields['name'])] = (restaurant_id, fields)
+            else:
+                previous, previous_present = to_update.get(existing_id, ({}, set()))
+                changes = {field: fields[field] for field in present if field in fields}
+                to_update[existing_id] = ({**previous, **changes}, previous_present | present)
+
+        search.index_dishes(self._create(to_create.values()), replace=False)
+        search.index_dishes(self._update(to_update))
+
+    def _create_categories(self, names):
+        new = {}
+        for name in names:
+            new.setdefault(name.lower(), name)
+        new = [name for key, name in new.items() if key not in self.categories]
+        if not new:
+            return
+        for category in Category.objects.bulk_create([Category(name=name) for name in new], batch_size=self.batch_size):
+            self.categories[category.name.lower()] = category.id
+        self.stats['categories'] += len(new)
+
+    def _create(self, rows):
+        dishes = [
+            Dish(
+                restaurant_id=restaurant_id,
+                slug=slugify(fields['name']),
+                category_id=fields.get('category_id'),
+                **{field: fields[field] for field in FORM_FIELDS},
+                image=fields.get('image'),
+            )
+            for restaurant_id, fields in rows
+        ]
+        if not dishes:
+            return []
+        created = Dish.objects.bulk_create(dishes, batch_size=self.batch_size)
+        for dish in created:
+            self._dishes_of(dish.restaurant_id)[dish.name] = dish.id
+            self.touched.add(dish.restaurant_id)
+        self.stats['created'] += len(created)
+        return created
+
+    def _update(self, rows):
+        if not rows:
+            return []
+        dishes = Dish.objects.in_bulk(list(rows))
+        update_fields = set()
+        for id, (fields, present) in rows.items():
+            dish = dishes[id]
+            for field in present - {'category'}:
+                setattr(dish, field, fields[field])
+            update_fields |= present - {'category', 'name'}
+            self.touched.add(dish.restaurant_id)
+        dishes = list(dishes.values())
+        if update_fields:
+            Dish.objects.bulk_update(dishes, sorted(update_fields), batch_size=self.batch_size)
+        self.stats['updated'] += len(dishes)
+        return dishes
+
+    # === Depois do commit ===
+
+    def _refresh_derived_data(self):
+        """bulk_create/bulk_update não disparam signals: resumos e caches dos restaurantes tocados"""
+        for restaurant_id in self.touched:
+            cards.refresh(restaurant_id)
+        menus.invalidate(*self.touched)
+        pagecache.purge(*[
+            tag for restaurant_id in self.touched
+            for tag in (pagecache.restaurant_tag(restaurant_id), pagecache.card_tag(restaurant_id))
+        ])
+
+    def _show_errors(self):
+        for line_num, message in self.errors[:MAX_ERRORS_SHOWN]:
+            self.stdout.write(self.style.ERROR(f'  ✗ linha {line_num}: {message}'))
+        if len(self.errors) > MAX_ERRORS_SHOWN:
+            self.stdout.write(self.style.ERROR(f'  ... e mais {len(self.errors) - MAX_ERRORS_SHOWN} erros'))
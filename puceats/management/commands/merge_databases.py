@@ -1,12 +1,193 @@
 """
 Comando para fazer merge de dois bancos de dados SQLite.
 Uso: python manage.py merge_databases db2.sqlite3
+     python manage.py merge_databases db2.sqlite3 --resume
+     python manage.py merge_databases db2.sqlite3 --set-based
+     python manage.py merge_databases leme.sqlite3 kennedy.sqlite3 evento.sqlite3 --workers 4
+
+O modo padrão lê a origem em blocos (--chunk-size), faz commit a cada bloco
+e grava em puceats_merge_checkpoint o último rowid lido de cada tabela, para
+que um merge interrompido continue de onde parou com --resume.
+
+Com várias origens (ou --workers), cada banco é lido e normalizado num
+processo separado, que grava as linhas num arquivo temporário em blocos de
+--chunk-size; um único escritor lê esses blocos um por vez e grava os dados
+na ordem dos argumentos.
+Em conflito (mesmo username, código, nome...) vale o que já está no destino,
+depois a primeira origem da lista e, dentro dela, a linha de menor rowid.
 """
 
-from django.core.management.base import BaseCommand
-from django.db import connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import repeat
+import pickle
+import shutil
 import sqlite3
 import os
+import tempfile
+import time
+
+
+CHECKPOINT_TABLE = 'puceats_merge_checkpoint'
+
+# Tabelas do merge com várias origens, na ordem em que são gravadas
+# (usuários antes dos tokens para remapear used_by pelo username)
+SOURCE_TABLES = ['users', 'tokens', 'restaurants', 'categories', 'dishes', 'markers']
+
+SOURCE_TABLE_LABELS = {
+    'users': 'USUÁRIOS',
+    'tokens': 'TOKENS',
+    'restaurants': 'RESTAURANTES',
+    'categories': 'CATEGORIAS',
+    'dishes': 'PRATOS',
+    'markers': 'MARCADORES',
+}
+
+
+# === Leitura das origens (roda nos processos do pool) ===
+
+class _Spool:
+    """
+    Arquivo onde um processo do pool grava as linhas normalizadas, em blocos
+    de chunk_size (um pickle por bloco), para o escritor ler um bloco por vez
+    em vez de receber a origem inteira de volta na memória.
+    """
+
+    def __init__(self, path, chunk_size):
+        self.file = open(path, 'wb')
+        self.chunk_size = chunk_size
+        self.skipped = {table: 0 for table in SOURCE_TABLES}
+        self.rows = {table: 0 for table in SOURCE_TABLES}
+
+    def write(self, table, rows, key):
+        """Grava as linhas da tabela; repetidas na origem ficam só com a primeira"""
+        seen = set()
+        chunk = []
+        for row in rows:
+            k = key(row)
+            if k in seen:
+                self.skipped[table] += 1
+                continue
+            seen.add(k)
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self._dump(table, chunk)
+                chunk = []
+        if chunk:
+            self._dump(table, chunk)
+
+    def _dump(self, table, chunk):
+        pickle.dump((table, chunk), self.file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.rows[table] += len(chunk)
+
+    def close(self):
+        self.file.close()
+
+
+def read_spool(path):
+    """Blocos (tabela, linhas) gravados por read_source, na ordem de SOURCE_TABLES"""
+    with open(path, 'rb') as spool:
+        while True:
+            try:
+                yield pickle.load(spool)
+            except EOFError:
+                return
+
+
+def read_source(path, skip_users=False, spool_dir=None, chunk_size=500):
+    """
+    Lê um banco de origem e troca os ids dele por chaves naturais (username
+    e nomes de restaurante/categoria), que valem em qualquer banco. As linhas
+    vão para um arquivo em spool_dir, em blocos de chunk_size, sem passar
+    pela memória de uma vez; volta só o caminho e as contagens. Repetidos
+    dentro da própria origem ficam só com a linha de menor rowid.
+    """
+    fd, spool_path = tempfile.mkstemp(suffix='.spool', dir=spool_dir)
+    os.close(fd)
+    spool = _Spool(spool_path, chunk_size)
+    conn = sqlite3.connect(f'file:{os.path.abspath(path)}?mode=ro', uri=True)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        usernames = dict(conn.execute("SELECT id, username FROM auth_user"))
+        restaurant_names = dict(conn.execute("SELECT id, name FROM puceats_restaurant"))
+        category_names = dict(conn.execute("SELECT id, name FROM puceats_category"))
+
+        if not skip_users:
+            spool.write('users', conn.execute("""
+                SELECT username, first_name, last_name, email, password,
+                       is_superuser, is_staff, is_active, date_joined, last_login
+                FROM auth_user ORDER BY rowid
+            """), lambda u: u[0])
+
+        spool.write('tokens', (
+            (code, is_used, created_at, expires_at, usernames.get(used_by_id), used_at)
+            for code, is_used, created_at, expires_at, used_by_id, used_at in conn.execute("""
+                SELECT code, is_used, created_at, expires_at, used_by_id, used_at
+                FROM puceats_token ORDER BY rowid
+            """)
+        ), lambda t: t[0])
+
+        # owner_id vira username; o slug base já vai calculado
+        spool.write('restaurants', (
+            row[:1] + (row[1] or slugify(row[0]),) + row[2:15] + (usernames.get(row[15]),)
+            for row in conn.execute("""
+                SELECT name, slug, logo, description, cuisine_type, establishment_type,
+                       latitude, longitude, building, opening_hours, phone, instagram,
+                       website, price_level, created_at, owner_id
+                FROM puceats_restaurant ORDER BY rowid
+            """)
+        ), lambda r: r[0])
+
+        spool.write('categories', conn.execute("SELECT name, icon FROM puceats_category ORDER BY rowid"), lambda c: c[0])
+
+        # (nome do restaurante, nome, slug base, descrição, preço, imagem,
+        #  vegano, vegetariano, sem glúten, nome da categoria, disponível)
+        def dishes():
+            for row in conn.execute("""
+                SELECT name, description, price, image, is_vegan, is_vegetarian,
+                       is_gluten_free, restaurant_id, category_id, available
+                FROM puceats_dish ORDER BY rowid
+            """):
+                restaurant = restaurant_names.get(row[7])
+                if restaurant is None:
+                    spool.skipped['dishes'] += 1
+                    continue
+                yield (restaurant, row[0], slugify(row[0])) + row[1:7] + (category_names.get(row[8]), row[9])
+        spool.write('dishes', dishes(), lambda d: (d[0], d[1]))
+
+        # Marcador de restaurante: um por restaurante; independente: nome + posição
+        def markers():
+            if 'puceats_marker' not in tables:
+                return
+            for row in conn.execute("""
+                SELECT restaurant_id, name, marker_type, latitude, longitude,
+                       description, icon_color, is_active, created_at
+                FROM puceats_marker ORDER BY rowid
+            """):
+                if row[0] is not None and row[0] not in restaurant_names:
+                    spool.skipped['markers'] += 1
+                    continue
+                yield (restaurant_names.get(row[0]),) + row[1:]
+        spool.write('markers', markers(), _marker_key)
+    except BaseException:
+        spool.close()
+        os.remove(spool_path)
+        raise
+    finally:
+        conn.close()
+    spool.close()
+    return {'path': path, 'spool': spool_path, 'rows': spool.rows, 'skipped': spool.skipped}
+
+
+def _marker_key(marker):
+    restaurant, name, _, latitude, longitude = marker[:5]
+    if restaurant is not None:
+        return ('restaurant', restaurant)
+    return ('point', name, latitude, longitude)
 
 
 class Command(BaseCommand):
@@ -16,7 +197,8 @@ class Command(BaseCommand):
         parser.add_argument(
             'source_db',
             type=str,
-            help='Caminho para o banco de dados de origem (ex: db2.sqlite3)'
+            nargs='+',
+            help='Caminho para o(s) banco(s) de dados de origem (ex: db2.sqlite3)'
         )
         parser.add_argument(
             '--dry-run',
@@ -28,312 +210,806 @@ class Command(BaseCommand):
             action='store_true',
             help='Pula a importação de usuários'
         )
+        parser.add_argument(
+            '--set-based',
+            action='store_true',
+            help='Usa ATTACH DATABASE e um INSERT ... SELECT por tabela, numa única transação'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Linhas lidas da origem e gravadas por transação (padrão: 500)'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continua um merge interrompido a partir do último checkpoint'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processos que leem as origens em paralelo (padrão: um por origem, até o nº de CPUs)'
+        )
 
     def handle(self, *args, **options):
-        source_db = options['source_db']
+        sources = options['source_db']
         dry_run = options['dry_run']
         skip_users = options['skip_users']
+        self.chunk_size = options['chunk_size']
+        self.resume = options['resume'] and not dry_run
+
+        # Verifica se os arquivos existem
+        missing = [path for path in sources if not os.path.exists(path)]
+        if missing:
+            for path in missing:
+                self.stdout.write(self.style.ERROR(f'Arquivo não encontrado: {path}'))
+            return
 
-        # Verifica se o arquivo existe
-        if not os.path.exists(source_db):
-            self.stdout.write(self.style.ERROR(f'Arquivo não encontrado: {source_db}'))
+        if len(sources) > 1 or options['workers']:
+            if options['set_based'] or options['resume']:
+                raise CommandError('--set-based e --resume aceitam apenas uma origem')
+            workers = options['workers'] or min(len(sources), os.cpu_count() or 1)
+            self._merge_many(sources, workers, dry_run, skip_users)
             return
 
+        source_db = sources[0]
+
         self.stdout.write(self.style.SUCCESS(f'Iniciando merge de {source_db}...'))
-        
+
         if dry_run:
             self.stdout.write(self.style.WARNING('MODO DRY-RUN: Nenhuma alteração será feita'))
 
+        if options['set_based']:
+            self._merge_set_based(source_db, dry_run, skip_users)
+            return
+
+        self.source_key = os.path.abspath(source_db)
+        if not dry_run:
+            self._prepare_checkpoints()
+        if self.resume:
+            self.stdout.write(self.style.WARNING('Continuando a partir dos checkpoints salvos'))
+
         # Conectar ao banco de origem
         source_conn = sqlite3.connect(source_db)
-        source_cursor = source_conn.cursor()
+        started = time.monotonic()
+        self.total_rows = 0
 
         try:
             # 1. Importar Tokens
             self.stdout.write('\n--- TOKENS ---')
-            self._merge_tokens(source_cursor, dry_run)
+            self._merge_tokens(source_conn, dry_run)
 
             # 2. Importar Usuários (se não for pulado)
             if not skip_users:
                 self.stdout.write('\n--- USUÁRIOS ---')
-                self._merge_users(source_cursor, dry_run)
+                self._merge_users(source_conn, dry_run)
 
             # 3. Importar Restaurantes
             self.stdout.write('\n--- RESTAURANTES ---')
-            self._merge_restaurants(source_cursor, dry_run)
+            self._merge_restaurants(source_conn, dry_run)
 
             # 4. Importar Categorias
             self.stdout.write('\n--- CATEGORIAS ---')
-            self._merge_categories(source_cursor, dry_run)
+            self._merge_categories(source_conn, dry_run)
 
             # 5. Importar Pratos
             self.stdout.write('\n--- PRATOS ---')
-            self._merge_dishes(source_cursor, dry_run)
+            self._merge_dishes(source_conn, dry_run)
+
+            self._write_throughput('Total', self.total_rows, time.monotonic() - started)
 
             if not dry_run:
+                self._clear_checkpoints()
+                self._refresh_derived_data()
                 self.stdout.write(self.style.SUCCESS('\n✓ Merge concluído com sucesso!'))
             else:
                 self.stdout.write(self.style.WARNING('\n✓ Simulação concluída. Use sem --dry-run para aplicar as alterações.'))
 
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'\n✗ Erro durante o merge: {str(e)}'))
+            if not dry_run:
+                self.stdout.write(self.style.WARNING('Os blocos já gravados foram mantidos. Rode novamente com --resume para continuar.'))
             import traceback
             self.stdout.write(traceback.format_exc())
         finally:
             source_conn.close()
 
-    def _merge_tokens(self, source_cursor, dry_run):
-        """Importa tokens do banco de origem"""
-        source_cursor.execute("""
-            SELECT code, is_used, created_at, expires_at, used_by_id, used_at
-            FROM puceats_token
-        """)
-        
-        tokens = source_cursor.fetchall()
+    # === Checkpoints e leitura em blocos ===
+
+    def _prepare_checkpoints(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+                    source TEXT NOT NULL,
+                    table_name TEXT NOT NULL,
+                    last_rowid INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (source, table_name)
+                )
+            """)
+            if not self.resume:
+                cursor.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE source = %s", [self.source_key])
+
+    def _get_checkpoint(self, table):
+        if not self.resume:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT last_rowid FROM {CHECKPOINT_TABLE} WHERE source = %s AND table_name = %s",
+                [self.source_key, table]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def _save_checkpoint(self, cursor, table, last_rowid):
+        cursor.execute(f"""
+            INSERT INTO {CHECKPOINT_TABLE} (source, table_name, last_rowid, updated_at)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (source, table_name)
+            DO UPDATE SET last_rowid = excluded.last_rowid, updated_at = excluded.updated_at
+        """, [self.source_key, table, last_rowid, timezone.now().isoformat()])
+
+    def _clear_checkpoints(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE source = %s", [self.source_key])
+
+    def _iter_chunks(self, source_conn, table, columns, start_rowid=0):
+        """Lê a tabela de origem em blocos de chunk_size, em ordem de rowid"""
+        source_cursor = source_conn.cursor()
+        source_cursor.execute(
+            f"SELECT rowid, {columns} FROM {table} WHERE rowid > ? ORDER BY rowid",
+            [start_rowid]
+        )
+        while True:
+            rows = source_cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            yield rows
+
+    def _run_chunks(self, source_conn, table, columns, process_chunk, dry_run):
+        """
+        Passa cada bloco da origem para process_chunk(cursor, rows, dry_run),
+        que devolve (importados, ignorados). Cada bloco é gravado numa
+        transação junto com o checkpoint da tabela.
+        """
         imported = 0
         skipped = 0
+        processed = 0
+        started = time.monotonic()
 
-        for token in tokens:
-            code = token[0]
-            
-            # Verifica se já existe
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT id FROM puceats_token WHERE code = %s", [code])
-                exists = cursor.fetchone()
-
-            if exists:
-                skipped += 1
-                continue
-
-            if not dry_run:
+        for chunk in self._iter_chunks(source_conn, table, columns, self._get_checkpoint(table)):
+            last_rowid = chunk[-1][0]
+            rows = [row[1:] for row in chunk]
+            with transaction.atomic():
                 with connection.cursor() as cursor:
-                    cursor.execute("""
-                        INSERT INTO puceats_token 
-                        (code, is_used, created_at, expires_at, used_by_id, used_at)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """, token)
-            
-            imported += 1
-
+                    chunk_imported, chunk_skipped = process_chunk(cursor, rows, dry_run)
+                    if not dry_run:
+                        self._save_checkpoint(cursor, table, last_rowid)
+            imported += chunk_imported
+            skipped += chunk_skipped
+            processed += len(rows)
+
+        self.total_rows += processed
+        self._write_throughput('Velocidade', processed, time.monotonic() - started)
+        return imported, skipped
+
+    def _write_throughput(self, label, rows, elapsed):
+        rate = rows / elapsed if elapsed > 0 else 0
+        self.stdout.write(f'  {label}: {rate:,.0f} linhas/s ({rows} linhas em {elapsed:.2f}s)')
+
+    def _existing(self, cursor, table, column, values):
+        """Quais dos valores já existem na coluna do banco atual (uma query por bloco)"""
+        values = list(set(values))
+        if not values:
+            return set()
+        placeholders = ', '.join(['%s'] * len(values))
+        cursor.execute(f"SELECT {column} FROM {table} WHERE {column} IN ({placeholders})", values)
+        return {row[0] for row in cursor.fetchall()}
+
+    # === Tabelas ===
+
+    def _merge_tokens(self, source_conn, dry_run):
+        """Importa tokens do banco de origem"""
+        def process(cursor, tokens, dry_run):
+            existing = self._existing(cursor, 'puceats_token', 'code', [t[0] for t in tokens])
+            new_tokens = []
+            for token in tokens:
+                if token[0] in existing:
+                    continue
+                existing.add(token[0])
+                new_tokens.append(token)
+
+            if not dry_run and new_tokens:
+                cursor.executemany("""
+                    INSERT INTO puceats_token
+                    (code, is_used, created_at, expires_at, used_by_id, used_at)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, new_tokens)
+            return len(new_tokens), len(tokens) - len(new_tokens)
+
+        imported, skipped = self._run_chunks(
+            source_conn, 'puceats_token',
+            'code, is_used, created_at, expires_at, used_by_id, used_at',
+            process, dry_run
+        )
         self.stdout.write(f'  Importados: {imported}')
         self.stdout.write(f'  Ignorados (duplicados): {skipped}')
 
-    def _merge_users(self, source_cursor, dry_run):
+    def _merge_users(self, source_conn, dry_run):
         """Importa usuários do banco de origem"""
-        source_cursor.execute("""
-            SELECT username, first_name, last_name, email, password, 
-                   is_superuser, is_staff, is_active, date_joined, last_login
-            FROM auth_user
-        """)
-        
-        users = source_cursor.fetchall()
-        imported = 0
-        skipped = 0
-
-        for user in users:
-            username = user[0]
-            
-            # Verifica se já existe
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT id FROM auth_user WHERE username = %s", [username])
-                exists = cursor.fetchone()
-
-            if exists:
-                skipped += 1
-                continue
+        def process(cursor, users, dry_run):
+            existing = self._existing(cursor, 'auth_user', 'username', [u[0] for u in users])
+            new_users = []
+            for user in users:
+                if user[0] in existing:
+                    continue
+                existing.add(user[0])
+                new_users.append(user)
+
+            if not dry_run and new_users:
+                cursor.executemany("""
+                    INSERT INTO auth_user
+                    (username, first_name, last_name, email, password,
+                     is_superuser, is_staff, is_active, date_joined, last_login)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, new_users)
+            return len(new_users), len(users) - len(new_users)
+
+        imported, skipped = self._run_chunks(
+            source_conn, 'auth_user',
+            '''username, first_name, last_name, email, password,
+               is_superuser, is_staff, is_active, date_joined, last_login''',
+            process, dry_run
+        )
+        self.stdout.write(f'  Importados: {imported}')
+        self.stdout.write(f'  Ignorados (duplicados): {skipped}')
 
-            if not dry_run:
-                with connection.cursor() as cursor:
-                    cursor.execute("""
-                        INSERT INTO auth_user 
-                        (username, first_name, last_name, email, password, 
-                         is_superuser, is_staff, is_active, date_joined, last_login)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """, user)
-            
-            imported += 1
+    def _merge_restaurants(self, source_conn, dry_run):
+        """Importa restaurantes do banco de origem"""
+        def process(cursor, restaurants, dry_run):
+            existing = self._existing(cursor, 'puceats_restaurant', 'name', [r[0] for r in restaurants])
+            new_restaurants = []
+            for restaurant in restaurants:
+                name = restaurant[0]
+                if name in existing:
+                    self.stdout.write(self.style.WARNING(f'  Ignorando restaurante duplicado: {name}'))
+                    continue
+                existing.add(name)
+                new_restaurants.append(restaurant)
+                self.stdout.write(f'  ✓ {name}')
+
+            if not dry_run and new_restaurants:
+                cursor.executemany("""
+                    INSERT INTO puceats_restaurant
+                    (name, slug, logo, description, cuisine_type, establishment_type,
+                     latitude, longitude, building, opening_hours, phone, instagram,
+                     website, price_level, created_at, owner_id)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, new_restaurants)
+            return len(new_restaurants), len(restaurants) - len(new_restaurants)
+
+        imported, skipped = self._run_chunks(
+            source_conn, 'puceats_restaurant',
+            '''name, slug, logo, description, cuisine_type, establishment_type,
+               latitude, longitude, building, opening_hours, phone, instagram,
+               website, price_level, created_at, owner_id''',
+            process, dry_run
+        )
+        self.stdout.write(f'  Importados: {imported}')
+        self.stdout.write(f'  Ignorados (duplicados): {skipped}')
 
+    def _merge_categories(self, source_conn, dry_run):
+        """Importa categorias do banco de origem"""
+        def process(cursor, categories, dry_run):
+            existing = self._existing(cursor, 'puceats_category', 'name', [c[0] for c in categories])
+            new_categories = []
+            for category in categories:
+                if category[0] in existing:
+                    continue
+                existing.add(category[0])
+                new_categories.append(category)
+
+            if not dry_run and new_categories:
+                cursor.executemany("""
+                    INSERT INTO puceats_category (name, icon)
+                    VALUES (%s, %s)
+                """, new_categories)
+            return len(new_categories), len(categories) - len(new_categories)
+
+        imported, skipped = self._run_chunks(
+            source_conn, 'puceats_category', 'name, icon', process, dry_run
+        )
         self.stdout.write(f'  Importados: {imported}')
         self.stdout.write(f'  Ignorados (duplicados): {skipped}')
 
-    def _merge_restaurants(self, source_cursor, dry_run):
-        """Importa restaurantes do banco de origem"""
-        source_cursor.execute("""
-            SELECT name, slug, logo, description, cuisine_type, establishment_type,
-                   latitude, longitude, building, opening_hours, phone, instagram,
-                   website, price_level, created_at, owner_id
-            FROM puceats_restaurant
-        """)
-        
-        restaurants = source_cursor.fetchall()
-        imported = 0
-        skipped = 0
+    def _merge_dishes(self, source_conn, dry_run):
+        """Importa pratos do banco de origem"""
+        # Primeiro, precisamos mapear os IDs dos restaurantes e categorias
+        restaurant_map = self._build_id_map(source_conn, 'puceats_restaurant')
+        category_map = self._build_id_map(source_conn, 'puceats_category')
+        taken_slugs = self._load_dish_slugs()
+        now = timezone.now()
+
+        def process(cursor, dishes, dry_run):
+            mapped = []
+            skipped = 0
+            for dish in dishes:
+                # Mapeia os IDs antigos para os novos
+                restaurant_id_new = restaurant_map.get(dish[7])
+                if not restaurant_id_new:
+                    self.stdout.write(self.style.WARNING(f'  Ignorando prato sem restaurante: {dish[0]}'))
+                    skipped += 1
+                    continue
+                mapped.append((dish, restaurant_id_new))
+
+            # Verifica de uma vez quais (nome, restaurante) já existem
+            existing = set()
+            if mapped:
+                names = list({dish[0] for dish, _ in mapped})
+                restaurant_ids = list({rid for _, rid in mapped})
+                cursor.execute(
+                    "SELECT name, restaurant_id FROM puceats_dish WHERE name IN ({}) AND restaurant_id IN ({})".format(
+                        ', '.join(['%s'] * len(names)), ', '.join(['%s'] * len(restaurant_ids))
+                    ),
+                    names + restaurant_ids
+                )
+                existing = set(cursor.fetchall())
+
+            new_dishes = []
+            for dish, restaurant_id_new in mapped:
+                key = (dish[0], restaurant_id_new)
+                if key in existing:
+                    skipped += 1
+                    continue
+                existing.add(key)
+                category_id_new = category_map.get(dish[8]) if dish[8] else None
+                new_dishes.append((
+                    dish[0], self._unique_slug(dish[0], taken_slugs), dish[1], dish[2], dish[3],
+                    dish[4], dish[5], dish[6], restaurant_id_new, category_id_new, dish[9], now
+                ))
+
+            if not dry_run and new_dishes:
+                cursor.executemany("""
+                    INSERT INTO puceats_dish
+                    (name, slug, description, price, image, is_vegan, is_vegetarian,
+                     is_gluten_free, restaurant_id, category_id, available, created_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, new_dishes)
+            return len(new_dishes), skipped
+
+        imported, skipped = self._run_chunks(
+            source_conn, 'puceats_dish',
+            '''name, description, price, image, is_vegan, is_vegetarian,
+               is_gluten_free, restaurant_id, category_id, available''',
+            process, dry_run
+        )
+        self.stdout.write(f'  Importados: {imported}')
+        self.stdout.write(f'  Ignorados (duplicados ou sem restaurante): {skipped}')
 
-        for restaurant in restaurants:
-            name = restaurant[0]
-            
-            # Verifica se já existe
+    def _load_dish_slugs(self):
+        """Slugs de pratos já usados no banco atual, lidos em blocos"""
+        taken = set()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT slug FROM puceats_dish")
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                taken.update(row[0] for row in rows)
+        return taken
+
+    def _unique_slug(self, name, taken, base_slug=None):
+        # Gerar slug único para o prato
+        base_slug = base_slug or slugify(name)
+        slug = base_slug
+        counter = 1
+        while slug in taken:
+            slug = f"{base_slug}-{counter}"
+            counter += 1
+        taken.add(slug)
+        return slug
+
+    def _build_id_map(self, source_conn, table):
+        """Cria mapeamento de IDs pelo nome (antigo -> novo), uma query por bloco"""
+        id_map = {}
+        for chunk in self._iter_chunks(source_conn, table, 'id, name'):
+            old_ids = {name: old_id for _, old_id, name in chunk}
+            placeholders = ', '.join(['%s'] * len(old_ids))
             with connection.cursor() as cursor:
-                cursor.execute("SELECT id FROM puceats_restaurant WHERE name = %s", [name])
-                exists = cursor.fetchone()
-
-            if exists:
-                self.stdout.write(self.style.WARNING(f'  Ignorando restaurante duplicado: {name}'))
-                skipped += 1
-                continue
+                cursor.execute(
+                    f"SELECT id, name FROM {table} WHERE name IN ({placeholders})",
+                    list(old_ids)
+                )
+                for new_id, name in cursor.fetchall():
+                    id_map[old_ids[name]] = new_id
+        return id_map
+
+    def _refresh_derived_data(self):
+        """
+        Os INSERTs diretos não disparam signals: recria o índice de busca e os
+        resumos dos restaurantes e invalida os caches de cardápio/mapa.
+        """
+        from puceats import cards, menus, nearby, pagecache, search, tiles
+        from puceats.models import Restaurant, Dish, Marker
+
+        self.stdout.write('\n--- ÍNDICES E CACHES ---')
+        positions = []
+        restaurant_ids = []
+        # Uma transação só: no autocommit cada linha do índice seria um commit
+        with transaction.atomic():
+            if search.is_available():
+                search.rebuild(Restaurant.objects.all(), Dish.objects.all())
+
+            for restaurant in Restaurant.objects.only('id', 'latitude', 'longitude', 'building'):
+                restaurant_ids.append(restaurant.id)
+                positions.append(tiles.restaurant_position(restaurant.latitude, restaurant.longitude, restaurant.building))
+                cards.refresh(restaurant.id)
+        positions.extend(Marker.objects.values_list('latitude', 'longitude'))
+
+        menus.invalidate(*restaurant_ids)
+        tiles.invalidate_positions(*positions)
+        nearby.invalidate()
+        pagecache.purge_all()
+        self.stdout.write(f'  Atualizados: {len(restaurant_ids)} restaurantes')
+
+    # === Modo --set-based ===
+
+    def _merge_set_based(self, source_db, dry_run, skip_users):
+        """
+        Anexa o banco de origem e importa cada tabela com um único
+        INSERT ... SELECT ... WHERE NOT EXISTS, tudo em uma transação.
+        No dry-run a transação é desfeita no final, então as contagens
+        são exatamente as de uma execução real.
+        """
+        connection.ensure_connection()
+        self._register_slug_function()
+
+        with connection.cursor() as cursor:
+            cursor.execute("ATTACH DATABASE %s AS src", [os.path.abspath(source_db)])
 
-            if not dry_run:
+        try:
+            with transaction.atomic():
                 with connection.cursor() as cursor:
-                    cursor.execute("""
-                        INSERT INTO puceats_restaurant 
-                        (name, slug, logo, description, cuisine_type, establishment_type,
-                         latitude, longitude, building, opening_hours, phone, instagram,
-                         website, price_level, created_at, owner_id)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """, restaurant)
-            
-            imported += 1
-            self.stdout.write(f'  ✓ {name}')
+                    # Usuários primeiro, para remapear used_by/owner pelo username
+                    if not skip_users:
+                        self.stdout.write('\n--- USUÁRIOS ---')
+                        self._set_merge_users(cursor)
 
-        self.stdout.write(f'  Importados: {imported}')
-        self.stdout.write(f'  Ignorados (duplicados): {skipped}')
+                    self.stdout.write('\n--- TOKENS ---')
+                    self._set_merge_tokens(cursor)
 
-    def _merge_categories(self, source_cursor, dry_run):
-        """Importa categorias do banco de origem"""
-        source_cursor.execute("""
-            SELECT name, icon
-            FROM puceats_category
-        """)
-        
-        categories = source_cursor.fetchall()
-        imported = 0
-        skipped = 0
+                    self.stdout.write('\n--- RESTAURANTES ---')
+                    self._set_merge_restaurants(cursor)
 
-        for category in categories:
-            name = category[0]
-            
-            # Verifica se já existe
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT id FROM puceats_category WHERE name = %s", [name])
-                exists = cursor.fetchone()
+                    self.stdout.write('\n--- CATEGORIAS ---')
+                    self._set_merge_categories(cursor)
 
-            if exists:
-                skipped += 1
-                continue
+                    self.stdout.write('\n--- PRATOS ---')
+                    self._set_merge_dishes(cursor)
+
+                if dry_run:
+                    transaction.set_rollback(True)
 
             if not dry_run:
-                with connection.cursor() as cursor:
-                    cursor.execute("""
-                        INSERT INTO puceats_category (name, icon)
-                        VALUES (%s, %s)
-                    """, category)
-            
-            imported += 1
+                self._refresh_derived_data()
+                self.stdout.write(self.style.SUCCESS('\n✓ Merge concluído com sucesso!'))
+            else:
+                self.stdout.write(self.style.WARNING('\n✓ Simulação concluída. Use sem --dry-run para aplicar as alterações.'))
 
-        self.stdout.write(f'  Importados: {imported}')
-        self.stdout.write(f'  Ignorados (duplicados): {skipped}')
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'\n✗ Erro durante o merge (nada foi alterado): {str(e)}'))
+            import traceback
+            self.stdout.write(traceback.format_exc())
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("DETACH DATABASE src")
 
-    def _merge_dishes(self, source_cursor, dry_run):
-        """Importa pratos do banco de origem"""
-        from django.utils.text import slugify
-        
-        # Primeiro, precisamos mapear os IDs dos restaurantes e categorias
-        restaurant_map = self._build_restaurant_map(source_cursor)
-        category_map = self._build_category_map(source_cursor)
+    def _register_slug_function(self):
+        """Registra puceats_unique_slug(name) no SQLite, com os slugs existentes em memória"""
+        taken = self._load_dish_slugs()
+        connection.connection.create_function(
+            'puceats_unique_slug', 1, lambda name: self._unique_slug(name or '', taken)
+        )
 
-        source_cursor.execute("""
-            SELECT name, description, price, image, is_vegan, is_vegetarian,
-                   is_gluten_free, restaurant_id, category_id, available
-            FROM puceats_dish
+    def _report(self, cursor, table, imported, skipped_label='duplicados'):
+        cursor.execute(f"SELECT COUNT(*) FROM src.{table}")
+        total = cursor.fetchone()[0]
+        self.stdout.write(f'  Importados: {imported}')
+        self.stdout.write(f'  Ignorados ({skipped_label}): {total - imported}')
+
+    # Subconsulta que traduz um id de usuário da origem para o id no destino
+    USER_MAP_SQL = """
+        (SELECT u.id FROM main.auth_user u
+         JOIN src.auth_user su ON su.username = u.username
+         WHERE su.id = {column})
+    """
+
+    def _set_merge_users(self, cursor):
+        cursor.execute("""
+            INSERT INTO main.auth_user
+            (username, first_name, last_name, email, password,
+             is_superuser, is_staff, is_active, date_joined, last_login)
+            SELECT s.username, s.first_name, s.last_name, s.email, s.password,
+                   s.is_superuser, s.is_staff, s.is_active, s.date_joined, s.last_login
+            FROM src.auth_user s
+            WHERE NOT EXISTS (SELECT 1 FROM main.auth_user u WHERE u.username = s.username)
+            ORDER BY s.id
         """)
-        
-        dishes = source_cursor.fetchall()
-        imported = 0
-        skipped = 0
-
-        for dish in dishes:
-            name = dish[0]
-            restaurant_id_old = dish[7]
-            category_id_old = dish[8]
-            available = dish[9] if len(dish) > 9 else True  # Default to True if not present
-
-            # Mapeia os IDs antigos para os novos
-            restaurant_id_new = restaurant_map.get(restaurant_id_old)
-            category_id_new = category_map.get(category_id_old) if category_id_old else None
-
-            if not restaurant_id_new:
-                self.stdout.write(self.style.WARNING(f'  Ignorando prato sem restaurante: {name}'))
-                skipped += 1
-                continue
+        self._report(cursor, 'auth_user', cursor.rowcount)
+
+    def _set_merge_tokens(self, cursor):
+        cursor.execute(f"""
+            INSERT INTO main.puceats_token
+            (code, is_used, created_at, expires_at, used_by_id, used_at)
+            SELECT s.code, s.is_used, s.created_at, s.expires_at,
+                   {self.USER_MAP_SQL.format(column='s.used_by_id')}, s.used_at
+            FROM src.puceats_token s
+            WHERE NOT EXISTS (SELECT 1 FROM main.puceats_token t WHERE t.code = s.code)
+            ORDER BY s.id
+        """)
+        self._report(cursor, 'puceats_token', cursor.rowcount)
+
+    def _set_merge_restaurants(self, cursor):
+        cursor.execute(f"""
+            INSERT INTO main.puceats_restaurant
+            (name, slug, logo, description, cuisine_type, establishment_type,
+             latitude, longitude, building, opening_hours, phone, instagram,
+             website, price_level, created_at, owner_id)
+            SELECT s.name, s.slug, s.logo, s.description, s.cuisine_type, s.establishment_type,
+                   s.latitude, s.longitude, s.building, s.opening_hours, s.phone, s.instagram,
+                   s.website, s.price_level, s.created_at,
+                   {self.USER_MAP_SQL.format(column='s.owner_id')}
+            FROM src.puceats_restaurant s
+            WHERE NOT EXISTS (SELECT 1 FROM main.puceats_restaurant r WHERE r.name = s.name)
+            ORDER BY s.id
+        """)
+        self._report(cursor, 'puceats_restaurant', cursor.rowcount)
+
+    def _set_merge_categories(self, cursor):
+        cursor.execute("""
+            INSERT INTO main.puceats_category (name, icon)
+            SELECT s.name, s.icon
+            FROM src.puceats_category s
+            WHERE NOT EXISTS (SELECT 1 FROM main.puceats_category c WHERE c.name = s.name)
+            ORDER BY s.id
+        """)
+        self._report(cursor, 'puceats_category', cursor.rowcount)
+
+    def _set_merge_dishes(self, cursor):
+        # Restaurantes e categorias são casados pelo nome (único nas duas pontas);
+        # repetidos (mesmo nome no mesmo restaurante) na origem entram uma vez só
+        cursor.execute("""
+            INSERT INTO main.puceats_dish
+            (name, slug, description, price, image, is_vegan, is_vegetarian,
+             is_gluten_free, restaurant_id, category_id, available, created_at)
+            SELECT s.name, puceats_unique_slug(s.name), s.description, s.price, s.image,
+                   s.is_vegan, s.is_vegetarian, s.is_gluten_free, r.id,
+                   (SELECT c.id FROM main.puceats_category c
+                    JOIN src.puceats_category sc ON sc.name = c.name
+                    WHERE sc.id = s.category_id),
+                   s.available, %s
+            FROM src.puceats_dish s
+            JOIN src.puceats_restaurant sr ON sr.id = s.restaurant_id
+            JOIN main.puceats_restaurant r ON r.name = sr.name
+            WHERE NOT EXISTS (
+                SELECT 1 FROM main.puceats_dish d
+                WHERE d.name = s.name AND d.restaurant_id = r.id
+            )
+            AND s.id IN (
+                SELECT MIN(id) FROM src.puceats_dish GROUP BY name, restaurant_id
+            )
+            ORDER BY s.id
+        """, [timezone.now()])
+        self._report(cursor, 'puceats_dish', cursor.rowcount, 'duplicados ou sem restaurante')
+
+
+    # === Várias origens ===
+
+    def _merge_many(self, sources, workers, dry_run, skip_users):
+        """
+        Lê as origens num pool de processos e grava cada uma, na ordem dos
+        argumentos, numa transação. Rodar de novo é seguro: o que já entrou
+        é reconhecido pelas chaves naturais e ignorado.
+        """
+        self.stdout.write(self.style.SUCCESS(
+            f'Iniciando merge de {len(sources)} origens com {workers} processo(s)...'
+        ))
+        if dry_run:
+            self.stdout.write(self.style.WARNING('MODO DRY-RUN: Nenhuma alteração será feita'))
 
-            # Verifica se já existe (mesmo nome no mesmo restaurante)
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "SELECT id FROM puceats_dish WHERE name = %s AND restaurant_id = %s",
-                    [name, restaurant_id_new]
-                )
-                exists = cursor.fetchone()
+        started = time.monotonic()
+        totals = {table: [0, 0] for table in SOURCE_TABLES}
+        total_rows = 0
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        # Arquivos com as linhas normalizadas de cada origem (ver read_source)
+        spool_dir = tempfile.mkdtemp(prefix='puceats-merge-')
+        # executor.map devolve na ordem dos argumentos, independente de quem termina antes
+        mapper = executor.map if executor else map
 
-            if exists:
-                skipped += 1
-                continue
+        try:
+            # No dry-run tudo fica numa transação desfeita no final; senão cada origem tem a sua
+            with transaction.atomic() if dry_run else nullcontext():
+                keys = self._load_target_keys()
+                for data in mapper(read_source, sources, repeat(skip_users), repeat(spool_dir), repeat(self.chunk_size)):
+                    self.stdout.write(f'\n--- {data["path"]} ---')
+                    imported = {table: 0 for table in SOURCE_TABLES}
+                    try:
+                        with transaction.atomic():
+                            with connection.cursor() as cursor:
+                                # Um bloco por vez; as tabelas vêm na ordem de SOURCE_TABLES
+                                for table, rows in read_spool(data['spool']):
+                                    imported[table] += getattr(self, f'_write_{table}')(cursor, rows, keys)
+                    finally:
+                        os.remove(data['spool'])
+                    for table in SOURCE_TABLES:
+                        skipped = data['rows'][table] - imported[table] + data['skipped'][table]
+                        totals[table][0] += imported[table]
+                        totals[table][1] += skipped
+                        total_rows += data['rows'][table] + data['skipped'][table]
+                        self.stdout.write(
+                            f'  {SOURCE_TABLE_LABELS[table]}: {imported[table]} importados, {skipped} ignorados'
+                        )
+                if dry_run:
+                    transaction.set_rollback(True)
+
+            for table in SOURCE_TABLES:
+                imported, skipped = totals[table]
+                self.stdout.write(f'\n--- {SOURCE_TABLE_LABELS[table]} ---')
+                self.stdout.write(f'  Importados: {imported}')
+                self.stdout.write(f'  Ignorados (duplicados ou sem restaurante): {skipped}')
+            self._write_throughput('Total', total_rows, time.monotonic() - started)
 
             if not dry_run:
-                # Gerar slug único para o prato
-                base_slug = slugify(name)
-                slug = base_slug
-                counter = 1
-                
-                # Garantir que o slug seja único
-                while True:
-                    with connection.cursor() as cursor:
-                        cursor.execute("SELECT id FROM puceats_dish WHERE slug = %s", [slug])
-                        if not cursor.fetchone():
-                            break
-                    slug = f"{base_slug}-{counter}"
-                    counter += 1
-                
-                from django.utils import timezone
-                with connection.cursor() as cursor:
-                    cursor.execute("""
-                        INSERT INTO puceats_dish 
-                        (name, slug, description, price, image, is_vegan, is_vegetarian,
-                         is_gluten_free, restaurant_id, category_id, available, created_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (dish[0], slug, dish[1], dish[2], dish[3], dish[4], dish[5],
-                          dish[6], restaurant_id_new, category_id_new, available, timezone.now()))
-            
-            imported += 1
+                self._refresh_derived_data()
+                self.stdout.write(self.style.SUCCESS('\n✓ Merge concluído com sucesso!'))
+            else:
+                self.stdout.write(self.style.WARNING('\n✓ Simulação concluída. Use sem --dry-run para aplicar as alterações.'))
 
-        self.stdout.write(f'  Importados: {imported}')
-        self.stdout.write(f'  Ignorados (duplicados ou sem restaurante): {skipped}')
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'\n✗ Erro durante o merge: {str(e)}'))
+            if not dry_run:
+                self.stdout.write(self.style.WARNING('As origens já gravadas foram mantidas. Rode novamente para continuar.'))
+            import traceback
+            self.stdout.write(traceback.format_exc())
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+    def _fetch_all(self, cursor, sql):
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            yield from rows
+
+    def _load_target_keys(self):
+        """Chaves naturais do destino, lidas uma vez e atualizadas a cada insert"""
+        with connection.cursor() as cursor:
+            keys = {
+                'users': {username: id for id, username in self._fetch_all(cursor, "SELECT id, username FROM auth_user")},
+                'tokens': {code for code, in self._fetch_all(cursor, "SELECT code FROM puceats_token")},
+                'restaurants': {name: id for id, name in self._fetch_all(cursor, "SELECT id, name FROM puceats_restaurant")},
+                'restaurant_slugs': {slug for slug, in self._fetch_all(cursor, "SELECT slug FROM puceats_restaurant")},
+                'categories': {name: id for id, name in self._fetch_all(cursor, "SELECT id, name FROM puceats_category")},
+                'dishes': set(self._fetch_all(cursor, "SELECT restaurant_id, name FROM puceats_dish")),
+                'dish_slugs': {slug for slug, in self._fetch_all(cursor, "SELECT slug FROM puceats_dish")},
+                'markers': set(),
+            }
+            restaurant_names = {id: name for name, id in keys['restaurants'].items()}
+            for restaurant_id, name, latitude, longitude in self._fetch_all(
+                cursor, "SELECT restaurant_id, name, latitude, longitude FROM puceats_marker"
+            ):
+                keys['markers'].add(_marker_key((restaurant_names.get(restaurant_id), name, None, latitude, longitude)))
+        return keys
+
+    def _insert_batches(self, cursor, sql, rows):
+        for start in range(0, len(rows), self.chunk_size):
+            cursor.executemany(sql, rows[start:start + self.chunk_size])
+
+    def _ids_by(self, cursor, table, column, values):
+        """Mapeia valor -> id dos registros recém-inseridos, uma query por bloco"""
+        ids = {}
+        for start in range(0, len(values), self.chunk_size):
+            chunk = values[start:start + self.chunk_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"SELECT {column}, id FROM {table} WHERE {column} IN ({placeholders})", chunk)
+            ids.update(cursor.fetchall())
+        return ids
+
+    def _write_users(self, cursor, users, keys):
+        new_users = [user for user in users if user[0] not in keys['users']]
+        self._insert_batches(cursor, """
+            INSERT INTO auth_user
+            (username, first_name, last_name, email, password,
+             is_superuser, is_staff, is_active, date_joined, last_login)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, new_users)
+        keys['users'].update(self._ids_by(cursor, 'auth_user', 'username', [u[0] for u in new_users]))
+        return len(new_users)
+
+    def _write_tokens(self, cursor, tokens, keys):
+        new_tokens = []
+        for code, is_used, created_at, expires_at, used_by, used_at in tokens:
+            if code in keys['tokens']:
+                continue
+            keys['tokens'].add(code)
+            new_tokens.append((code, is_used, created_at, expires_at, keys['users'].get(used_by), used_at))
+        self._insert_batches(cursor, """
+            INSERT INTO puceats_token
+            (code, is_used, created_at, expires_at, used_by_id, used_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, new_tokens)
+        return len(new_tokens)
+
+    def _write_restaurants(self, cursor, restaurants, keys):
+        new_restaurants = []
+        for restaurant in restaurants:
+            name = restaurant[0]
+            if name in keys['restaurants']:
+                continue
+            slug = self._unique_slug(name, keys['restaurant_slugs'], restaurant[1])
+            new_restaurants.append((name, slug) + restaurant[2:15] + (keys['users'].get(restaurant[15]),))
+        self._insert_batches(cursor, """
+            INSERT INTO puceats_restaurant
+            (name, slug, logo, description, cuisine_type, establishment_type,
+             latitude, longitude, building, opening_hours, phone, instagram,
+             website, price_level, created_at, owner_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, new_restaurants)
+        keys['restaurants'].update(
+            self._ids_by(cursor, 'puceats_restaurant', 'name', [r[0] for r in new_restaurants])
+        )
+        return len(new_restaurants)
+
+    def _write_categories(self, cursor, categories, keys):
+        new_categories = [category for category in categories if category[0] not in keys['categories']]
+        self._insert_batches(cursor, """
+            INSERT INTO puceats_category (name, icon)
+            VALUES (%s, %s)
+        """, new_categories)
+        keys['categories'].update(
+            self._ids_by(cursor, 'puceats_category', 'name', [c[0] for c in new_categories])
+        )
+        return len(new_categories)
 
-    def _build_restaurant_map(self, source_cursor):
-        """Cria mapeamento de IDs de restaurantes (antigo -> novo)"""
-        source_cursor.execute("SELECT id, name FROM puceats_restaurant")
-        source_restaurants = source_cursor.fetchall()
-        
-        restaurant_map = {}
-        for old_id, name in source_restaurants:
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT id FROM puceats_restaurant WHERE name = %s", [name])
-                result = cursor.fetchone()
-                if result:
-                    restaurant_map[old_id] = result[0]
-        
-        return restaurant_map
-
-    def _build_category_map(self, source_cursor):
-        """Cria mapeamento de IDs de categorias (antigo -> novo)"""
-        source_cursor.execute("SELECT id, name FROM puceats_category")
-        source_categories = source_cursor.fetchall()
-        
-        category_map = {}
-        for old_id, name in source_categories:
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT id FROM puceats_category WHERE name = %s", [name])
-                result = cursor.fetchone()
-                if result:
-                    category_map[old_id] = result[0]
-        
-        return category_map
+    def _write_dishes(self, cursor, dishes, keys):
+        now = timezone.now()
+        new_dishes = []
+        for dish in dishes:
+            restaurant_id = keys['restaurants'][dish[0]]
+            name = dish[1]
+            if (restaurant_id, name) in keys['dishes']:
+                continue
+            keys['dishes'].add((restaurant_id, name))
+            new_dishes.append((
+                name, self._unique_slug(name, keys['dish_slugs'], dish[2])) + dish[3:9] + (
+                restaurant_id, keys['categories'].get(dish[9]), dish[10], now
+            ))
+        self._insert_batches(cursor, """
+            INSERT INTO puceats_dish
+            (name, slug, description, price, image, is_vegan, is_vegetarian,
+             is_gluten_free, restaurant_id, category_id, available, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, new_dishes)
+        return len(new_dishes)
+
+    def _write_markers(self, cursor, markers, keys):
+        new_markers = []
+        for marker in markers:
+            key = _marker_key(marker)
+            if key in keys['markers']:
+                continue
+            keys['markers'].add(key)
+            restaurant_id = keys['restaurants'][marker[0]] if marker[0] is not None else None
+            new_markers.append((restaurant_id,) + marker[1:])
+        self._insert_batches(cursor, """
+            INSERT INTO puceats_marker
+            (restaurant_id, name, marker_type, latitude, longitude,
+             description, icon_color, is_active, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, new_markers)
+        return len(new_markers)
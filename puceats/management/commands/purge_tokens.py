@@ -0,0 +1,59 @@
+"""
+Comando para apagar os tokens já usados ou vencidos (puceats/tokens.py).
+Uso: python manage.py purge_tokens
+     python manage.py purge_tokens --older-than 90 --archive tokens-antigos.ndjson
+     python manage.py purge_tokens --dry-run
+
+Apaga em blocos de --chunk-size ids, cada um na sua transação, então os
+cadastros continuam funcionando durante a limpeza. Com --archive, os tokens
+são acrescentados ao arquivo (um JSON por linha) antes de saírem do banco.
+"""
+
+from django.core.management.base import BaseCommand
+
+from puceats import tokens
+
+
+class Command(BaseCommand):
+    help = 'Apaga (ou arquiva e apaga) os tokens usados ou vencidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=0,
+            help='Só tokens usados/vencidos há mais de N dias (padrão: 0)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=tokens.PURGE_CHUNK_SIZE,
+            help=f'Tokens apagados por transação (padrão: {tokens.PURGE_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.05,
+            help='Segundos de espera entre os blocos (padrão: 0.05)',
+        )
+        parser.add_argument('--archive', help='Arquivo NDJSON onde os tokens apagados são acrescentados')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só conta os tokens que seriam apagados',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = tokens.purgeable(options['older_than']).count()
+            self.stdout.write(self.style.WARNING(f'⚠ MODO SIMULAÇÃO - {count} tokens seriam apagados'))
+            return
+
+        purge = dict(older_than=options['older_than'], chunk_size=max(1, options['chunk_size']), pause=options['pause'])
+        if options['archive']:
+            with open(options['archive'], 'a', encoding='utf-8') as archive:
+                deleted = tokens.purge(archive=archive, **purge)
+        else:
+            deleted = tokens.purge(**purge)
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {deleted} tokens apagados'))
@@ -0,0 +1,27 @@
+"""
+Comando para recriar o índice de busca (tabela FTS5 puceats_search).
+Uso: python manage.py rebuild_search_index
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from puceats import search
+from puceats.models import Restaurant, Dish
+
+
+class Command(BaseCommand):
+    help = 'Recria o índice de busca de restaurantes e pratos'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stdout.write(self.style.ERROR('O índice de busca só existe em bancos SQLite'))
+            return
+
+        with transaction.atomic():
+            search.create_table()
+            search.rebuild(Restaurant.objects.all(), Dish.objects.all())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Índice recriado: {Restaurant.objects.count()} restaurantes, {Dish.objects.count()} pratos'
+        ))
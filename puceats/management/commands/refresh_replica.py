@@ -0,0 +1,22 @@
+"""
+Comando para atualizar a réplica somente leitura (para rodar no cron).
+Uso: python manage.py refresh_replica
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from puceats import replica
+
+
+class Command(BaseCommand):
+    help = 'Copia o banco principal para a réplica usada pelas páginas públicas'
+
+    def handle(self, *args, **options):
+        if replica.REPLICA not in settings.DATABASES:
+            self.stdout.write(self.style.ERROR('Réplica desativada (PUCEATS_REPLICA_ENABLED=False)'))
+            return
+        if replica.refresh():
+            self.stdout.write(self.style.SUCCESS('✓ Réplica atualizada'))
+        else:
+            self.stdout.write(self.style.WARNING('Outra atualização já está em andamento'))
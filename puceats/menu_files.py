@@ -0,0 +1,102 @@
+"""
+Leitura e escrita de cardápios em CSV ou NDJSON (um JSON por linha), usadas
+pelos comandos import_menu e export_menu. As duas pontas trabalham linha a
+linha: nenhum dos lados carrega o arquivo inteiro na memória.
+"""
+
+import csv
+import io
+import json
+import os
+
+
+FORMATS = ['csv', 'ndjson']
+
+# Colunas, na ordem do export. "restaurant" é o slug (no import também vale
+# o nome ou o id) e "category" é o nome da categoria
+COLUMNS = [
+    'restaurant', 'name', 'category', 'description', 'price',
+    'is_vegan', 'is_vegetarian', 'is_gluten_free', 'available', 'image',
+]
+BOOLEAN_COLUMNS = ['is_vegan', 'is_vegetarian', 'is_gluten_free', 'available']
+
+TRUE_VALUES = {'1', 'true', 'sim', 's', 'yes', 'y', 'x'}
+FALSE_VALUES = {'0', 'false', 'nao', 'não', 'n', 'no', ''}
+
+
+def detect_format(path, format=None):
+    if format:
+        return format
+    ext = os.path.splitext(path or '')[1].lower()
+    return 'ndjson' if ext in ('.ndjson', '.jsonl', '.json') else 'csv'
+
+
+def parse_bool(value):
+    """Aceita true/false, 1/0, sim/não (e bool do JSON). None se inválido"""
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return None
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    return None
+
+
+def read_rows(stream, format):
+    """Gera (número da linha, dict) a partir de um arquivo texto"""
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Colunas a mais ficam na chave None
+            row.pop(None, None)
+            yield reader.line_num, row
+        return
+
+    for line_num, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_num, ValueError(f'JSON inválido: {e}')
+            continue
+        if not isinstance(row, dict):
+            yield line_num, ValueError('Cada linha deve ser um objeto JSON')
+            continue
+        yield line_num, row
+
+
+class RowWriter:
+    """Escreve linhas em blocos de `buffer_rows` (uma chamada de write por bloco)"""
+
+    def __init__(self, write, format, buffer_rows=1000):
+        self.write = write
+        self.format = format
+        self.buffer_rows = buffer_rows
+        self.buffer = io.StringIO()
+        self.pending = 0
+        self.csv = csv.writer(self.buffer, lineterminator='\n') if format == 'csv' else None
+        if self.csv:
+            self.csv.writerow(COLUMNS)
+
+    def writerow(self, row):
+        if self.csv:
+            self.csv.writerow(['' if value is None else value for value in row])
+        else:
+            self.buffer.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False, default=str))
+            self.buffer.write('\n')
+        self.pending += 1
+        if self.pending >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        content = self.buffer.getvalue()
+        if content:
+            self.write(content)
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.pending = 0
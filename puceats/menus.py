@@ -0,0 +1,200 @@
+"""
+Carregamento, serialização e cache de cardápios.
+
+Usado pela API de cardápio de um restaurante, pela API em lote e pela
+página de favoritos, para que todos devolvam o mesmo formato.
+"""
+
+import hashlib
+import json
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import Restaurant, Dish
+from . import thumbnails
+
+
+# Quantidade máxima de restaurantes por requisição em lote
+MENU_BATCH_MAX = getattr(settings, 'PUCEATS_MENU_BATCH_MAX', 50)
+
+# Tempo de vida do JSON pronto de cada cardápio no cache
+MENU_CACHE_TIMEOUT = getattr(settings, 'PUCEATS_MENU_CACHE_TIMEOUT', 60 * 60)
+
+HITS_KEY = 'puceats:menu:hits'
+MISSES_KEY = 'puceats:menu:misses'
+
+
+def parse_ids(ids_param, limit=None):
+    """Converte "1,2,3" em [1, 2, 3], sem repetidos e respeitando o limite"""
+    limit = MENU_BATCH_MAX if limit is None else limit
+    ids = []
+    seen = set()
+    for value in (ids_param or '').split(','):
+        if len(ids) >= limit:
+            break
+        value = value.strip()
+        # isascii: isdigit() aceita "²", que o int() recusa
+        if value.isascii() and value.isdigit() and int(value) not in seen:
+            seen.add(int(value))
+            ids.append(int(value))
+    return ids
+
+
+def load_menus(ids):
+    """
+    Busca os restaurantes com seus pratos em número fixo de queries:
+    uma para os restaurantes e uma para pratos + categorias.
+    Mantém a ordem dos ids pedidos.
+    """
+    if not ids:
+        return []
+    dishes = Dish.objects.select_related('category')
+    restaurants = Restaurant.objects.filter(id__in=ids).prefetch_related(
+        Prefetch('dishes', queryset=dishes)
+    )
+    by_id = {restaurant.id: restaurant for restaurant in restaurants}
+    return [by_id[id] for id in ids if id in by_id]
+
+
+def serialize_dish(dish):
+    image = thumbnails.urls(dish.image, thumbnails.LARGE)
+    return {
+        'id': dish.id,
+        'name': dish.name,
+        'description': dish.description,
+        'price': str(dish.price),
+        'image': dish.image.url if dish.image else None,
+        'image_thumb': image['thumb'],
+        'image_webp': image['webp'],
+        'category': dish.category.name if dish.category else None,
+        'is_vegan': dish.is_vegan,
+        'is_vegetarian': dish.is_vegetarian,
+        'is_gluten_free': dish.is_gluten_free,
+    }
+
+
+def serialize_restaurant(restaurant, dishes):
+    logo = thumbnails.urls(restaurant.logo, thumbnails.LARGE)
+    return {
+        'id': restaurant.id,
+        'name': restaurant.name,
+        'logo': restaurant.logo.url if restaurant.logo else None,
+        'logo_thumb': logo['thumb'],
+        'logo_webp': logo['webp'],
+        'establishment_type': restaurant.get_establishment_type_display(),
+        'cuisine_type': restaurant.get_cuisine_type_display(),
+        'building': restaurant.building if restaurant.building else None,
+        'description': restaurant.description if restaurant.description else None,
+        'opening_hours': restaurant.opening_hours if restaurant.opening_hours else None,
+        'phone': restaurant.phone if restaurant.phone else None,
+        'dishes': [serialize_dish(dish) for dish in dishes],
+    }
+
+
+# === Cache do JSON do cardápio ===
+#
+# Cada restaurante tem uma "versão" no cache; o corpo pronto fica guardado
+# sob (id, versão). Alterar um prato/restaurante/categoria troca a versão
+# apenas dos restaurantes afetados, e o corpo antigo deixa de ser usado.
+
+def _version_key(restaurant_id):
+    return f'puceats:menu:version:{restaurant_id}'
+
+
+def _body_key(restaurant_id, version):
+    return f'puceats:menu:body:{restaurant_id}:{version}'
+
+
+def get_version(restaurant_id):
+    key = _version_key(restaurant_id)
+    version = cache.get(key)
+    if version is None:
+        # Valor aleatório: se a chave sumir do cache, nunca reaproveita um corpo antigo
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(*restaurant_ids):
+    """Troca a versão dos restaurantes informados"""
+    cache.set_many(
+        {_version_key(id): uuid.uuid4().hex for id in restaurant_ids if id is not None},
+        None,
+    )
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def get_cached_menu(restaurant_id):
+    """Retorna (etag, corpo) do cache ou None, sem acessar o banco"""
+    cached = cache.get(_body_key(restaurant_id, get_version(restaurant_id)))
+    _count(HITS_KEY if cached is not None else MISSES_KEY)
+    return cached
+
+
+def _menu_body(restaurant, dishes):
+    data = {'success': True, **serialize_restaurant(restaurant, dishes)}
+    body = json.dumps(data, cls=DjangoJSONEncoder).encode()
+    return '"{}"'.format(hashlib.sha1(body).hexdigest()), body
+
+
+def build_cached_menu(restaurant):
+    """Serializa o cardápio, guarda no cache e retorna (etag, corpo)"""
+    # Lê a versão antes do banco: uma alteração no meio do caminho troca a
+    # versão e o corpo guardado aqui simplesmente não é mais encontrado
+    version = get_version(restaurant.id)
+    dishes = Dish.objects.filter(restaurant=restaurant).select_related('category')
+    etag, body = _menu_body(restaurant, dishes)
+    cache.set(_body_key(restaurant.id, version), (etag, body), MENU_CACHE_TIMEOUT)
+    return etag, body
+
+
+# === Versões assíncronas (views *_async, servidas por ASGI) ===
+#
+# As leituras de cache de get_cached_menu/get_version vão juntas numa ida só
+# à thread do sync_to_async; o banco usa o ORM assíncrono.
+
+async def aget_cached_menu(restaurant_id):
+    return await sync_to_async(get_cached_menu)(restaurant_id)
+
+
+async def abuild_cached_menu(restaurant):
+    version = await sync_to_async(get_version)(restaurant.id)
+    dishes = [dish async for dish in Dish.objects.filter(restaurant=restaurant).select_related('category')]
+    etag, body = _menu_body(restaurant, dishes)
+    await cache.aset(_body_key(restaurant.id, version), (etag, body), MENU_CACHE_TIMEOUT)
+    return etag, body
+
+
+async def aload_menus(ids):
+    """load_menus com o ORM assíncrono (as mesmas duas queries)"""
+    if not ids:
+        return []
+    dishes = Dish.objects.select_related('category')
+    restaurants = Restaurant.objects.filter(id__in=ids).prefetch_related(
+        Prefetch('dishes', queryset=dishes)
+    )
+    by_id = {restaurant.id: restaurant async for restaurant in restaurants}
+    return [by_id[id] for id in ids if id in by_id]
+
+
+def cache_stats():
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
@@ -33,40 +33,11 @@ class Migration(migrations.Migration):
         ('puceats', '0001_initial'),
     ]
 
+    # Token, owner e establishment_type já são criados pela 0001_initial (que
+    # foi regerada depois desta): repeti-los aqui quebrava o migrate num banco
+    # novo com "table puceats_token already exists". Os bancos antigos já
+    # têm esta migração aplicada e não são afetados.
     operations = [
-        # Criar model Token
-        migrations.CreateModel(
-            name='Token',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('code', models.CharField(editable=False, max_length=32, unique=True)),
-                ('is_used', models.BooleanField(default=False, verbose_name='Já foi usado?')),
-                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
-                ('expires_at', models.DateTimeField(verbose_name='Expira em')),
-                ('used_at', models.DateTimeField(blank=True, null=True, verbose_name='Usado em')),
-                ('used_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tokens_used', to=settings.AUTH_USER_MODEL, verbose_name='Usado por')),
-            ],
-            options={
-                'verbose_name': 'Token',
-                'verbose_name_plural': 'Tokens',
-                'ordering': ['-created_at'],
-            },
-        ),
-        
-        # Adicionar campo owner no Restaurant
-        migrations.AddField(
-            model_name='restaurant',
-            name='owner',
-            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='restaurants', to=settings.AUTH_USER_MODEL, verbose_name='Proprietário'),
-        ),
-        
-        # Adicionar campo establishment_type no Restaurant
-        migrations.AddField(
-            model_name='restaurant',
-            name='establishment_type',
-            field=models.CharField(choices=[('restaurante', 'Restaurante'), ('lanchonete', 'Lanchonete'), ('barraca', 'Barraca')], default='restaurante', max_length=20, verbose_name='Tipo de Estabelecimento'),
-        ),
-        
         # Atribuir restaurantes existentes ao superusuário
         migrations.RunPython(atribuir_restaurantes_ao_superusuario),
     ]
@@ -0,0 +1,78 @@
+import unicodedata
+
+from django.db import migrations
+
+
+# Congelados aqui: a migração não pode depender de como puceats/search.py e
+# Restaurant.CUISINE_TYPES estiverem no futuro
+CUISINE_LABELS = {
+    "brasileira": "Brasileira",
+    "japonesa": "Japonesa",
+    "italiana": "Italiana",
+    "árabe": "Árabe",
+    "vegana": "Vegana",
+    "cafeteria": "Cafeteria",
+    "lanches": "Lanches",
+    "internacional": "Internacional",
+    "outros": "Outros",
+}
+
+CREATE_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS puceats_search USING fts5(
+        text,
+        kind UNINDEXED,
+        restaurant_id UNINDEXED,
+        dish_id UNINDEXED,
+        label UNINDEXED,
+        tokenize = 'trigram'
+    )
+"""
+
+INSERT = (
+    "INSERT INTO puceats_search (text, kind, restaurant_id, dish_id, label) "
+    "VALUES (%s, %s, %s, %s, %s)"
+)
+
+
+def normalize_text(text):
+    decomposed = unicodedata.normalize("NFD", text or "")
+    return "".join(c for c in decomposed if not "\u0300" <= c <= "\u036f").lower()
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    Restaurant = apps.get_model("puceats", "Restaurant")
+    Dish = apps.get_model("puceats", "Dish")
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE)
+        for r in Restaurant.objects.iterator():
+            cursor.executemany(INSERT, [
+                (normalize_text(r.name), "name", r.id, None, r.name),
+                (normalize_text(CUISINE_LABELS.get(r.cuisine_type, r.cuisine_type)), "cuisine", r.id, None, r.name),
+                (normalize_text(r.building or "Campus PUC"), "location", r.id, None, r.name),
+            ])
+        for d in Dish.objects.iterator():
+            cursor.executemany(INSERT, [
+                (normalize_text(d.name), "dish_name", d.restaurant_id, d.id, d.name),
+                (normalize_text(d.description), "dish_description", d.restaurant_id, d.id, d.name),
+            ])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS puceats_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("puceats", "0004_marker"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
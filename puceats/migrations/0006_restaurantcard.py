@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def preencher_resumos(apps, schema_editor):
+    """Cria o resumo de cada restaurante já existente"""
+    Restaurant = apps.get_model("puceats", "Restaurant")
+    Dish = apps.get_model("puceats", "Dish")
+    RestaurantCard = apps.get_model("puceats", "RestaurantCard")
+
+    totals = Dish.objects.values("restaurant_id").annotate(
+        dish_count=Count("id"),
+        available_dish_count=Count("id", filter=Q(available=True)),
+        vegan_count=Count("id", filter=Q(is_vegan=True)),
+        vegetarian_count=Count("id", filter=Q(is_vegetarian=True)),
+        gluten_free_count=Count("id", filter=Q(is_gluten_free=True)),
+        price_total=Sum("price"),
+        min_price=Min("price"),
+        max_price=Max("price"),
+    )
+    totals = {row.pop("restaurant_id"): row for row in totals}
+
+    category_counts = {}
+    rows = Dish.objects.filter(category__isnull=False).values(
+        "restaurant_id", "category__name"
+    ).annotate(total=Count("id"))
+    for row in rows:
+        category_counts.setdefault(row["restaurant_id"], {})[row["category__name"]] = row["total"]
+
+    RestaurantCard.objects.bulk_create([
+        RestaurantCard(
+            restaurant_id=restaurant.id,
+            name=restaurant.name,
+            establishment_type=restaurant.establishment_type,
+            owner_name=(restaurant.owner.first_name or restaurant.owner.username) if restaurant.owner else "",
+            category_counts=category_counts.get(restaurant.id, {}),
+            **totals.get(restaurant.id, {}),
+        )
+        for restaurant in Restaurant.objects.select_related("owner")
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('puceats', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantCard',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='puceats.restaurant', verbose_name='Restaurante')),
+                ('name', models.CharField(max_length=120, verbose_name='Nome')),
+                ('establishment_type', models.CharField(choices=[('restaurante', 'Restaurante'), ('lanchonete', 'Lanchonete'), ('barraca', 'Barraca')], default='restaurante', max_length=20, verbose_name='Tipo de Estabelecimento')),
+                ('owner_name', models.CharField(blank=True, max_length=150, verbose_name='Proprietário')),
+                ('dish_count', models.PositiveIntegerField(default=0, verbose_name='Pratos')),
+                ('available_dish_count', models.PositiveIntegerField(default=0, verbose_name='Pratos disponíveis')),
+                ('vegan_count', models.PositiveIntegerField(default=0, verbose_name='Pratos veganos')),
+                ('vegetarian_count', models.PositiveIntegerField(default=0, verbose_name='Pratos vegetarianos')),
+                ('gluten_free_count', models.PositiveIntegerField(default=0, verbose_name='Pratos sem glúten')),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Soma dos preços')),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True, verbose_name='Menor preço')),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True, verbose_name='Maior preço')),
+                ('category_counts', models.JSONField(blank=True, default=dict, verbose_name='Pratos por categoria')),
+            ],
+            options={
+                'verbose_name': 'Resumo de Restaurante',
+                'verbose_name_plural': 'Resumos de Restaurantes',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(preencher_resumos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('puceats', '0006_restaurantcard'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['name', 'id'], name='puceats_dish_name_id'),
+        ),
+    ]
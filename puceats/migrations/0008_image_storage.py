@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:31
+
+import puceats.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('puceats', '0007_dish_name_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dish',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=puceats.storage.ContentAddressedStorage(), upload_to='pratos/', verbose_name='Imagem'),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='logo',
+            field=models.ImageField(blank=True, null=True, storage=puceats.storage.ContentAddressedStorage(), upload_to='restaurantes/logos/', verbose_name='Logo'),
+        ),
+    ]
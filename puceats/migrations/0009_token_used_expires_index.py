@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('puceats', '0008_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='token',
+            index=models.Index(fields=['is_used', 'expires_at'], name='puceats_token_used_expires'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+# auth_user é do django.contrib.auth: o índice é criado por aqui para o
+# login por email (puceats/backends.py) e o cadastro não varrerem a tabela
+EMAIL_INDEX = models.Index(fields=["email"], name="puceats_auth_user_email")
+
+
+def create_email_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model("auth", "User"), EMAIL_INDEX)
+
+
+def drop_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model("auth", "User"), EMAIL_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("puceats", "0009_token_used_expires_index"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_email_index, drop_email_index),
+    ]
@@ -0,0 +1,93 @@
+from django.db import migrations
+
+
+# Passa o índice de busca para FTS5 de conteúdo externo sobre uma tabela
+# comum com índice em restaurant_id e dish_id (ver puceats/search.py). As
+# linhas já normalizadas são copiadas da tabela antiga, sem reprocessar os
+# modelos. DDL congelado aqui, como na 0005.
+FORWARD = [
+    """
+    CREATE TABLE puceats_search_rows (
+        id INTEGER PRIMARY KEY,
+        text TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        restaurant_id INTEGER NOT NULL,
+        dish_id INTEGER,
+        label TEXT NOT NULL
+    )
+    """,
+    """
+    INSERT INTO puceats_search_rows (text, kind, restaurant_id, dish_id, label)
+    SELECT text, kind, CAST(restaurant_id AS INTEGER), CAST(dish_id AS INTEGER), label
+    FROM puceats_search
+    """,
+    "CREATE INDEX puceats_search_rows_restaurant ON puceats_search_rows (restaurant_id)",
+    "CREATE INDEX puceats_search_rows_dish ON puceats_search_rows (dish_id)",
+    "DROP TABLE puceats_search",
+    """
+    CREATE VIRTUAL TABLE puceats_search USING fts5(
+        text,
+        kind UNINDEXED,
+        restaurant_id UNINDEXED,
+        dish_id UNINDEXED,
+        label UNINDEXED,
+        content = 'puceats_search_rows',
+        content_rowid = 'id',
+        tokenize = 'trigram'
+    )
+    """,
+    "INSERT INTO puceats_search (puceats_search) VALUES ('rebuild')",
+    """
+    CREATE TRIGGER puceats_search_rows_insert AFTER INSERT ON puceats_search_rows BEGIN
+        INSERT INTO puceats_search (rowid, text, kind, restaurant_id, dish_id, label)
+        VALUES (new.id, new.text, new.kind, new.restaurant_id, new.dish_id, new.label);
+    END
+    """,
+    """
+    CREATE TRIGGER puceats_search_rows_delete AFTER DELETE ON puceats_search_rows BEGIN
+        INSERT INTO puceats_search (puceats_search, rowid, text, kind, restaurant_id, dish_id, label)
+        VALUES ('delete', old.id, old.text, old.kind, old.restaurant_id, old.dish_id, old.label);
+    END
+    """,
+]
+
+BACKWARD = [
+    "DROP TABLE puceats_search",
+    """
+    CREATE VIRTUAL TABLE puceats_search USING fts5(
+        text,
+        kind UNINDEXED,
+        restaurant_id UNINDEXED,
+        dish_id UNINDEXED,
+        label UNINDEXED,
+        tokenize = 'trigram'
+    )
+    """,
+    """
+    INSERT INTO puceats_search (text, kind, restaurant_id, dish_id, label)
+    SELECT text, kind, restaurant_id, dish_id, label FROM puceats_search_rows
+    """,
+    # Leva junto os índices e os triggers
+    "DROP TABLE puceats_search_rows",
+]
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        with schema_editor.connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("puceats", "0010_auth_user_email_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(run(FORWARD), run(BACKWARD)),
+    ]
@@ -5,6 +5,16 @@ from django.utils import timezone
 from datetime import timedelta
 import secrets
 
+from .storage import image_storage
+
+
+TOKEN_VALID_DAYS = 30
+
+
+def generate_token_code():
+    """Código alfanumérico sem caracteres especiais (128 bits aleatórios)"""
+    return secrets.token_hex(16).upper()
+
 
 class Token(models.Model):
     code = models.CharField(max_length=32, unique=True, editable=False)
@@ -23,6 +33,8 @@ class Token(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        # Tokens disponíveis/vencidos (admin, purge_tokens); a busca por code usa o unique
+        indexes = [models.Index(fields=["is_used", "expires_at"], name="puceats_token_used_expires")]
         verbose_name = "Token"
         verbose_name_plural = "Tokens"
 
@@ -32,10 +44,9 @@ class Token(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.code:
-            # Gerar código alfanumérico sem caracteres especiais
-            self.code = secrets.token_hex(16).upper()[:32]
+            self.code = generate_token_code()
         if not self.expires_at:
-            self.expires_at = timezone.now() + timedelta(days=30)
+            self.expires_at = timezone.now() + timedelta(days=TOKEN_VALID_DAYS)
         super().save(*args, **kwargs)
 
     def is_valid(self):
@@ -79,7 +90,7 @@ class Restaurant(models.Model):
     name = models.CharField(max_length=120, unique=True, verbose_name="Nome")
     slug = models.SlugField(unique=True, blank=True)
 
-    logo = models.ImageField(upload_to="restaurantes/logos/", blank=True, null=True, verbose_name="Logo")
+    logo = models.ImageField(upload_to="restaurantes/logos/", storage=image_storage, blank=True, null=True, verbose_name="Logo")
 
     description = models.TextField(blank=True, help_text="Descrição curta do restaurante")
     cuisine_type = models.CharField(max_length=30, choices=CUISINE_TYPES, default="outros")
@@ -156,12 +167,14 @@ class Dish(models.Model):
     is_gluten_free = models.BooleanField(default=False, verbose_name="Sem Glúten")
 
     available = models.BooleanField(default=True, verbose_name="Disponível")
-    image = models.ImageField(upload_to="pratos/", blank=True, null=True, verbose_name="Imagem")
+    image = models.ImageField(upload_to="pratos/", storage=image_storage, blank=True, null=True, verbose_name="Imagem")
 
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
 
     class Meta:
         ordering = ["name"]
+        # Paginação por cursor em (name, id) na API de pratos
+        indexes = [models.Index(fields=["name", "id"], name="puceats_dish_name_id")]
         verbose_name = "Prato"
         verbose_name_plural = "Pratos"
 
@@ -221,3 +234,60 @@ class Marker(models.Model):
         if self.restaurant:
             return f"Marcador: {self.restaurant.name}"
         return self.name
+
+
+class RestaurantCard(models.Model):
+    """
+    Resumo desnormalizado de um restaurante para as páginas de listagem.
+
+    Mantido pelos signals de Dish/Restaurant (ver cards.py),
+    para que as listagens leiam uma única tabela sem contar pratos por linha.
+    """
+    restaurant = models.OneToOneField(
+        Restaurant,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="card",
+        verbose_name="Restaurante"
+    )
+
+    # Cópia dos campos do restaurante usados nas listagens
+    name = models.CharField(max_length=120, verbose_name="Nome")
+    establishment_type = models.CharField(
+        max_length=20,
+        choices=Restaurant.ESTABLISHMENT_TYPES,
+        default="restaurante",
+        verbose_name="Tipo de Estabelecimento"
+    )
+    owner_name = models.CharField(max_length=150, blank=True, verbose_name="Proprietário")
+
+    dish_count = models.PositiveIntegerField(default=0, verbose_name="Pratos")
+    available_dish_count = models.PositiveIntegerField(default=0, verbose_name="Pratos disponíveis")
+    vegan_count = models.PositiveIntegerField(default=0, verbose_name="Pratos veganos")
+    vegetarian_count = models.PositiveIntegerField(default=0, verbose_name="Pratos vegetarianos")
+    gluten_free_count = models.PositiveIntegerField(default=0, verbose_name="Pratos sem glúten")
+
+    price_total = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Soma dos preços")
+    min_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, verbose_name="Menor preço")
+    max_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, verbose_name="Maior preço")
+
+    # {"nome da categoria": quantidade de pratos}
+    category_counts = models.JSONField(default=dict, blank=True, verbose_name="Pratos por categoria")
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name = "Resumo de Restaurante"
+        verbose_name_plural = "Resumos de Restaurantes"
+
+    def __str__(self):
+        return f"Resumo: {self.name}"
+
+    @property
+    def avg_price(self):
+        if not self.dish_count:
+            return None
+        return round(self.price_total / self.dish_count, 2)
+
+    @property
+    def categories(self):
+        return sorted(self.category_counts)
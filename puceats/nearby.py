@@ -0,0 +1,212 @@
+"""
+Busca dos pontos mais próximos (marcadores e restaurantes) de uma coordenada.
+
+Os pontos são convertidos para coordenadas cartesianas na esfera unitária e
+guardados numa KD-tree em memória. A distância em linha reta (corda) cresce
+junto com a distância pela superfície, então a ordem da KD-tree é a mesma
+da haversine; a distância devolvida é a haversine exata.
+
+O índice é montado na primeira consulta e remontado quando a versão no
+cache muda (signals de Marker/Restaurant chamam invalidate()).
+"""
+
+import heapq
+import math
+import threading
+import uuid
+
+from django.core.cache import cache
+
+
+EARTH_RADIUS_M = 6371008.8
+
+# Quantidade de pontos por folha da árvore
+LEAF_SIZE = 8
+
+VERSION_KEY = 'puceats:nearby:version'
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Distância em metros entre duas coordenadas"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def to_xyz(lat, lng):
+    phi = math.radians(lat)
+    lam = math.radians(lng)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def chord_for_distance(meters):
+    """Corda (na esfera unitária) equivalente a uma distância na superfície"""
+    angle = meters / EARTH_RADIUS_M
+    if angle >= math.pi:
+        return 2.0
+    return 2 * math.sin(angle / 2)
+
+
+class KDTree:
+    """
+    KD-tree estática em 3 dimensões com folhas de até LEAF_SIZE pontos.
+
+    Nós internos: (eixo, valor de corte, esquerda, direita)
+    Folhas: lista de índices em `points`
+    """
+
+    def __init__(self, points):
+        self.points = points
+        self.root = self._build(list(range(len(points))), 0) if points else None
+
+    def __len__(self):
+        return len(self.points)
+
+    def _build(self, indexes, depth):
+        if len(indexes) <= LEAF_SIZE:
+            return indexes
+        axis = depth % 3
+        indexes.sort(key=lambda i: self.points[i][axis])
+        mid = len(indexes) // 2
+        return (
+            axis,
+            self.points[indexes[mid]][axis],
+            self._build(indexes[:mid], depth + 1),
+            self._build(indexes[mid:], depth + 1),
+        )
+
+    def query(self, target, k, max_distance=None):
+        """
+        Retorna até k pares (distância², índice) mais próximos do alvo,
+        do mais perto para o mais longe. `max_distance` limita a corda.
+        """
+        if self.root is None or k <= 0:
+            return []
+        points = self.points
+        tx, ty, tz = target
+        limit = math.inf if max_distance is None else max_distance * max_distance
+        heap = []  # (-distância², índice): o topo é o pior dos k atuais
+
+        # Pilha de (nó, distância² mínima possível até a região do nó)
+        stack = [(self.root, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if bound > limit:
+                continue
+            if type(node) is list:
+                for i in node:
+                    px, py, pz = points[i]
+                    d2 = (px - tx) ** 2 + (py - ty) ** 2 + (pz - tz) ** 2
+                    if d2 > limit:
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d2, i))
+                        if len(heap) == k:
+                            limit = -heap[0][0]
+                    elif d2 < limit:
+                        heapq.heapreplace(heap, (-d2, i))
+                        limit = -heap[0][0]
+                continue
+
+            axis, split, left, right = node
+            diff = target[axis] - split
+            near, far = (left, right) if diff < 0 else (right, left)
+            # O lado distante é empilhado primeiro para o próximo sair antes;
+            # só é visitado se ainda puder ter algo dentro do limite
+            if diff * diff <= limit:
+                stack.append((far, diff * diff))
+            stack.append((near, bound))
+
+        return sorted((-negative_d2, i) for negative_d2, i in heap)
+
+
+class NearbyIndex:
+    def __init__(self, entries):
+        # entries: dicts com pelo menos 'lat' e 'lng'
+        self.entries = entries
+        self.tree = KDTree([to_xyz(e['lat'], e['lng']) for e in entries])
+
+    def nearest(self, lat, lng, k=10, radius=None):
+        max_chord = chord_for_distance(radius) if radius is not None else None
+        results = []
+        for _, i in self.tree.query(to_xyz(lat, lng), k, max_chord):
+            entry = self.entries[i]
+            distance = haversine(lat, lng, entry['lat'], entry['lng'])
+            if radius is not None and distance > radius:
+                continue
+            results.append({**entry, 'distance_m': round(distance, 1)})
+        return results
+
+
+def load_entries():
+    """Marcadores ativos e restaurantes com coordenadas que não têm marcador ativo"""
+    from .models import Marker, Restaurant
+
+    # Coordenadas digitadas erradas (fora do globo) ficam de fora do índice
+    valid = {'latitude__range': (-90, 90), 'longitude__range': (-180, 180)}
+
+    entries = []
+    with_marker = set()
+    markers = Marker.objects.filter(is_active=True, **valid).values(
+        'id', 'name', 'marker_type', 'latitude', 'longitude', 'restaurant_id'
+    )
+    for marker in markers:
+        if marker['restaurant_id']:
+            with_marker.add(marker['restaurant_id'])
+        entries.append({
+            'type': 'marker',
+            'id': marker['id'],
+            'name': marker['name'],
+            'marker_type': marker['marker_type'],
+            'restaurant_id': marker['restaurant_id'],
+            'lat': marker['latitude'],
+            'lng': marker['longitude'],
+        })
+
+    restaurants = Restaurant.objects.filter(**valid).values('id', 'name', 'latitude', 'longitude')
+    for restaurant in restaurants:
+        if restaurant['id'] in with_marker:
+            continue
+        entries.append({
+            'type': 'restaurant',
+            'id': restaurant['id'],
+            'name': restaurant['name'],
+            'marker_type': None,
+            'restaurant_id': restaurant['id'],
+            'lat': restaurant['latitude'],
+            'lng': restaurant['longitude'],
+        })
+    return entries
+
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+def invalidate():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_index():
+    """Índice atual do processo, remontado se outro processo alterou os pontos"""
+    global _index, _index_version
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    if _index is not None and _index_version == version:
+        return _index
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = NearbyIndex(load_entries())
+            _index_version = version
+    return _index
+
+
+def nearest(lat, lng, k=10, radius=None):
+    return get_index().nearest(lat, lng, k, radius)
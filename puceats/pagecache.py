@@ -0,0 +1,173 @@
+"""
+Cache de página inteira para visitantes anônimos (index e listagens).
+
+Cada página guardada (chave = caminho + query string) leva as tags do que
+mostra: os restaurantes, os resumos (RestaurantCard) e os tipos de
+estabelecimento. Cada tag tem uma versão no cache; purge() troca a versão
+e só as páginas com aquela tag deixam de valer. A versão começa pelo
+horário do purge: uma página lida da réplica só é guardada se a cópia da
+réplica começou depois do último purge de todas as tags dela.
+
+Não entram no cache: usuários logados, quem tem mensagem pendente, quem
+acabou de escrever (cookie da réplica) e respostas que usaram o token CSRF
+ou definiram cookies.
+"""
+
+import functools
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+
+from . import replica
+
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PUCEATS_PAGE_CACHE_TIMEOUT', 10 * 60)
+
+ALL_TAG = 'all'
+GENERATION_KEY = 'puceats:page:generation'
+
+
+def restaurant_tag(restaurant_id):
+    return f'restaurant:{restaurant_id}'
+
+
+def card_tag(restaurant_id):
+    return f'card:{restaurant_id}'
+
+
+def type_tag(establishment_type):
+    return f'type:{establishment_type}'
+
+
+def _tag_key(tag):
+    return f'puceats:page:tag:{tag}'
+
+
+def _page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'puceats:page:body:{request.method}:{path}'
+
+
+def _new_version(purged_at):
+    return f'{purged_at!r}:{uuid.uuid4().hex}'
+
+
+def _purged_at(version):
+    try:
+        return float(version.split(':', 1)[0])
+    except ValueError:
+        return 0.0
+
+
+def _current_versions(tags):
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    for key in missing:
+        # Tag nunca invalidada: não barra páginas lidas de nenhuma cópia
+        cache.add(key, _new_version(0.0), None)
+    if missing:
+        found.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in found.items()}
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def purge(*tags):
+    """Invalida as páginas que têm qualquer uma das tags"""
+    new_versions = {_tag_key(tag): _new_version(time.time()) for tag in tags if tag}
+    if new_versions:
+        # A geração impede guardar uma página renderizada durante o purge
+        new_versions[GENERATION_KEY] = uuid.uuid4().hex
+        cache.set_many(new_versions, None)
+
+
+def purge_all():
+    purge(ALL_TAG)
+
+
+def add_tags(request, *tags):
+    """Chamado pela view com o que a página mostra"""
+    if hasattr(request, '_page_cache_tags'):
+        request._page_cache_tags.update(tags)
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated or replica.PIN_COOKIE in request.COOKIES:
+        return False
+    # base.html mostra (e consome) as mensagens pendentes
+    return not len(messages.get_messages(request))
+
+
+def _is_cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def _is_fresh(tags):
+    """A página não veio de uma cópia da réplica anterior a um purge das suas tags"""
+    snapshot = replica.snapshot_read()
+    return snapshot is None or all(_purged_at(version) < snapshot for version in tags.values())
+
+
+def _not_modified(request, last_modified):
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and since >= last_modified
+
+
+def _with_headers(response, last_modified):
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def cache_public_page(view):
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _is_cacheable_request(request):
+            return view(request, *args, **kwargs)
+
+        key = _page_key(request)
+        entry = cache.get(key)
+        if entry is not None and _current_versions(entry['tags']) == entry['tags']:
+            if _not_modified(request, entry['last_modified']):
+                return _with_headers(HttpResponseNotModified(), entry['last_modified'])
+            response = HttpResponse(entry['content'], content_type=entry['content_type'])
+            return _with_headers(response, entry['last_modified'])
+
+        generation = _generation()
+        request._page_cache_tags = {ALL_TAG}
+        response = view(request, *args, **kwargs)
+        if not _is_cacheable_response(request, response):
+            return response
+
+        # Versões lidas depois da view: se algo mudou no meio, a geração mudou
+        tags = _current_versions(request._page_cache_tags)
+        last_modified = int(time.time())
+        if _generation() == generation and _is_fresh(tags):
+            cache.set(key, {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'tags': tags,
+                'last_modified': last_modified,
+            }, PAGE_CACHE_TIMEOUT)
+        return _with_headers(response, last_modified)
+    return wrapper
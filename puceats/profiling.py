@@ -0,0 +1,196 @@
+"""
+Medição por requisição: tempo total, número e tempo das queries e tempo de
+renderização de templates, no header Server-Timing:
+
+    Server-Timing: total;dur=41.2, db;dur=12.8;desc="9 queries", tpl;dur=20.1
+
+Vem ligada só com DEBUG (PUCEATS_PROFILING_ENABLED): o header vai para
+qualquer cliente e serviria de oráculo de tempo num site público. Desligada,
+o middleware sai da cadeia e não instala nada nas conexões nem nos templates.
+
+Para staff (PUCEATS_PROFILE_STAFF) ou para uma fração das requisições
+(PUCEATS_PROFILE_SAMPLE_RATE), a view roda sob o cProfile e o resultado vai
+para PUCEATS_PROFILE_DIR/<nome da URL>/<horário>-<ms>-<pid>.prof (abrir com
+python -m pstats ou snakeviz).
+
+Sem amostragem, o custo é um contextvar e dois perf_counter por query e
+por template (ver benchmarks/bench_profiling.py).
+"""
+
+import contextvars
+import cProfile
+import functools
+import logging
+import os
+import random
+import time
+from datetime import datetime
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template import base as template_base
+
+
+logger = logging.getLogger(__name__)
+
+ENABLED = getattr(settings, 'PUCEATS_PROFILING_ENABLED', settings.DEBUG)
+SAMPLE_RATE = getattr(settings, 'PUCEATS_PROFILE_SAMPLE_RATE', 0.0)
+PROFILE_STAFF = getattr(settings, 'PUCEATS_PROFILE_STAFF', False)
+PROFILE_DIR = getattr(settings, 'PUCEATS_PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+
+# Medições da requisição atual (dict mutável, para o wrapper de SQL e o de
+# templates escreverem no mesmo lugar)
+_request_state = contextvars.ContextVar('puceats_profiling_state', default=None)
+
+
+def _new_state():
+    return {'queries': 0, 'sql': 0.0, 'template': 0.0, 'depth': 0}
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    state = _request_state.get()
+    if state is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        state['sql'] += time.perf_counter() - start
+        state['queries'] += 1
+
+
+def _install_sql_wrapper(connection, **kwargs):
+    # As conexões são por thread (e a do ORM assíncrono é a da thread do
+    # sync_to_async): o wrapper fica em cada uma, e fora de uma requisição
+    # medida ele só repassa a query
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+def install_sql_wrapper():
+    connection_created.connect(_install_sql_wrapper, dispatch_uid='puceats_profiling_sql')
+    for connection in connections.all(initialized_only=True):
+        _install_sql_wrapper(connection)
+
+
+def _timed_render(render):
+    @functools.wraps(render)
+    def wrapper(self, context):
+        state = _request_state.get()
+        # {% include %} e {% extends %} também chamam render: só o de fora conta
+        if state is None or state['depth']:
+            return render(self, context)
+        state['depth'] += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            state['template'] += time.perf_counter() - start
+            state['depth'] -= 1
+    wrapper._puceats_profiling = True
+    return wrapper
+
+
+def install_template_timer():
+    if not getattr(template_base.Template.render, '_puceats_profiling', False):
+        template_base.Template.render = _timed_render(template_base.Template.render)
+
+
+def server_timing(total, state):
+    return (
+        f'total;dur={total * 1000:.1f}, '
+        f'db;dur={state["sql"] * 1000:.1f};desc="{state["queries"]} queries", '
+        f'tpl;dur={state["template"] * 1000:.1f}'
+    )
+
+
+def _profile_path(request, total):
+    match = request.resolver_match
+    name = match.view_name.replace(':', '.') if match else 'sem-rota'
+    directory = os.path.join(PROFILE_DIR, name)
+    os.makedirs(directory, exist_ok=True)
+    filename = f'{datetime.now():%Y%m%d-%H%M%S-%f}-{total * 1000:.0f}ms-{os.getpid()}.prof'
+    return os.path.join(directory, filename)
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        # Desligada, sai da cadeia antes de instalar os wrappers de SQL e template
+        if not ENABLED:
+            raise MiddlewareNotUsed
+        install_sql_wrapper()
+        install_template_timer()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        sampled = self._sampled()
+        if not sampled and PROFILE_STAFF:
+            sampled = self._is_staff(getattr(request, 'user', None))
+        profiler = cProfile.Profile() if sampled else None
+        state = _new_state()
+        token = _request_state.set(state)
+        start = time.perf_counter()
+        profiler = self._enable(profiler)
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            _request_state.reset(token)
+        return self._finish(request, response, time.perf_counter() - start, state, profiler)
+
+    async def __acall__(self, request):
+        # Igual ao síncrono. As queries do ORM assíncrono rodam na thread do
+        # sync_to_async, que recebe uma cópia do contexto (e o mesmo state)
+        sampled = self._sampled()
+        if not sampled and PROFILE_STAFF and hasattr(request, 'auser'):
+            # request.user faria a query de forma síncrona
+            sampled = self._is_staff(await request.auser())
+        profiler = cProfile.Profile() if sampled else None
+        state = _new_state()
+        token = _request_state.set(state)
+        start = time.perf_counter()
+        profiler = self._enable(profiler)
+        try:
+            response = await self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            _request_state.reset(token)
+        return self._finish(request, response, time.perf_counter() - start, state, profiler)
+
+    def _enable(self, profiler):
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:
+                # Outro profiler já ativo no processo
+                return None
+        return profiler
+
+    def _finish(self, request, response, total, state, profiler):
+        response['Server-Timing'] = server_timing(total, state)
+        if profiler is not None:
+            try:
+                profiler.dump_stats(_profile_path(request, total))
+            except OSError:
+                logger.exception('Falha ao gravar o perfil de %s', request.path)
+        return response
+
+    def _sampled(self):
+        return bool(SAMPLE_RATE) and random.random() < SAMPLE_RATE
+
+    def _is_staff(self, user):
+        return bool(user and user.is_staff)
@@ -0,0 +1,287 @@
+"""
+Réplica somente leitura do SQLite para as páginas públicas.
+
+- ReplicaRouter: leituras das views marcadas com @replica_reads vão para o
+  alias "replica"; todas as escritas vão para "default".
+- ReplicaMiddleware: quem acabou de escrever recebe um cookie com o horário
+  da escrita e continua lendo do primário até a réplica ser atualizada
+  depois desse horário (read-your-writes).
+- refresh(): copia o primário para a réplica com a API de backup online do
+  SQLite. Pelo comando refresh_replica (cron) ou numa thread do processo,
+  agendada depois de PUCEATS_REPLICA_REFRESH_WRITES escritas ou quando a
+  réplica passa de PUCEATS_REPLICA_MAX_AGE segundos: a cópia não roda
+  dentro da requisição que cruzou o limite. As escritas são somadas no
+  processo e levadas ao cache no máximo a cada
+  PUCEATS_REPLICA_CHECK_INTERVAL segundos.
+
+O cache é consultado uma vez por requisição, no middleware; o roteador só
+lê o estado da requisição, sem I/O por query.
+
+A cópia não limpa o cache de páginas: o pagecache não guarda uma página
+lida da réplica se alguma tag dela foi invalidada depois do início da
+cópia (ver snapshot_read()).
+
+Views que guardam resultado no cache (cardápio, tiles, nearby) continuam no
+primário: um JSON montado da réplica desatualizada ficaria no cache sob a
+versão nova.
+"""
+
+import contextvars
+import functools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+REPLICA = 'replica'
+PRIMARY = 'default'
+
+PIN_COOKIE = 'puceats_primary'
+PIN_SECONDS = getattr(settings, 'PUCEATS_REPLICA_PIN_SECONDS', 10 * 60)
+REFRESH_WRITES = getattr(settings, 'PUCEATS_REPLICA_REFRESH_WRITES', 50)
+MAX_AGE = getattr(settings, 'PUCEATS_REPLICA_MAX_AGE', 5 * 60)
+CHECK_INTERVAL = getattr(settings, 'PUCEATS_REPLICA_CHECK_INTERVAL', 1)
+
+WRITES_KEY = 'puceats:replica:writes'
+REFRESHED_KEY = 'puceats:replica:refreshed_at'
+LOCK_KEY = 'puceats:replica:lock'
+
+# Atualização em segundo plano: uma thread por processo, uma cópia por vez
+_executor = None
+_scheduled = False
+_lock = threading.Lock()
+# Escritas ainda não somadas no cache e próxima conferência (time.monotonic)
+_pending_writes = 0
+_next_check = 0.0
+
+# Estado da requisição atual (um dict mutável, para a view e o roteador
+# enxergarem as mesmas mudanças)
+_request_state = contextvars.ContextVar('puceats_replica_state', default=None)
+
+
+# === Atualização ===
+
+def refreshed_at():
+    """Horário (time.time) do início da última cópia, ou None se não há réplica"""
+    value = cache.get(REFRESHED_KEY)
+    if value is None:
+        # Abrir uma conexão já cria o arquivo, então só vale se tiver tabelas
+        path = connections[REPLICA].settings_dict['NAME']
+        try:
+            value = os.path.getmtime(path)
+            conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+            try:
+                tables = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+            finally:
+                conn.close()
+        except (OSError, sqlite3.Error):
+            return None
+        if not tables:
+            return None
+        cache.add(REFRESHED_KEY, value, None)
+    return value
+
+
+def refresh():
+    """Copia o primário para a réplica. Retorna False se outra cópia já está rodando"""
+    if not cache.add(LOCK_KEY, 1, 60):
+        return False
+    try:
+        started = time.time()
+        source = sqlite3.connect(connections[PRIMARY].settings_dict['NAME'])
+        target = sqlite3.connect(connections[REPLICA].settings_dict['NAME'])
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        cache.set(REFRESHED_KEY, started, None)
+        cache.set(WRITES_KEY, 0, None)
+        return True
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def _count_writes(count):
+    try:
+        return cache.incr(WRITES_KEY, count)
+    except ValueError:
+        cache.add(WRITES_KEY, 0, None)
+        return cache.incr(WRITES_KEY, count)
+
+
+def _refresh_in_background():
+    global _scheduled
+    try:
+        refresh()
+    except Exception:
+        logger.exception('Falha ao atualizar a réplica')
+    finally:
+        with _lock:
+            _scheduled = False
+
+
+def schedule_refresh():
+    """Agenda refresh() numa thread do processo (ignora se já há uma agendada)"""
+    global _executor, _scheduled
+    with _lock:
+        if _scheduled:
+            return False
+        _scheduled = True
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='puceats-replica')
+    _executor.submit(_refresh_in_background)
+    return True
+
+
+def maybe_refresh(wrote, last):
+    """Agenda a cópia se a réplica passou do limite de escritas ou de idade"""
+    global _pending_writes, _next_check
+    now = time.monotonic()
+    with _lock:
+        if wrote:
+            _pending_writes += 1
+        # Entre uma conferência e outra, nem o cache é consultado
+        if now < _next_check:
+            return
+        _next_check = now + CHECK_INTERVAL
+        pending, _pending_writes = _pending_writes, 0
+    writes = _count_writes(pending) if pending else cache.get(WRITES_KEY, 0)
+    if last is None or writes >= REFRESH_WRITES or time.time() - last >= MAX_AGE:
+        schedule_refresh()
+
+
+# === Roteamento ===
+
+def snapshot_read():
+    """
+    Horário de início da cópia da qual a requisição atual leu, ou None se
+    ela não leu da réplica (ou não está dentro do ReplicaMiddleware)
+    """
+    state = _request_state.get()
+    if state and state['used']:
+        return state['last']
+    return None
+
+
+def replica_reads(view):
+    """Marca uma view pública (síncrona ou assíncrona) cujas leituras podem vir da réplica"""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            state = _request_state.get()
+            if state is None:
+                return await view(request, *args, **kwargs)
+            previous = state['replica']
+            state['replica'] = True
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                state['replica'] = previous
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _request_state.get()
+        if state is None:
+            return view(request, *args, **kwargs)
+        previous = state['replica']
+        state['replica'] = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state['replica'] = previous
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state and state['replica'] and state['ready'] and not state['pinned'] and not state['wrote']:
+            state['used'] = True
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state['wrote'] = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # As duas pontas são o mesmo banco
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        last = refreshed_at()
+        state = self._new_state(request, last)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        self._after(response, state)
+        maybe_refresh(state['wrote'], last)
+        return response
+
+    async def __acall__(self, request):
+        # refreshed_at() e maybe_refresh() mexem no cache e em arquivos: fora do loop
+        last = await sync_to_async(refreshed_at)()
+        state = self._new_state(request, last)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        self._after(response, state)
+        await sync_to_async(maybe_refresh)(state['wrote'], last)
+        return response
+
+    def _new_state(self, request, last):
+        return {
+            'replica': False,
+            'ready': last is not None,
+            'pinned': self._is_pinned(request, last),
+            'wrote': False,
+            'used': False,
+            'last': last,
+        }
+
+    def _after(self, response, state):
+        if state['wrote']:
+            response.set_cookie(PIN_COOKIE, f'{time.time():.3f}', max_age=PIN_SECONDS, httponly=True, samesite='Lax')
+
+    def _is_pinned(self, request, last):
+        try:
+            wrote_at = float(request.COOKIES[PIN_COOKIE])
+        except (KeyError, ValueError):
+            return False
+        return last is None or wrote_at >= last
@@ -0,0 +1,274 @@
+"""
+Busca de restaurantes e pratos sem acento, no servidor.
+
+Mantém uma tabela FTS5 (tokenizer trigram) com um texto normalizado por
+campo pesquisável. As linhas ficam numa tabela comum (puceats_search_rows,
+com índice em restaurant_id e dish_id) e o FTS5 é de conteúdo externo
+sobre ela, mantido por triggers: reindexar ou apagar um prato acha as
+linhas pelo índice, em vez de varrer o FTS inteiro pelas colunas
+UNINDEXED. A normalização e a regra de "todas as palavras precisam
+aparecer no mesmo campo" são as mesmas do normalizeText/smartMatch do
+index.html, então o resultado da API bate com o filtro que existia no JS.
+"""
+
+import unicodedata
+
+from django.db import connection
+
+
+TABLE = 'puceats_search'
+# Linhas do índice; o FTS5 guarda só os trigramas e lê o resto daqui
+ROWS_TABLE = 'puceats_search_rows'
+
+# Campos indexados: (kind, função que extrai o texto)
+RESTAURANT_FIELDS = [
+    ('name', lambda r: r.name),
+    ('cuisine', lambda r: r.get_cuisine_type_display()),
+    ('location', lambda r: r.building or 'Campus PUC'),
+]
+DISH_FIELDS = [
+    ('dish_name', lambda d: d.name),
+    ('dish_description', lambda d: d.description),
+]
+
+# O trigram só acelera termos com 3+ caracteres; os menores viram LIKE
+MIN_MATCH_LENGTH = 3
+
+# Ids por DELETE ... IN (...) no index_dishes
+DELETE_CHUNK = 500
+
+
+def normalize_text(text):
+    """Remove acentos e deixa minúsculo (equivalente ao normalizeText do JS)"""
+    decomposed = unicodedata.normalize('NFD', text or '')
+    return ''.join(c for c in decomposed if not '\u0300' <= c <= '\u036f').lower()
+
+
+def split_terms(query):
+    return [term for term in normalize_text(query).split() if term]
+
+
+def is_available(conn=None):
+    conn = conn or connection
+    return conn.vendor == 'sqlite'
+
+
+def create_table(conn=None):
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {ROWS_TABLE} (
+                id INTEGER PRIMARY KEY,
+                text TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                restaurant_id INTEGER NOT NULL,
+                dish_id INTEGER,
+                label TEXT NOT NULL
+            )
+        """)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {ROWS_TABLE}_restaurant ON {ROWS_TABLE} (restaurant_id)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {ROWS_TABLE}_dish ON {ROWS_TABLE} (dish_id)")
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+                text,
+                kind UNINDEXED,
+                restaurant_id UNINDEXED,
+                dish_id UNINDEXED,
+                label UNINDEXED,
+                content = '{ROWS_TABLE}',
+                content_rowid = 'id',
+                tokenize = 'trigram'
+            )
+        """)
+        # Linhas não são alteradas: reindexar é apagar e inserir de novo
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {ROWS_TABLE}_insert AFTER INSERT ON {ROWS_TABLE} BEGIN
+                INSERT INTO {TABLE} (rowid, text, kind, restaurant_id, dish_id, label)
+                VALUES (new.id, new.text, new.kind, new.restaurant_id, new.dish_id, new.label);
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {ROWS_TABLE}_delete AFTER DELETE ON {ROWS_TABLE} BEGIN
+                INSERT INTO {TABLE} ({TABLE}, rowid, text, kind, restaurant_id, dish_id, label)
+                VALUES ('delete', old.id, old.text, old.kind, old.restaurant_id, old.dish_id, old.label);
+            END
+        """)
+
+
+def drop_table(conn=None):
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        # Leva junto os índices e os triggers
+        cursor.execute(f"DROP TABLE IF EXISTS {ROWS_TABLE}")
+
+
+def _restaurant_rows(restaurant):
+    return [
+        (normalize_text(extract(restaurant)), kind, restaurant.id, None, restaurant.name)
+        for kind, extract in RESTAURANT_FIELDS
+    ]
+
+
+def _dish_rows(dish):
+    return [
+        (normalize_text(extract(dish)), kind, dish.restaurant_id, dish.id, dish.name)
+        for kind, extract in DISH_FIELDS
+    ]
+
+
+def _insert(cursor, rows):
+    cursor.executemany(
+        f"INSERT INTO {ROWS_TABLE} (text, kind, restaurant_id, dish_id, label) VALUES (%s, %s, %s, %s, %s)",
+        rows,
+    )
+
+
+def index_restaurant(restaurant):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {ROWS_TABLE} WHERE restaurant_id = %s AND dish_id IS NULL",
+            [restaurant.id],
+        )
+        _insert(cursor, _restaurant_rows(restaurant))
+
+
+def unindex_restaurant(restaurant_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {ROWS_TABLE} WHERE restaurant_id = %s", [restaurant_id])
+
+
+def index_dish(dish):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {ROWS_TABLE} WHERE dish_id = %s", [dish.id])
+        _insert(cursor, _dish_rows(dish))
+
+
+def index_dishes(dishes, replace=True):
+    """Indexa vários pratos de uma vez (import_menu, lote do CRUD)"""
+    if not is_available() or not dishes:
+        return
+    if replace:
+        unindex_dishes([dish.id for dish in dishes])
+    with connection.cursor() as cursor:
+        _insert(cursor, [row for dish in dishes for row in _dish_rows(dish)])
+
+
+def unindex_dishes(dish_ids):
+    # Um DELETE por bloco, pelo índice de dish_id
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for start in range(0, len(dish_ids), DELETE_CHUNK):
+            ids = dish_ids[start:start + DELETE_CHUNK]
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(f"DELETE FROM {ROWS_TABLE} WHERE dish_id IN ({placeholders})", ids)
+
+
+def unindex_dish(dish_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {ROWS_TABLE} WHERE dish_id = %s", [dish_id])
+
+
+def rebuild(restaurants, dishes, conn=None):
+    """Recria o índice inteiro a partir dos querysets informados"""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {ROWS_TABLE}")
+        for restaurant in restaurants.iterator():
+            _insert(cursor, _restaurant_rows(restaurant))
+        for dish in dishes.iterator():
+            _insert(cursor, _dish_rows(dish))
+
+
+def _build_where(terms):
+    """
+    Monta o WHERE: termos longos vão para o MATCH (um AND entre frases),
+    termos curtos viram LIKE sobre o texto já normalizado.
+    """
+    long_terms = [t for t in terms if len(t) >= MIN_MATCH_LENGTH]
+    short_terms = [t for t in terms if len(t) < MIN_MATCH_LENGTH]
+
+    clauses = []
+    params = []
+    if long_terms:
+        clauses.append(f"{TABLE} MATCH %s")
+        params.append(' AND '.join('"{}"'.format(t.replace('"', '""')) for t in long_terms))
+    for term in short_terms:
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        clauses.append("text LIKE %s ESCAPE '\\'")
+        params.append(f'%{escaped}%')
+    return ' AND '.join(clauses), params
+
+
+def _scan(terms):
+    """Busca sem índice (bancos que não são SQLite): varre as tabelas em Python"""
+    from .models import Restaurant, Dish
+
+    def matches(text):
+        normalized = normalize_text(text)
+        return all(term in normalized for term in terms)
+
+    rows = []
+    for restaurant in Restaurant.objects.all():
+        if any(matches(extract(restaurant)) for _, extract in RESTAURANT_FIELDS):
+            rows.append((restaurant.id, None, restaurant.name))
+    for dish in Dish.objects.only('id', 'restaurant_id', 'name', 'description'):
+        if any(matches(extract(dish)) for _, extract in DISH_FIELDS):
+            rows.append((dish.restaurant_id, dish.id, dish.name))
+    return rows
+
+
+def search(query):
+    """
+    Retorna os restaurantes que batem com a busca, na ordem dos ids.
+
+    Cada item traz se o match foi no próprio restaurante, quantos pratos
+    bateram e o nome do primeiro prato (pela ordem do cardápio).
+    """
+    terms = split_terms(query)
+    if not terms:
+        return []
+
+    if is_available():
+        where, params = _build_where(terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT restaurant_id, dish_id, label FROM {TABLE} WHERE {where}",
+                params,
+            )
+            rows = cursor.fetchall()
+    else:
+        rows = _scan(terms)
+
+    results = {}
+    for restaurant_id, dish_id, label in rows:
+        entry = results.setdefault(int(restaurant_id), {
+            'id': int(restaurant_id),
+            'restaurant_match': False,
+            'dishes': {},
+        })
+        if dish_id is None:
+            entry['restaurant_match'] = True
+        else:
+            entry['dishes'][int(dish_id)] = label
+
+    output = []
+    for restaurant_id in sorted(results):
+        entry = results[restaurant_id]
+        dishes = sorted(entry['dishes'].items(), key=lambda item: (item[1], item[0]))
+        output.append({
+            'id': restaurant_id,
+            'restaurant_match': entry['restaurant_match'],
+            'dish_count': len(dishes),
+            'first_dish': dishes[0][1] if dishes else None,
+        })
+    return output
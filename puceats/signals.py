@@ -0,0 +1,239 @@
+import functools
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Restaurant, Dish, Category, Marker, RestaurantCard
+from . import cards, live, menus, nearby, pagecache, search, thumbnails, tiles
+
+
+def _deleted_with_restaurant(origin):
+    # origin é a instância ou o queryset que iniciou o delete em cascata
+    return getattr(origin, 'model', type(origin)) is Restaurant
+
+
+def _restaurant_position(values):
+    return tiles.restaurant_position(values.get('latitude'), values.get('longitude'), values.get('building'))
+
+
+def _marker_position(values):
+    if values.get('latitude') is None or values.get('longitude') is None:
+        return None
+    return (values['latitude'], values['longitude'])
+
+
+def _file_name(value):
+    # No __dict__ o campo de arquivo pode estar como str ou FieldFile
+    return getattr(value, 'name', value) or ''
+
+
+def _schedule_thumbnails(instance, field, on_ready):
+    """Agenda os derivados depois do commit, se a imagem mudou"""
+    name = _file_name(getattr(instance, field))
+    loaded_attr = f'_loaded_{field}'
+    if name and name != getattr(instance, loaded_attr, None):
+        transaction.on_commit(lambda: thumbnails.schedule(name, on_ready))
+    setattr(instance, loaded_attr, name)
+
+
+def _after_commit(func, *args):
+    """
+    Invalidações de cache só depois do commit: antes dele, uma leitura
+    concorrente remontaria o cache com as linhas antigas sob a versão nova.
+    Os argumentos são avaliados agora (os _loaded_* mudam logo em seguida).
+    """
+    transaction.on_commit(functools.partial(func, *args))
+
+
+def _publish(events):
+    if events:
+        transaction.on_commit(lambda: live.publish(events))
+
+
+def _restaurant_positions(*restaurant_ids):
+    rows = Restaurant.objects.filter(id__in=[id for id in restaurant_ids if id]).values(
+        'latitude', 'longitude', 'building'
+    )
+    return [_restaurant_position(row) for row in rows]
+
+
+@receiver(post_init, sender=Restaurant)
+def restaurant_loaded(sender, instance, **kwargs):
+    # Posição original, para invalidar os tiles de onde o restaurante saiu
+    instance._loaded_position = _restaurant_position(instance.__dict__)
+    instance._loaded_type = instance.__dict__.get('establishment_type')
+    instance._loaded_logo = _file_name(instance.__dict__.get('logo'))
+    instance._loaded_live = live.loaded_values(instance, live.RESTAURANT_FIELDS)
+
+
+@receiver(post_save, sender=Restaurant)
+def restaurant_saved(sender, instance, created, **kwargs):
+    search.index_restaurant(instance)
+    _after_commit(menus.invalidate, instance.id)
+    cards.sync_restaurant(instance)
+    _after_commit(nearby.invalidate)
+
+    # Nome/cozinha aparecem no tile do marcador do restaurante também
+    marker_positions = [
+        _marker_position(row)
+        for row in Marker.objects.filter(restaurant_id=instance.id).values('latitude', 'longitude')
+    ]
+    position = _restaurant_position(instance.__dict__)
+    _after_commit(tiles.invalidate_positions, instance._loaded_position, position, *marker_positions)
+    instance._loaded_position = position
+
+    # Entrar/sair de uma listagem muda as páginas do tipo; o resto só as que mostram o restaurante
+    tags = [pagecache.restaurant_tag(instance.id)]
+    if created or instance._loaded_type != instance.establishment_type:
+        tags += [pagecache.type_tag(instance._loaded_type), pagecache.type_tag(instance.establishment_type)]
+    _after_commit(pagecache.purge, *tags)
+    instance._loaded_type = instance.establishment_type
+
+    # Quando as miniaturas ficam prontas, as URLs mudam nos caches que mostram o logo
+    restaurant_id = instance.id
+    tile_positions = [position, *marker_positions]
+
+    def logo_ready():
+        menus.invalidate(restaurant_id)
+        pagecache.purge(pagecache.restaurant_tag(restaurant_id))
+        tiles.invalidate_positions(*tile_positions)
+
+    _schedule_thumbnails(instance, 'logo', logo_ready)
+
+    if not created:
+        _publish([
+            live.event(instance.id, field, value)
+            for field, value in live.changes(instance._loaded_live, instance, live.RESTAURANT_FIELDS)
+        ])
+    instance._loaded_live = live.loaded_values(instance, live.RESTAURANT_FIELDS)
+
+
+@receiver(post_delete, sender=Restaurant)
+def restaurant_deleted(sender, instance, **kwargs):
+    search.unindex_restaurant(instance.id)
+    _after_commit(menus.invalidate, instance.id)
+    _after_commit(nearby.invalidate)
+    _after_commit(tiles.invalidate_positions, instance._loaded_position)
+    _after_commit(pagecache.purge, pagecache.restaurant_tag(instance.id), pagecache.type_tag(instance.establishment_type))
+    _publish([live.event(instance.id, 'deleted')])
+
+
+@receiver(post_init, sender=Dish)
+def dish_loaded(sender, instance, **kwargs):
+    # Guarda o restaurante original para invalidar os dois lados quando o prato muda de restaurante
+    # (lido do __dict__ para não disparar query quando o campo foi adiado com .only())
+    instance._loaded_restaurant_id = instance.__dict__.get('restaurant_id')
+    instance._loaded_state = cards.dish_state(instance)
+    instance._loaded_image = _file_name(instance.__dict__.get('image'))
+    instance._loaded_live = live.loaded_values(instance, live.DISH_FIELDS)
+
+
+@receiver(post_save, sender=Dish)
+def dish_saved(sender, instance, created, **kwargs):
+    search.index_dish(instance)
+    _after_commit(menus.invalidate, instance.restaurant_id, instance._loaded_restaurant_id)
+
+    # Só reconta o resumo se algum campo dele mudou (ou não dá para saber)
+    new = cards.dish_state(instance)
+    if created or new is None or new != instance._loaded_state:
+        cards.recount(instance.restaurant_id, instance._loaded_restaurant_id)
+
+    # Trocar de restaurante é sair de um cardápio e entrar em outro
+    if created or instance._loaded_restaurant_id != instance.restaurant_id:
+        events = [live.event(instance.restaurant_id, 'created', dish_id=instance.id)]
+        if not created:
+            events.append(live.event(instance._loaded_restaurant_id, 'deleted', dish_id=instance.id))
+    else:
+        events = [
+            live.event(instance.restaurant_id, field, value, instance.id)
+            for field, value in live.changes(instance._loaded_live, instance, live.DISH_FIELDS)
+        ]
+    _publish(events)
+
+    instance._loaded_restaurant_id = instance.restaurant_id
+    instance._loaded_state = new
+    instance._loaded_live = live.loaded_values(instance, live.DISH_FIELDS)
+
+    restaurant_id = instance.restaurant_id
+    _schedule_thumbnails(instance, 'image', lambda: menus.invalidate(restaurant_id))
+
+
+@receiver(post_delete, sender=Dish)
+def dish_deleted(sender, instance, origin=None, **kwargs):
+    search.unindex_dish(instance.id)
+    _after_commit(menus.invalidate, instance.restaurant_id)
+
+    # O resumo do restaurante removido vai junto no cascade (e o evento é um só, do restaurante)
+    if _deleted_with_restaurant(origin):
+        return
+    _publish([live.event(instance.restaurant_id, 'deleted', dish_id=instance.id)])
+    cards.recount(instance.restaurant_id)
+
+
+def _category_restaurant_ids(category):
+    return set(
+        Dish.objects.filter(category=category).values_list('restaurant_id', flat=True).distinct()
+    )
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    if not created:
+        restaurant_ids = _category_restaurant_ids(instance)
+        _after_commit(menus.invalidate, *restaurant_ids)
+        # Os resumos guardam o nome da categoria
+        for restaurant_id in restaurant_ids:
+            cards.refresh(restaurant_id)
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleting(sender, instance, **kwargs):
+    # No post_delete os pratos já estão com category=NULL, então buscamos antes
+    instance._affected_restaurant_ids = _category_restaurant_ids(instance)
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    restaurant_ids = getattr(instance, '_affected_restaurant_ids', ())
+    _after_commit(menus.invalidate, *restaurant_ids)
+    for restaurant_id in restaurant_ids:
+        cards.refresh(restaurant_id)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Ignora saves que não mexem no nome (ex.: last_login a cada login)
+    if created or (update_fields and not {'first_name', 'username'} & set(update_fields)):
+        return
+    cards.sync_owner(instance)
+
+
+@receiver(post_save, sender=RestaurantCard)
+@receiver(post_delete, sender=RestaurantCard)
+def card_changed(sender, instance, **kwargs):
+    _after_commit(pagecache.purge, pagecache.card_tag(instance.restaurant_id))
+
+
+@receiver(post_init, sender=Marker)
+def marker_loaded(sender, instance, **kwargs):
+    instance._loaded_position = _marker_position(instance.__dict__)
+    instance._loaded_restaurant_id = instance.__dict__.get('restaurant_id')
+
+
+@receiver(post_save, sender=Marker)
+@receiver(post_delete, sender=Marker)
+def marker_changed(sender, instance, **kwargs):
+    _after_commit(nearby.invalidate)
+
+    # Um marcador ativo esconde a posição própria do restaurante, então ela muda junto
+    position = _marker_position(instance.__dict__)
+    _after_commit(
+        tiles.invalidate_positions,
+        instance._loaded_position,
+        position,
+        *_restaurant_positions(instance._loaded_restaurant_id, instance.restaurant_id),
+    )
+    instance._loaded_position = position
+    instance._loaded_restaurant_id = instance.restaurant_id
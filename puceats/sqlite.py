@@ -0,0 +1,52 @@
+"""
+PRAGMAs aplicados em cada conexão nova com o SQLite.
+
+O perfil vem de settings.PUCEATS_SQLITE_PROFILE e pode ser ajustado pragma a
+pragma com settings.PUCEATS_SQLITE_PRAGMAS. No perfil "production" o banco
+fica em WAL: leitores não esperam pelo escritor, e quem precisa escrever
+enquanto outro escreve espera até busy_timeout em vez de receber
+"database is locked" na hora.
+"""
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+PROFILES = {
+    # Padrões do SQLite (journal em arquivo, sem espera por lock)
+    'default': {},
+    'production': {
+        # busy_timeout primeiro: a troca de journal_mode também pode esperar lock
+        'busy_timeout': 5000,
+        'journal_mode': 'WAL',
+        # Em WAL, NORMAL só arrisca perder os últimos commits numa queda de energia
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        # Negativo = KiB (aqui 20 MB por conexão)
+        'cache_size': -20000,
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def get_pragmas():
+    profile = getattr(settings, 'PUCEATS_SQLITE_PROFILE', 'default')
+    if profile not in PROFILES:
+        raise ValueError(f'Perfil de SQLite desconhecido: {profile}')
+    return {**PROFILES[profile], **getattr(settings, 'PUCEATS_SQLITE_PRAGMAS', {})}
+
+
+def apply_pragmas(conn, pragmas):
+    cursor = conn.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        apply_pragmas(connection.connection, get_pragmas())
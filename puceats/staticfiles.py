@@ -0,0 +1,159 @@
+"""
+Arquivos estáticos com hash no nome, pré-comprimidos e com cache longo.
+
+- CompressedManifestStorage (STORAGES['staticfiles']): no collectstatic
+  grava os nomes com hash do conteúdo (css/styles.3f9a1c2b.css) e, ao lado
+  de cada arquivo de texto, as versões .gz e .br (esta só com o pacote
+  brotli instalado).
+- StaticFilesMiddleware: serve o STATIC_ROOT escolhendo a variante pelo
+  Accept-Encoding. Arquivos com hash recebem Cache-Control immutable de um
+  ano: o navegador não revalida, e um arquivo novo tem outro nome.
+
+Sem collectstatic (desenvolvimento), {% static %} continua gerando as URLs
+sem hash e o runserver serve os arquivos originais.
+"""
+
+import gzip
+import mimetypes
+import os
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.xml'}
+# Variante comprimida só vale a pena se economizar pelo menos 5%
+MIN_RATIO = 0.95
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Ordem de preferência: (Content-Encoding, extensão)
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def compress(path):
+    """Grava path.gz (e path.br) ao lado do arquivo. Retorna as extensões gravadas"""
+    with open(path, 'rb') as source:
+        data = source.read()
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, mode=brotli.MODE_TEXT)
+
+    written = []
+    for ext, content in variants.items():
+        if len(content) <= len(data) * MIN_RATIO:
+            with open(path + ext, 'wb') as target:
+                target.write(content)
+            written.append(ext)
+        elif os.path.exists(path + ext):
+            os.remove(path + ext)
+    return written
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Depois de todas as passadas: os CSS já têm as URLs com hash
+        names = set(self.hashed_files.values()) | set(paths)
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and self.exists(name):
+                compress(self.path(name))
+
+    def stored_name(self, name):
+        # Arquivo fora do manifest (ou sem collectstatic): URL sem hash
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+def _accepted(request):
+    accept = request.headers.get('Accept-Encoding', '')
+    codings = set()
+    for item in accept.split(','):
+        coding, _, params = item.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        codings.add(coding.strip().lower())
+    return codings
+
+
+class StaticFilesMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.root = settings.STATIC_ROOT
+        hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+        self.hashed = set(hashed_files.values())
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        found = self.find(request)
+        if found is None:
+            return self.get_response(request)
+        return self.serve(request, *found)
+
+    async def __acall__(self, request):
+        found = self.find(request)
+        if found is None:
+            return await self.get_response(request)
+        return self.serve(request, *found)
+
+    def find(self, request):
+        """(nome, caminho) do arquivo pedido no STATIC_ROOT, ou None"""
+        if not self.root or request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefix):
+            return None
+        name = request.path[len(self.prefix):]
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        return name, path
+
+    def serve(self, request, name, path):
+        stat = os.stat(path)
+        immutable = name in self.hashed
+        if not immutable and not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+            return HttpResponseNotModified()
+
+        encoding = None
+        accepted = _accepted(request)
+        for coding, ext in ENCODINGS:
+            if coding in accepted and os.path.isfile(path + ext):
+                encoding, path = coding, path + ext
+                break
+
+        content_type, _ = mimetypes.guess_type(name)
+        response = FileResponse(
+            open(path, 'rb'),
+            content_type=content_type or 'application/octet-stream',
+            filename=os.path.basename(name),
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept-Encoding'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = IMMUTABLE if immutable else 'no-cache'
+        return response
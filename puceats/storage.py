@@ -0,0 +1,100 @@
+"""
+Armazenamento endereçado por conteúdo para Dish.image e Restaurant.logo.
+
+O upload é copiado em blocos (File.chunks) para um arquivo temporário
+enquanto o SHA-256 é calculado, sem carregar o arquivo inteiro na memória.
+O nome final vem do hash:
+
+    foto.JPG -> blobs/3f/3f9a...c2.jpg
+
+Se o blob já existe, o temporário é descartado e o campo aponta para o
+blob existente: a mesma foto enviada várias vezes ocupa o disco uma vez só.
+
+A contagem de referências é feita nos próprios campos (reference_counts);
+blobs sem referência são apagados pelo comando collect_images, depois de um
+período de carência (o arquivo é gravado antes de a linha do banco existir).
+"""
+
+import hashlib
+import os
+import tempfile
+from collections import Counter
+
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+BLOB_DIR = 'blobs'
+
+
+def blob_name(digest, ext):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest}{ext}'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_DIR + '/')
+
+
+def _extension(name):
+    return os.path.splitext(name or '')[1].lower()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # O nome de verdade é decidido em _save, pelo conteúdo
+        return name
+
+    def _save(self, name, content):
+        ext = _extension(name)
+        directory = self.path(BLOB_DIR)
+        os.makedirs(directory, exist_ok=True)
+
+        # Copia e calcula o hash na mesma passada
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as temp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    temp.write(chunk)
+            return self._store(temp_path, digest.hexdigest(), ext)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def save_path(self, path):
+        """Guarda uma cópia de um arquivo local e retorna o nome do blob"""
+        with open(path, 'rb') as source:
+            return self.save(os.path.basename(path), File(source))
+
+    def _store(self, temp_path, digest, ext):
+        name = blob_name(digest, ext)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            # Renova o mtime para o coletor não apagar um blob recém-reutilizado
+            os.utime(full_path)
+            return name
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        file_move_safe(temp_path, full_path, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+
+image_storage = ContentAddressedStorage()
+
+
+def reference_counts():
+    """Counter nome -> quantas linhas (pratos + logos) apontam para o arquivo"""
+    from .models import Restaurant, Dish
+
+    counts = Counter(Dish.objects.exclude(image='').exclude(image=None).values_list('image', flat=True))
+    counts.update(Restaurant.objects.exclude(logo='').exclude(logo=None).values_list('logo', flat=True))
+    return counts
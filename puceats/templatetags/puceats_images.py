@@ -0,0 +1,27 @@
+from django import template
+from django.utils.html import format_html
+
+from .. import thumbnails
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(field_file, alt='', css_class='', size='small'):
+    """
+    <picture> com a variante WebP (quando já gerada) e a miniatura JPEG.
+    Uso: {% picture restaurant.logo restaurant.name %} ou
+    {% picture dish.image dish.name "card-img-top" "large" %}
+    """
+    width = thumbnails.LARGE if size == 'large' else thumbnails.SMALL
+    image = thumbnails.urls(field_file, width)
+    if image['thumb'] is None:
+        return ''
+    img = format_html(
+        '<img src="{}" alt="{}"{} loading="lazy">',
+        image['thumb'], alt, format_html(' class="{}"', css_class) if css_class else '',
+    )
+    if image['webp'] is None:
+        return img
+    return format_html('<picture><source srcset="{}" type="image/webp">{}</picture>', image['webp'], img)
@@ -1 +1,295 @@
-from django.test import TestCase
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.forms.models import model_to_dict
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import cards, listing, menus, search, throttle, tokens
+from .models import Category, Dish, Restaurant, RestaurantCard, Token
+
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class TokenRedeemTests(TestCase):
+    def setUp(self):
+        self.code = tokens.issue(1)[0]
+        self.user = User.objects.create_user('dono', 'dono@puceats.test')
+
+    def test_redeem_marks_the_token_used(self):
+        tokens.redeem(self.code.lower(), self.user)
+        token = Token.objects.get(code=self.code)
+        self.assertTrue(token.is_used)
+        self.assertEqual(token.used_by, self.user)
+
+    def test_second_redeem_is_refused(self):
+        other = User.objects.create_user('outro', 'outro@puceats.test')
+        tokens.redeem(self.code, self.user)
+        with self.assertRaises(tokens.TokenError) as error:
+            tokens.redeem(self.code, other)
+        self.assertEqual(error.exception.reason, 'used')
+        self.assertEqual(Token.objects.get(code=self.code).used_by, self.user)
+
+    def test_stale_read_does_not_let_a_second_redeem_through(self):
+        # Os dois cadastros passaram pelo check antes de qualquer um resgatar
+        tokens.check(self.code)
+        tokens.check(self.code)
+        tokens.redeem(self.code, self.user)
+        with self.assertRaises(tokens.TokenError):
+            tokens.redeem(self.code, User.objects.create_user('outro'))
+
+    def test_rollback_gives_the_token_back(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                tokens.redeem(self.code, self.user)
+                raise RuntimeError
+        self.assertFalse(Token.objects.get(code=self.code).is_used)
+
+    def test_expired_and_unknown_tokens(self):
+        Token.objects.filter(code=self.code).update(expires_at=timezone.now() - timedelta(days=1))
+        with self.assertRaises(tokens.TokenError) as error:
+            tokens.check(self.code)
+        self.assertEqual(error.exception.reason, 'expired')
+        with self.assertRaises(tokens.TokenError) as error:
+            tokens.redeem('NAOEXISTE', self.user)
+        self.assertEqual(error.exception.reason, 'not_found')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class EmailOrUsernameBackendTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ana', 'ana@puceats.test', 'senha-certa')
+
+    def test_username_or_email(self):
+        self.assertEqual(authenticate(username='ana', password='senha-certa'), self.user)
+        self.assertEqual(authenticate(username='ana@puceats.test', password='senha-certa'), self.user)
+
+    def test_wrong_password_and_unknown_account(self):
+        self.assertIsNone(authenticate(username='ana', password='errada'))
+        self.assertIsNone(authenticate(username='ninguem@puceats.test', password='senha-certa'))
+
+    def test_exact_username_wins_over_email(self):
+        # Alguém cujo username é o email de outra conta
+        impostor = User.objects.create_user('ana@puceats.test', 'x@puceats.test', 'outra')
+        self.assertEqual(authenticate(username='ana@puceats.test', password='outra'), impostor)
+        self.assertIsNone(authenticate(username='ana@puceats.test', password='senha-certa'))
+
+    def test_oldest_account_with_the_email(self):
+        User.objects.create_user('ana2', 'ana@puceats.test', 'senha-certa')
+        self.assertEqual(authenticate(username='ana@puceats.test', password='senha-certa'), self.user)
+
+    def test_inactive_user(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(authenticate(username='ana', password='senha-certa'))
+
+
+class ThrottleTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        # Início de uma janela
+        self.start = throttle.WINDOW * 1000
+
+    def test_fixed_window_limit(self):
+        results = [throttle.hit('ip', '10.0.0.1', 3, self.start + i) for i in range(4)]
+        self.assertEqual(results[:3], [None, None, None])
+        self.assertEqual(results[3], throttle.WINDOW - 3)
+
+    def test_previous_window_is_weighted(self):
+        for i in range(3):
+            throttle.hit('ip', '10.0.0.1', 3, self.start + i)
+        # Metade da janela anterior ainda conta: 3 * 0.5 + 1 cabe, 3 * 0.5 + 2 não
+        middle = self.start + throttle.WINDOW + throttle.WINDOW // 2
+        self.assertIsNone(throttle.hit('ip', '10.0.0.1', 3, middle))
+        self.assertEqual(throttle.hit('ip', '10.0.0.1', 3, middle), throttle.WINDOW // 2)
+
+    def test_refused_attempts_are_not_counted(self):
+        for i in range(10):
+            throttle.hit('ip', '10.0.0.1', 3, self.start + i)
+        # Só as 4 primeiras foram contadas (a 4ª estourou): na janela seguinte,
+        # com peso 0.5, 4 * 0.5 + 1 ainda cabe
+        middle = self.start + throttle.WINDOW + throttle.WINDOW // 2
+        self.assertIsNone(throttle.hit('ip', '10.0.0.1', 3, middle))
+
+    def test_scopes_and_values_are_separate(self):
+        for i in range(3):
+            throttle.hit('ip', '10.0.0.1', 3, self.start + i)
+        self.assertIsNone(throttle.hit('ip', '10.0.0.2', 3, self.start))
+        self.assertIsNone(throttle.hit('identifier', '10.0.0.1', 3, self.start))
+
+    def test_reset_and_refund(self):
+        for i in range(3):
+            throttle.hit('identifier', 'ana', 3, self.start + i)
+        throttle.reset('identifier', 'ana', self.start + 3)
+        self.assertIsNone(throttle.hit('identifier', 'ana', 3, self.start + 4))
+        throttle.hit('ip', '10.0.0.1', 1, self.start)
+        throttle.refund('ip', '10.0.0.1', self.start)
+        self.assertIsNone(throttle.hit('ip', '10.0.0.1', 1, self.start + 1))
+
+
+class CursorTests(TestCase):
+    def test_cursor_round_trip(self):
+        for name, id in (('Açaí', 1), ('', 2), ('x' * 120, 2 ** 63 - 1)):
+            self.assertEqual(listing.decode_cursor(listing.encode_cursor(name, id)), (name, id))
+
+    def test_invalid_cursors(self):
+        for cursor in ('', '!!!', listing.encode_cursor('a', 0), listing.encode_cursor('a', 2 ** 63),
+                       listing.encode_cursor('a', True), listing.encode_cursor(1, 1)):
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                listing.decode_cursor(cursor)
+
+    def test_pages_cover_every_dish_once_in_order(self):
+        restaurant = Restaurant.objects.create(name='Cantina')
+        # Nomes repetidos atravessam as páginas
+        for name in ['Suco', 'Pão', 'Suco', 'Açaí', 'Suco', 'Pão', 'Bolo']:
+            Dish.objects.create(restaurant=restaurant, name=name, price=Decimal('5.00'))
+
+        seen = []
+        cursor = None
+        while True:
+            items, cursor = listing.list_dishes({'limit': '2', 'fields': 'id', 'cursor': cursor})
+            seen += [item['id'] for item in items]
+            if cursor is None:
+                break
+        expected = list(Dish.objects.order_by('name', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+
+class ParseIdsTests(SimpleTestCase):
+    def test_order_duplicates_and_garbage(self):
+        self.assertEqual(menus.parse_ids('3, 1,3,x,,-2,²,2', limit=10), [3, 1, 2])
+
+    def test_limit(self):
+        self.assertEqual(menus.parse_ids(','.join(str(i) for i in range(100)), limit=3), [0, 1, 2])
+        self.assertEqual(menus.parse_ids('1,1,1,1,2', limit=2), [1, 2])
+
+    def test_empty(self):
+        self.assertEqual(menus.parse_ids(None), [])
+        self.assertEqual(menus.parse_ids(''), [])
+
+
+class RestaurantCardTests(TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name='Cantina')
+        self.other = Restaurant.objects.create(name='Quiosque')
+        self.drinks = Category.objects.create(name='Bebidas')
+        self.food = Category.objects.create(name='Pratos')
+        self.dishes = [
+            Dish.objects.create(restaurant=self.restaurant, category=self.drinks, name='Suco', price=Decimal('6.50')),
+            Dish.objects.create(restaurant=self.restaurant, category=self.food, name='Salada', price=Decimal('18.00'),
+                                is_vegan=True, is_vegetarian=True, is_gluten_free=True),
+            Dish.objects.create(restaurant=self.restaurant, category=self.food, name='Feijoada', price=Decimal('32.90')),
+        ]
+
+    def assertCardMatchesRefresh(self, restaurant):
+        current = model_to_dict(RestaurantCard.objects.get(restaurant=restaurant))
+        cards.refresh(restaurant.id)
+        self.assertEqual(current, model_to_dict(RestaurantCard.objects.get(restaurant=restaurant)))
+
+    def test_created_dishes(self):
+        self.assertCardMatchesRefresh(self.restaurant)
+        card = RestaurantCard.objects.get(restaurant=self.restaurant)
+        self.assertEqual(card.dish_count, 3)
+        self.assertEqual(card.category_counts, {'Bebidas': 1, 'Pratos': 2})
+        self.assertEqual((card.min_price, card.max_price), (Decimal('6.50'), Decimal('32.90')))
+
+    def test_stale_instances(self):
+        # Duas cópias do mesmo prato carregadas antes de qualquer save
+        first = Dish.objects.get(pk=self.dishes[1].pk)
+        second = Dish.objects.get(pk=self.dishes[1].pk)
+        first.available = False
+        first.save()
+        second.is_vegan = False
+        second.price = Decimal('1.00')
+        second.save()
+        self.assertCardMatchesRefresh(self.restaurant)
+
+    def test_move_delete_and_category_change(self):
+        dish = self.dishes[2]
+        dish.restaurant = self.other
+        dish.category = self.drinks
+        dish.save()
+        self.assertCardMatchesRefresh(self.restaurant)
+        self.assertCardMatchesRefresh(self.other)
+
+        self.dishes[0].delete()
+        self.assertCardMatchesRefresh(self.restaurant)
+        self.food.delete()
+        self.assertCardMatchesRefresh(self.restaurant)
+
+        Dish.objects.filter(restaurant=self.restaurant).delete()
+        card = RestaurantCard.objects.get(restaurant=self.restaurant)
+        self.assertEqual((card.dish_count, card.min_price, card.max_price), (0, None, None))
+        self.assertCardMatchesRefresh(self.restaurant)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.cafe = Restaurant.objects.create(name='Café Árabe', cuisine_type='árabe', building='Frings')
+        self.cantina = Restaurant.objects.create(name='Cantina', building='')
+        self.dish = Dish.objects.create(restaurant=self.cantina, name='Pão de Queijo', price=Decimal('4.00'),
+                                        description='Feito na hora, sem glúten')
+
+    def ids(self, query):
+        return [entry['id'] for entry in search.search(query)]
+
+    def test_normalize_text(self):
+        self.assertEqual(search.normalize_text('Pão de Açúcar À LA CARTE'), 'pao de acucar a la carte')
+        self.assertEqual(search.split_terms('  Café   árabe '), ['cafe', 'arabe'])
+
+    def test_accents_and_fields(self):
+        self.assertEqual(self.ids('cafe'), [self.cafe.id])
+        self.assertEqual(self.ids('ARABE'), [self.cafe.id])
+        self.assertEqual(self.ids('campus puc'), [self.cantina.id])
+        self.assertEqual(self.ids('gluten'), [self.cantina.id])
+        # As palavras precisam aparecer no mesmo campo
+        self.assertEqual(self.ids('cafe frings'), [])
+
+    def test_short_terms(self):
+        entry = search.search('pa')
+        self.assertEqual([e['id'] for e in entry], [self.cantina.id])
+        self.assertEqual(entry[0]['first_dish'], 'Pão de Queijo')
+
+    def test_index_matches_scan(self):
+        for query in ('cafe', 'queijo', 'pa', 'a', 'hora gluten', 'frings', 'nada'):
+            with self.subTest(query=query):
+                scan = sorted({row[0] for row in search._scan(search.split_terms(query))})
+                self.assertEqual(self.ids(query), scan)
+
+    def test_reindex_and_delete(self):
+        self.dish.name = 'Coxinha'
+        self.dish.save()
+        self.assertEqual(self.ids('queijo'), [])
+        self.assertEqual(self.ids('coxinha'), [self.cantina.id])
+        self.dish.delete()
+        self.assertEqual(self.ids('coxinha'), [])
+        self.cafe.delete()
+        self.assertEqual(self.ids('cafe'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {search.TABLE} ({search.TABLE}) VALUES ('integrity-check')")
+
+
+class MergeDatabasesTests(SimpleTestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='puceats-test-merge-')
+        self.addCleanup(shutil.rmtree, self.workdir, ignore_errors=True)
+        self.sources = []
+        for name in ('a.sqlite3', 'b.sqlite3'):
+            path = os.path.join(self.workdir, name)
+            sqlite3.connect(path).close()
+            self.sources.append(path)
+
+    def test_set_based_and_resume_need_a_single_source(self):
+        for option in ('set_based', 'resume'):
+            with self.subTest(option=option):
+                with self.assertRaisesMessage(CommandError, 'apenas uma origem'):
+                    call_command('merge_databases', *self.sources, **{option: True})
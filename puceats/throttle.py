@@ -0,0 +1,200 @@
+"""
+Limite de tentativas no login e no cadastro, que custam um hash de senha
+cada. Um ataque de força bruta ou credential stuffing não deve ocupar os
+workers só com PBKDF2.
+
+Cada tentativa (POST) conta em duas janelas deslizantes: a do IP e a do
+identificador digitado (email/usuário). Passou do limite em qualquer uma,
+a view nem é chamada: volta 429 com Retry-After, antes de qualquer hash.
+A tentativa é contada antes da view (requisições em paralelo não passam
+todas pelo limite), mas só as que falham ficam: se a view chama
+succeeded(), a tentativa sai da conta do IP e a do identificador é zerada.
+
+A janela deslizante é aproximada com dois contadores de janela fixa (a
+atual e a anterior, ponderada pelo quanto dela ainda cai na janela). Os
+contadores ficam no cache padrão, com cache.add/cache.incr; se o cache
+falhar, um dicionário do processo faz o mesmo papel. O cache precisa ser
+compartilhado (PUCEATS_REDIS_URL): com o LocMem cada worker conta sozinho
+e o check puceats.W001 avisa.
+"""
+
+import functools
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.shortcuts import render
+
+
+WINDOW = getattr(settings, 'PUCEATS_THROTTLE_WINDOW', 5 * 60)
+# Tentativas por janela. Só donos de restaurante fazem login, então o do IP pode ser baixo
+IP_LIMIT = getattr(settings, 'PUCEATS_THROTTLE_IP_LIMIT', 30)
+IDENTIFIER_LIMIT = getattr(settings, 'PUCEATS_THROTTLE_IDENTIFIER_LIMIT', 10)
+
+MESSAGE = 'Muitas tentativas seguidas. Aguarde alguns minutos e tente novamente.'
+
+# Contadores do processo, usados quando o cache não responde:
+# chave -> valor, e a hora em que cada chave expira
+_local_counts = {}
+_local_expires = {}
+_local_lock = threading.Lock()
+
+
+def _key(scope, value, window_index):
+    digest = hashlib.md5(value.encode()).hexdigest()
+    return f'puceats:throttle:{scope}:{digest}:{window_index}'
+
+
+def _local_incr(key, timeout):
+    now = time.monotonic()
+    with _local_lock:
+        if _local_expires.get(key, now) < now or key not in _local_counts:
+            # Limpa as chaves vencidas de vez em quando, para o dicionário não crescer
+            for stale in [k for k, expires in _local_expires.items() if expires < now]:
+                _local_counts.pop(stale, None)
+                _local_expires.pop(stale, None)
+            _local_counts[key] = 0
+            _local_expires[key] = now + timeout
+        _local_counts[key] += 1
+        return _local_counts[key]
+
+
+def _local_get(key):
+    with _local_lock:
+        if _local_expires.get(key, 0) < time.monotonic():
+            return 0
+        return _local_counts.get(key, 0)
+
+
+def _incr(key):
+    # Vale duas janelas: a atual e a seguinte, quando ela vira a "anterior"
+    timeout = 2 * WINDOW
+    try:
+        if cache.add(key, 1, timeout):
+            return 1
+        return cache.incr(key)
+    except ValueError:
+        # A chave venceu entre o add e o incr
+        cache.add(key, 1, timeout)
+        return 1
+    except Exception:
+        return _local_incr(key, timeout)
+
+
+def _decr(key):
+    try:
+        cache.decr(key)
+    except ValueError:
+        # Já venceu: não há o que devolver
+        pass
+    except Exception:
+        with _local_lock:
+            if _local_counts.get(key):
+                _local_counts[key] -= 1
+
+
+def _delete(key):
+    try:
+        cache.delete(key)
+    except Exception:
+        with _local_lock:
+            _local_counts.pop(key, None)
+            _local_expires.pop(key, None)
+
+
+def _get(key):
+    try:
+        return cache.get(key, 0)
+    except Exception:
+        return _local_get(key)
+
+
+def hit(scope, value, limit, now=None):
+    """
+    Conta uma tentativa de `value` em `scope`. Retorna None se ainda está
+    no limite, ou os segundos até a próxima tentativa ser aceita.
+    """
+    now = time.time() if now is None else now
+    window_index, offset = divmod(now, WINDOW)
+    window_index = int(window_index)
+    previous = _get(_key(scope, value, window_index - 1))
+    weight = 1 - offset / WINDOW
+    current = _get(_key(scope, value, window_index))
+    # Já estourado: recusa sem contar, para o atacante não empurrar a janela
+    if previous * weight + current >= limit:
+        return _retry_after(previous, current, offset, limit)
+    current = _incr(_key(scope, value, window_index))
+    if previous * weight + current > limit:
+        return _retry_after(previous, current, offset, limit)
+    return None
+
+
+def refund(scope, value, now):
+    """Desconta a tentativa que hit() contou em `now`"""
+    _decr(_key(scope, value, int(now // WINDOW)))
+
+
+def reset(scope, value, now=None):
+    """Zera as duas janelas de `value` em `scope`"""
+    now = time.time() if now is None else now
+    window_index = int(now // WINDOW)
+    for index in (window_index - 1, window_index):
+        _delete(_key(scope, value, index))
+
+
+def _retry_after(previous, current, offset, limit):
+    """Segundos até previous * peso + current + 1 caber no limite"""
+    room = limit - current - 1
+    if room >= 0 and previous:
+        # previous * (1 - t / WINDOW) <= room a partir de t = WINDOW * (1 - room / previous)
+        return max(1, math.ceil(WINDOW * (1 - room / previous) - offset))
+    # A janela atual sozinha já estourou: pelo menos até ela virar a anterior
+    return max(1, math.ceil(WINDOW - offset))
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR') or 'desconhecido'
+
+
+def succeeded(request):
+    """Chamado pela view quando o login/cadastro deu certo"""
+    request._throttle_succeeded = True
+
+
+def throttle_password_form(identifier_field, template):
+    """
+    Decorator das views que fazem hash de senha num POST. `identifier_field`
+    é o campo do formulário com o email/usuário; `template` é renderizado
+    com a mensagem de erro e status 429 quando a tentativa é recusada. A
+    view chama succeeded(request) quando a tentativa deu certo.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'POST':
+                return view(request, *args, **kwargs)
+
+            now = time.time()
+            ip = client_ip(request)
+            retry_after = hit('ip', ip, IP_LIMIT, now)
+            identifier = request.POST.get(identifier_field, '').strip().lower()
+            if retry_after is None and identifier:
+                retry_after = hit('identifier', identifier, IDENTIFIER_LIMIT, now)
+            if retry_after is None:
+                response = view(request, *args, **kwargs)
+                if getattr(request, '_throttle_succeeded', False):
+                    refund('ip', ip, now)
+                    if identifier:
+                        reset('identifier', identifier, now)
+                return response
+
+            messages.error(request, MESSAGE)
+            response = render(request, template, status=429)
+            response['Retry-After'] = str(retry_after)
+            return response
+        return wrapper
+    return decorator
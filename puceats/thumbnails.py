@@ -0,0 +1,181 @@
+"""
+Miniaturas (JPEG) e variantes WebP de Dish.image e Restaurant.logo.
+
+Depois do upload, os signals agendam generate() num pool de threads, fora
+da requisição. Cada largura de WIDTHS vira dois arquivos em derivados/:
+
+    pratos/foto.png -> derivados/pratos/foto-160w.jpg e derivados/pratos/foto-160w.webp
+
+Enquanto os derivados não existem, as URLs apontam para o original. O
+estado de cada imagem (pronta, ainda sem derivados, falhou) fica no cache,
+para a listagem não consultar o armazenamento a cada imagem renderizada.
+Nomes que são URLs (imagem externa) são usados como estão, sem derivados.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+# Larguras geradas (px): a menor para logos/listas, a maior para cards de prato
+WIDTHS = getattr(settings, 'PUCEATS_THUMBNAIL_WIDTHS', [160, 480])
+SMALL = min(WIDTHS)
+LARGE = max(WIDTHS)
+WORKERS = getattr(settings, 'PUCEATS_THUMBNAIL_WORKERS', 2)
+QUALITY = 80
+
+PREFIX = 'derivados'
+
+READY = 'ready'
+MISSING = 'missing'
+FAILED = 'failed'
+# Segundos até conferir de novo o armazenamento de uma imagem sem derivados
+MISSING_TIMEOUT = 60
+# Uma imagem que não abriu só é tentada de novo pelo generate_thumbnails
+FAILED_TIMEOUT = 24 * 60 * 60
+
+
+def derivative_name(name, width, ext):
+    base, _ = os.path.splitext(name)
+    return f'{PREFIX}/{base}-{width}w.{ext}'
+
+
+def _state_key(name):
+    return 'puceats:thumb:state:' + hashlib.md5(name.encode()).hexdigest()
+
+
+def is_external(name):
+    """URL gravada no campo em vez de um arquivo do armazenamento"""
+    return '://' in name or name.startswith(('/', 'data:'))
+
+
+def is_ready(name):
+    """Os derivados existem? (o último arquivo gravado serve de marcador)"""
+    if not name or is_external(name):
+        return False
+    state = cache.get(_state_key(name))
+    if state is not None:
+        return state == READY
+    if default_storage.exists(derivative_name(name, LARGE, 'webp')):
+        cache.set(_state_key(name), READY, None)
+        return True
+    cache.set(_state_key(name), MISSING, MISSING_TIMEOUT)
+    return False
+
+
+def urls(field_file, width=SMALL):
+    """
+    {'url', 'thumb', 'webp'} de uma imagem. Sem derivados prontos, thumb é o
+    original e webp é None. Sem imagem, tudo None.
+    """
+    name = getattr(field_file, 'name', field_file) or ''
+    if not name:
+        return {'url': None, 'thumb': None, 'webp': None}
+    if is_external(name):
+        return {'url': name, 'thumb': name, 'webp': None}
+    original = default_storage.url(name)
+    if not is_ready(name):
+        return {'url': original, 'thumb': original, 'webp': None}
+    return {
+        'url': original,
+        'thumb': default_storage.url(derivative_name(name, width, 'jpg')),
+        'webp': default_storage.url(derivative_name(name, width, 'webp')),
+    }
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        if image.mode != 'RGB':
+            # JPEG não tem transparência: fundo branco
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            rgba = image.convert('RGBA')
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            image = background
+        image.save(buffer, 'JPEG', quality=QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'WEBP', quality=QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def _store(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(content))
+
+
+def generate(name):
+    """Gera todos os derivados de uma imagem (nunca amplia; respeita a rotação EXIF)"""
+    with default_storage.open(name, 'rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    # O WebP da maior largura por último: ele marca que está tudo pronto
+    for width in sorted(WIDTHS):
+        resized = image
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+        _store(derivative_name(name, width, 'jpg'), _encode(resized, 'JPEG'))
+        _store(derivative_name(name, width, 'webp'), _encode(resized, 'WEBP'))
+    cache.set(_state_key(name), READY, None)
+
+
+def delete(name):
+    """Apaga os derivados de uma imagem que saiu do armazenamento"""
+    for width in WIDTHS:
+        for ext in ('jpg', 'webp'):
+            derivative = derivative_name(name, width, ext)
+            if default_storage.exists(derivative):
+                default_storage.delete(derivative)
+    cache.delete(_state_key(name))
+
+
+# === Pool ===
+
+_lock = threading.Lock()
+_executor = None
+_pending = set()
+
+
+def _run(name, on_ready):
+    try:
+        generate(name)
+        if on_ready:
+            on_ready()
+    except Exception:
+        logger.exception('Falha ao gerar miniaturas de %s', name)
+        cache.set(_state_key(name), FAILED, FAILED_TIMEOUT)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        # Conexões abertas por on_ready nesta thread do pool
+        connections.close_all()
+
+
+def schedule(name, on_ready=None):
+    """Agenda a geração (ignora se a mesma imagem já está na fila)"""
+    global _executor
+    if not name:
+        return None
+    with _lock:
+        if name in _pending:
+            return None
+        _pending.add(name)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='puceats-thumbs')
+    return _executor.submit(_run, name, on_ready)
@@ -0,0 +1,227 @@
+"""
+Tiles de clusters para o mapa (/puceats/api/tiles/<z>/<x>/<y>.json).
+
+Cada tile (mesma grade Web Mercator do Leaflet/OpenStreetMap) é dividido em
+células de CELL_SIZE pixels; os pontos que caem na mesma célula viram um
+cluster com quantidade, centroide e cozinha predominante.
+
+O resultado de cada tile fica no cache sob uma versão própria. Quando um
+restaurante ou marcador muda, só os tiles que continham a posição antiga ou
+a nova (em todos os zooms) recebem versão nova.
+"""
+
+import math
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from . import thumbnails
+
+
+TILE_SIZE = 256
+CELL_SIZE = getattr(settings, 'PUCEATS_TILE_CELL_PX', 64)
+MAX_ZOOM = getattr(settings, 'PUCEATS_TILE_MAX_ZOOM', 18)
+TILE_CACHE_TIMEOUT = getattr(settings, 'PUCEATS_TILE_CACHE_TIMEOUT', 60 * 60)
+
+# Clusters até esse tamanho levam a lista de locais (para o painel do mapa)
+PLACES_LIMIT = 50
+
+MAX_LATITUDE = 85.0511287798
+
+# Restaurantes sem coordenada aparecem no prédio, como o mapa já fazia
+# (a primeira palavra-chave encontrada em `building` vence)
+BUILDING_COORDS = [
+    ('Leme', 'Cardeal Leme', (-22.979905626939328, -43.232694849620536)),
+    ('Kennedy', 'Kennedy', (-22.97899690169501, -43.23253928152602)),
+]
+
+VALID_COORDS = Q(latitude__range=(-90, 90), longitude__range=(-180, 180))
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def project(lat, lng, z):
+    """Coordenada -> pixel global no zoom z"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    scale = TILE_SIZE * 2 ** z
+    sin_lat = math.sin(math.radians(lat))
+    px = (lng + 180) / 360 * scale
+    py = (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return px, py
+
+
+def tile_for(lat, lng, z):
+    px, py = project(lat, lng, z)
+    last = 2 ** z - 1
+    return z, min(last, int(px // TILE_SIZE)), min(last, int(py // TILE_SIZE))
+
+
+def tile_bounds(z, x, y):
+    """(sul, oeste, norte, leste) do tile"""
+    def lat_at(py):
+        n = math.pi - 2 * math.pi * py / 2 ** z
+        return math.degrees(math.atan(math.sinh(n)))
+
+    def lng_at(px):
+        return px / 2 ** z * 360 - 180
+
+    return lat_at(y + 1), lng_at(x), lat_at(y), lng_at(x + 1)
+
+
+def building_position(building):
+    for keyword, label, coords in BUILDING_COORDS:
+        if keyword in (building or ''):
+            return label, coords
+    return None, None
+
+
+def restaurant_position(latitude, longitude, building):
+    """Posição do restaurante no mapa: coordenada própria ou a do prédio"""
+    if latitude is not None and longitude is not None and -90 <= latitude <= 90 and -180 <= longitude <= 180:
+        return (latitude, longitude)
+    return building_position(building)[1]
+
+
+# === Versões por tile ===
+
+def _version_key(z, x, y):
+    return f'puceats:tile:version:{z}:{x}:{y}'
+
+
+def _body_key(z, x, y, version):
+    return f'puceats:tile:body:{z}:{x}:{y}:{version}'
+
+
+def _get_version(z, x, y):
+    key = _version_key(z, x, y)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_positions(*positions):
+    """Troca a versão de todos os tiles (em todos os zooms) que contêm as posições"""
+    keys = set()
+    for position in positions:
+        if position is None:
+            continue
+        lat, lng = position
+        for z in range(MAX_ZOOM + 1):
+            keys.add(_version_key(*tile_for(lat, lng, z)))
+    if keys:
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+
+# === Montagem do tile ===
+
+def _place(kind, id, name, restaurant_id, cuisine, building, logo, lat, lng, color=None):
+    return {
+        'type': kind,
+        'id': id,
+        'name': name,
+        'restaurant_id': restaurant_id,
+        'cuisine': cuisine,
+        'building': building,
+        'logo': thumbnails.urls(logo)['thumb'],
+        'color': color,
+        'lat': lat,
+        'lng': lng,
+    }
+
+
+def load_points(z, x, y):
+    """Marcadores ativos e restaurantes (sem marcador ativo) dentro do tile"""
+    from .models import Marker, Restaurant
+
+    south, west, north, east = tile_bounds(z, x, y)
+    in_tile = Q(latitude__gte=south, latitude__lt=north, longitude__gte=west, longitude__lt=east)
+    cuisines = dict(Restaurant.CUISINE_TYPES)
+    points = []
+
+    markers = Marker.objects.filter(in_tile, is_active=True).values(
+        'id', 'name', 'icon_color', 'latitude', 'longitude', 'restaurant_id',
+        'restaurant__cuisine_type', 'restaurant__building', 'restaurant__logo',
+    )
+    for m in markers:
+        points.append(_place(
+            'marker', m['id'], m['name'], m['restaurant_id'],
+            cuisines.get(m['restaurant__cuisine_type']), m['restaurant__building'],
+            m['restaurant__logo'], m['latitude'], m['longitude'], m['icon_color'],
+        ))
+
+    fields = ('id', 'name', 'cuisine_type', 'building', 'logo', 'latitude', 'longitude')
+    restaurants = Restaurant.objects.exclude(marker__is_active=True)
+    for r in restaurants.filter(in_tile).values(*fields):
+        points.append(_place(
+            'restaurant', r['id'], r['name'], r['id'], cuisines.get(r['cuisine_type']),
+            r['building'], r['logo'], r['latitude'], r['longitude'],
+        ))
+
+    # Restaurantes sem coordenada válida, posicionados pelo prédio
+    buildings_here = [
+        (keyword, label) for keyword, label, (lat, lng) in BUILDING_COORDS
+        if south <= lat < north and west <= lng < east
+    ]
+    if buildings_here:
+        by_building = Q()
+        for keyword, _ in buildings_here:
+            by_building |= Q(building__contains=keyword)
+        labels_here = {label for _, label in buildings_here}
+        for r in restaurants.exclude(VALID_COORDS).filter(by_building).values(*fields):
+            label, position = building_position(r['building'])
+            if label not in labels_here:
+                continue
+            points.append(_place(
+                'restaurant', r['id'], r['name'], r['id'], cuisines.get(r['cuisine_type']),
+                label, r['logo'], position[0], position[1],
+            ))
+
+    points.sort(key=lambda p: (p['type'], p['id']))
+    return points
+
+
+def cluster(points, z, x, y):
+    cells = {}
+    for point in points:
+        px, py = project(point['lat'], point['lng'], z)
+        cell_x = min(TILE_SIZE // CELL_SIZE - 1, max(0, int((px - x * TILE_SIZE) // CELL_SIZE)))
+        cell_y = min(TILE_SIZE // CELL_SIZE - 1, max(0, int((py - y * TILE_SIZE) // CELL_SIZE)))
+        cells.setdefault((cell_x, cell_y), []).append(point)
+
+    clusters = []
+    for cell in sorted(cells):
+        members = cells[cell]
+        cuisines = Counter(p['cuisine'] for p in members if p['cuisine'])
+        buildings = Counter(p['building'] for p in members if p['building'])
+        colors = Counter(p['color'] for p in members if p['color'])
+        if len(members) == 1:
+            label = members[0]['building'] or members[0]['name']
+        else:
+            label = buildings.most_common(1)[0][0] if buildings else None
+        clusters.append({
+            'count': len(members),
+            'lat': sum(p['lat'] for p in members) / len(members),
+            'lng': sum(p['lng'] for p in members) / len(members),
+            'cuisine': cuisines.most_common(1)[0][0] if cuisines else None,
+            'label': label,
+            'color': colors.most_common(1)[0][0] if colors else None,
+            'places': members if len(members) <= PLACES_LIMIT else None,
+        })
+    return clusters
+
+
+def get_tile(z, x, y):
+    version = _get_version(z, x, y)
+    key = _body_key(z, x, y, version)
+    data = cache.get(key)
+    if data is None:
+        data = {'z': z, 'x': x, 'y': y, 'clusters': cluster(load_points(z, x, y), z, x, y)}
+        cache.set(key, data, TILE_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,151 @@
+"""
+Emissão de tokens de cadastro em lote e limpeza dos vencidos/usados, usadas
+pelos comandos generate_tokens e purge_tokens e pelo admin.
+
+- issue: cria N tokens com bulk_create em lotes; os códigos de cada lote
+  são sorteados sem repetição e conferidos contra o banco numa query só.
+- redeem: resgata um token com um UPDATE condicional só; o motivo
+  detalhado da recusa só é buscado quando o resgate falha.
+- purge: apaga (e opcionalmente arquiva em NDJSON) os tokens usados ou
+  vencidos, em blocos de ids, cada um na sua transação, para não segurar o
+  lock de escrita do SQLite por muito tempo.
+"""
+
+import json
+import time
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TOKEN_VALID_DAYS, Token, generate_token_code
+
+
+BATCH_SIZE = 1000
+PURGE_CHUNK_SIZE = 500
+# Colunas gravadas no arquivo de --archive
+ARCHIVE_FIELDS = ['id', 'code', 'is_used', 'created_at', 'expires_at', 'used_by_id', 'used_by__username', 'used_at']
+MAX_ATTEMPTS = 5
+
+
+def _new_codes(count):
+    """`count` códigos distintos entre si e que ainda não existem no banco"""
+    codes = set()
+    while len(codes) < count:
+        candidates = {generate_token_code() for _ in range(count - len(codes))} - codes
+        taken = set(Token.objects.filter(code__in=candidates).values_list('code', flat=True))
+        codes |= candidates - taken
+    return list(codes)
+
+
+def issue(count, days=TOKEN_VALID_DAYS, batch_size=BATCH_SIZE):
+    """Cria `count` tokens válidos por `days` dias. Retorna os códigos, na ordem de criação"""
+    now = timezone.now()
+    expires_at = now + timedelta(days=days)
+    issued = []
+    while len(issued) < count:
+        size = min(batch_size, count - len(issued))
+        for attempt in range(MAX_ATTEMPTS):
+            codes = _new_codes(size)
+            tokens = [Token(code=code, created_at=now, expires_at=expires_at) for code in codes]
+            try:
+                with transaction.atomic():
+                    Token.objects.bulk_create(tokens)
+                break
+            except IntegrityError:
+                # Outro processo gravou um dos códigos entre a conferência e o INSERT
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+        issued.extend(codes)
+    return issued
+
+
+class TokenError(ValueError):
+    """
+    Token que não pôde ser resgatado. `reason` é 'not_found', 'used' ou
+    'expired'; `token` é o registro (None em 'not_found').
+    """
+
+    def __init__(self, reason, token=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.token = token
+
+
+def normalize(code):
+    return (code or '').strip().upper()
+
+
+def redeem(code, user):
+    """
+    Marca o token como usado por `user`, só se ainda estiver disponível:
+    UPDATE ... WHERE code = ? AND is_used = 0 AND expires_at > agora. Deve
+    rodar dentro da transação que cria o usuário/restaurante, para que um
+    erro depois do resgate devolva o token. Levanta TokenError se nenhuma
+    linha mudou (dois cadastros simultâneos não resgatam o mesmo token).
+    """
+    now = timezone.now()
+    claimed = Token.objects.filter(code=normalize(code), is_used=False, expires_at__gt=now).update(
+        is_used=True, used_by=user, used_at=now,
+    )
+    if not claimed:
+        raise redemption_error(code, now)
+
+
+def check(code):
+    """
+    Recusa barata, antes do hash de senha do cadastro: levanta TokenError
+    se o token não existe, já foi usado ou venceu. Não reserva nada; o
+    redeem dentro da transação continua sendo a garantia contra corrida.
+    """
+    now = timezone.now()
+    if not Token.objects.filter(code=normalize(code), is_used=False, expires_at__gt=now).exists():
+        raise redemption_error(code, now)
+
+
+def redemption_error(code, now=None):
+    """TokenError com o motivo da recusa (só no caminho de erro)"""
+    token = Token.objects.select_related('used_by').filter(code=normalize(code)).first()
+    if token is None:
+        return TokenError('not_found')
+    if token.is_used:
+        return TokenError('used', token)
+    if token.expires_at <= (now or timezone.now()):
+        return TokenError('expired', token)
+    # Disponível agora: o UPDATE perdeu para uma mudança que já foi desfeita
+    return TokenError('used', token)
+
+
+def purgeable(older_than=0):
+    """Tokens usados ou vencidos há mais de `older_than` dias"""
+    cutoff = timezone.now() - timedelta(days=older_than)
+    used = Q(is_used=True) & (Q(used_at__lt=cutoff) | Q(used_at=None))
+    return Token.objects.filter(used | Q(expires_at__lt=cutoff))
+
+
+def purge(older_than=0, chunk_size=PURGE_CHUNK_SIZE, archive=None, pause=0):
+    """
+    Apaga os tokens de purgeable() em blocos de `chunk_size`. Com `archive`
+    (arquivo texto aberto), cada token vira uma linha JSON antes de sair do
+    banco. Retorna quantos foram apagados.
+    """
+    queryset = purgeable(older_than).order_by('id')
+    deleted = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            if archive is not None:
+                for row in Token.objects.filter(id__in=ids).order_by('id').values(*ARCHIVE_FIELDS):
+                    archive.write(json.dumps(row, ensure_ascii=False, default=str))
+                    archive.write('\n')
+            # Nada aponta para Token: o delete() vira um DELETE ... WHERE id IN só
+            deleted += Token.objects.filter(id__in=ids).delete()[0]
+        last_id = ids[-1]
+        if pause:
+            # Deixa outras escritas (cadastros) passarem entre os blocos
+            time.sleep(pause)
+    return deleted
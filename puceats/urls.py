@@ -16,6 +16,18 @@ urlpatterns = [
     
     # API
     path('api/restaurante/<int:restaurant_id>/menu/', views.get_restaurant_menu, name='api-restaurant-menu'),
+    path('api/restaurantes/menu/', views.get_restaurant_menus, name='api-restaurant-menus'),
+    # Mesmas APIs em views assíncronas, para quem serve por ASGI (core/asgi.py)
+    path('api/async/restaurante/<int:restaurant_id>/menu/', views.get_restaurant_menu_async, name='api-restaurant-menu-async'),
+    path('api/async/restaurantes/menu/', views.get_restaurant_menus_async, name='api-restaurant-menus-async'),
+    path('api/async/search/', views.search_restaurants_async, name='api-search-async'),
+    path('api/live/', views.live_events, name='api-live'),
+    path('api/menu-cache/stats/', views.menu_cache_stats, name='api-menu-cache-stats'),
+    path('api/restaurants/', views.list_restaurants, name='api-restaurants'),
+    path('api/dishes/', views.list_dishes, name='api-dishes'),
+    path('api/search/', views.search_restaurants, name='api-search'),
+    path('api/nearby/', views.nearby_places, name='api-nearby'),
+    path('api/tiles/<int:z>/<int:x>/<int:y>.json', views.map_tile, name='api-map-tile'),
     
     # CRUD Pratos
     path('crud/', views.crud, name='crud'),
@@ -26,6 +38,7 @@ urlpatterns = [
     path('crud/dish/add/', views.dish_add, name='dish-add'),
     path('crud/dish/<int:dish_id>/edit/', views.dish_edit, name='dish-edit'),
     path('crud/dish/<int:dish_id>/delete/', views.dish_delete, name='dish-delete'),
+    path('crud/dishes/batch/', views.dishes_batch, name='dishes-batch'),
     
     # CRUD Restaurantes
     path('crud/restaurant/<int:restaurant_id>/edit/', views.restaurant_edit, name='restaurant-edit'),
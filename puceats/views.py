@@ -1,67 +1,233 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.http import parse_etags
+from django.utils.text import slugify
 from django.views.decorators.csrf import csrf_protect, ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
-from .models import Token, Restaurant, Dish, Category
+from .models import Token, Restaurant, Dish, Category, RestaurantCard
+from . import dish_batch, listing, live, menus, nearby, pagecache, search, tiles, throttle, tokens
+from .pagecache import cache_public_page
+from .replica import replica_reads
+from .throttle import throttle_password_form
+import json
+import logging
+from decimal import Decimal, InvalidOperation
 import requests
 
+
+logger = logging.getLogger(__name__)
+
+@cache_public_page
+@replica_reads
 def index(request):
-    restaurantes = Restaurant.objects.all()
-    pratos = Dish.objects.all()
-    categorias = Category.objects.all()
+    # O cardápio é buscado pela API ao abrir o restaurante: aqui só a lista lateral
+    restaurantes = list(Restaurant.objects.only('id', 'name', 'logo', 'building', 'cuisine_type'))
+    pagecache.add_tags(request, *[pagecache.restaurant_tag(r.id) for r in restaurantes])
+    pagecache.add_tags(request, *[pagecache.type_tag(t) for t, _ in Restaurant.ESTABLISHMENT_TYPES])
     
     context = {
         'restaurants': restaurantes,
-        'dishes': pratos,
-        'categories': categorias,
+        'live_updates': live.ENABLED,
     }
     return render(request, 'index.html', context)
 
 def get_restaurant_menu(request, restaurant_id):
     """API endpoint para buscar cardápio do restaurante"""
     try:
-        restaurant = Restaurant.objects.get(id=restaurant_id)
-        dishes = Dish.objects.filter(restaurant=restaurant).select_related('category')
-        
-        dishes_data = []
-        for dish in dishes:
-            dishes_data.append({
-                'id': dish.id,
-                'name': dish.name,
-                'description': dish.description,
-                'price': str(dish.price),
-                'image': dish.image.url if dish.image else None,
-                'category': dish.category.name if dish.category else None,
-                'is_vegan': dish.is_vegan,
-                'is_vegetarian': dish.is_vegetarian,
-                'is_gluten_free': dish.is_gluten_free,
-            })
+        cached = menus.get_cached_menu(restaurant_id)
+        if cached is None:
+            restaurant = Restaurant.objects.get(id=restaurant_id)
+            cached = menus.build_cached_menu(restaurant)
+        etag, body = cached
+        
+        # O cliente já tem essa versão: responde 304 sem tocar no banco
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+    except Restaurant.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Restaurante não encontrado'}, status=404)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+def menu_cache_stats(request):
+    """Contadores de acerto/falha do cache de cardápios"""
+    return JsonResponse({'success': True, **menus.cache_stats()})
+
+@replica_reads
+def get_restaurant_menus(request):
+    """API endpoint para buscar vários cardápios de uma vez (?ids=1,2,3)"""
+    try:
+        ids = menus.parse_ids(request.GET.get('ids', ''))
+        restaurants = menus.load_menus(ids)
         
         return JsonResponse({
             'success': True,
-            'id': restaurant.id,
-            'name': restaurant.name,
-            'logo': restaurant.logo.url if restaurant.logo else None,
-            'establishment_type': restaurant.get_establishment_type_display(),
-            'cuisine_type': restaurant.get_cuisine_type_display(),
-            'building': restaurant.building if restaurant.building else None,
-            'description': restaurant.description if restaurant.description else None,
-            'opening_hours': restaurant.opening_hours if restaurant.opening_hours else None,
-            'phone': restaurant.phone if restaurant.phone else None,
-            'dishes': dishes_data
+            'restaurants': [
+                menus.serialize_restaurant(restaurant, restaurant.dishes.all())
+                for restaurant in restaurants
+            ],
         })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+def search_restaurants(request):
+    """API de busca: restaurantes e pratos que batem com ?q= (sem acento)"""
+    query = request.GET.get('q', '').strip()
+    try:
+        results = search.search(query)
+        return JsonResponse({'success': True, 'query': query, 'results': results})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+# === APIs públicas assíncronas (api/async/..., para servir por ASGI) ===
+# Mesmas respostas das versões síncronas acima, com o ORM assíncrono.
+
+async def get_restaurant_menu_async(request, restaurant_id):
+    """Versão assíncrona de get_restaurant_menu"""
+    try:
+        cached = await menus.aget_cached_menu(restaurant_id)
+        if cached is None:
+            restaurant = await Restaurant.objects.aget(id=restaurant_id)
+            cached = await menus.abuild_cached_menu(restaurant)
+        etag, body = cached
+        
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
     except Restaurant.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Restaurante não encontrado'}, status=404)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
+@replica_reads
+async def get_restaurant_menus_async(request):
+    """Versão assíncrona de get_restaurant_menus"""
+    try:
+        ids = menus.parse_ids(request.GET.get('ids', ''))
+        restaurants = await menus.aload_menus(ids)
+        
+        return JsonResponse({
+            'success': True,
+            'restaurants': [
+                menus.serialize_restaurant(restaurant, restaurant.dishes.all())
+                for restaurant in restaurants
+            ],
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+async def search_restaurants_async(request):
+    """Versão assíncrona de search_restaurants"""
+    query = request.GET.get('q', '').strip()
+    try:
+        # A busca usa SQL direto na tabela FTS, que não tem API assíncrona
+        results = await sync_to_async(search.search)(query)
+        return JsonResponse({'success': True, 'query': query, 'results': results})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+async def live_events(request):
+    """
+    Stream de eventos (SSE) dos cardápios: ?restaurants=1,2,3.
+    Só servido por ASGI; ver puceats/live.py.
+    """
+    if not live.ENABLED:
+        return JsonResponse({'success': False, 'error': 'Eventos ao vivo desativados'}, status=404)
+    if not isinstance(request, ASGIRequest):
+        # Com WSGI o Django consome o stream inteiro antes de enviar: nada sai e a thread fica presa
+        return JsonResponse({'success': False, 'error': 'Eventos ao vivo só funcionam com ASGI'}, status=501)
+    ids = menus.parse_ids(request.GET.get('restaurants', ''), limit=live.MAX_RESTAURANTS)
+    if not ids:
+        return JsonResponse({'success': False, 'error': 'Informe os restaurantes: ?restaurants=1,2,3'}, status=400)
+    if live.subscriber_count() >= live.MAX_SUBSCRIBERS:
+        response = JsonResponse({'success': False, 'error': 'Muitas conexões abertas, tente mais tarde'}, status=503)
+        response['Retry-After'] = str(live.HEARTBEAT)
+        return response
+
+    response = StreamingHttpResponse(live.stream(ids), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Sem buffer no nginx, senão os eventos só saem quando o buffer enche
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def nearby_places(request):
+    """API dos pontos mais próximos: ?lat=&lng=&k=&radius= (radius em metros)"""
+    try:
+        lat = float(request.GET['lat'])
+        lng = float(request.GET['lng'])
+        k = int(request.GET.get('k', 10))
+        radius = request.GET.get('radius')
+        radius = float(radius) if radius else None
+    except (KeyError, ValueError):
+        return JsonResponse({'success': False, 'error': 'Parâmetros inválidos: informe lat e lng numéricos'}, status=400)
+    
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return JsonResponse({'success': False, 'error': 'Coordenadas fora do intervalo válido'}, status=400)
+    if not 1 <= k <= 100:
+        return JsonResponse({'success': False, 'error': 'k deve estar entre 1 e 100'}, status=400)
+    if radius is not None and radius <= 0:
+        return JsonResponse({'success': False, 'error': 'radius deve ser positivo'}, status=400)
+    
+    try:
+        results = nearby.nearest(lat, lng, k, radius)
+        return JsonResponse({'success': True, 'results': results})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+def map_tile(request, z, x, y):
+    """API de clusters do mapa para o tile z/x/y"""
+    if not tiles.is_valid_tile(z, x, y):
+        return JsonResponse({'success': False, 'error': 'Tile inválido'}, status=404)
+    try:
+        return JsonResponse({'success': True, **tiles.get_tile(z, x, y)})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+@replica_reads
+def list_restaurants(request):
+    """API de restaurantes paginada por cursor (?cursor=&limit=&fields= e filtros)"""
+    try:
+        results, next_cursor = listing.list_restaurants(request.GET)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse({'success': True, 'results': results, 'next_cursor': next_cursor})
+
+@replica_reads
+def list_dishes(request):
+    """API de pratos paginada por cursor (?cursor=&limit=&fields= e filtros)"""
+    try:
+        results, next_cursor = listing.list_dishes(request.GET)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse({'success': True, 'results': results, 'next_cursor': next_cursor})
+
+def _tag_cards(request, establishment_type, cards):
+    pagecache.add_tags(request, pagecache.type_tag(establishment_type))
+    for card in cards:
+        pagecache.add_tags(request, pagecache.restaurant_tag(card.restaurant_id), pagecache.card_tag(card.restaurant_id))
+
+@cache_public_page
+@replica_reads
 def restaurantes_view(request):
-    restaurantes = Restaurant.objects.filter(establishment_type='restaurante').prefetch_related('dishes')
+    restaurantes = list(RestaurantCard.objects.filter(establishment_type='restaurante'))
+    _tag_cards(request, 'restaurante', restaurantes)
     
     context = {
         'restaurants': restaurantes,
@@ -71,8 +237,11 @@ def restaurantes_view(request):
     }
     return render(request, 'estabelecimentos.html', context)
 
+@cache_public_page
+@replica_reads
 def lanchonetes_view(request):
-    lanchonetes = Restaurant.objects.filter(establishment_type='lanchonete').prefetch_related('dishes')
+    lanchonetes = list(RestaurantCard.objects.filter(establishment_type='lanchonete'))
+    _tag_cards(request, 'lanchonete', lanchonetes)
     
     context = {
         'restaurants': lanchonetes,
@@ -82,8 +251,11 @@ def lanchonetes_view(request):
     }
     return render(request, 'estabelecimentos.html', context)
 
+@cache_public_page
+@replica_reads
 def barracas_view(request):
-    barracas = Restaurant.objects.filter(establishment_type='barraca').prefetch_related('dishes')
+    barracas = list(RestaurantCard.objects.filter(establishment_type='barraca'))
+    _tag_cards(request, 'barraca', barracas)
     
     context = {
         'restaurants': barracas,
@@ -93,6 +265,7 @@ def barracas_view(request):
     }
     return render(request, 'estabelecimentos.html', context)
 @ensure_csrf_cookie
+@throttle_password_form('email', 'login.html')
 def login(request):
     if request.method == 'POST':
         email_ou_username = request.POST.get('email', '').strip()
@@ -102,19 +275,12 @@ def login(request):
             messages.error(request, 'Por favor, preencha seu email/usuário e senha para continuar.')
             return render(request, 'login.html')
         
-        # Tenta autenticar por username
+        # Username ou email: o EmailOrUsernameBackend resolve os dois com um hash só
         usuario = authenticate(request, username=email_ou_username, password=senha)
         
-        # Se não funcionou, tenta por email
-        if not usuario:
-            try:
-                user_obj = User.objects.get(email=email_ou_username)
-                usuario = authenticate(request, username=user_obj.username, password=senha)
-            except User.DoesNotExist:
-                pass
-        
         if usuario is not None:
             auth_login(request, usuario)
+            throttle.succeeded(request)
             nome_exibir = usuario.first_name if usuario.first_name else usuario.username
             messages.success(request, f'Bem-vindo de volta, {nome_exibir}! Login realizado com sucesso.')
             return redirect('puceats:crud')
@@ -123,7 +289,15 @@ def login(request):
     
     return render(request, 'login.html')
 
+EMAIL_TAKEN = 'Este email já está cadastrado. Faça login ou use outro email.'
+RESTAURANT_NAME_TAKEN = 'Já existe um restaurante com esse nome. Por favor, escolha um nome diferente.'
+
+def _restaurant_name_taken(name):
+    # name e slug (gerado do nome) são únicos
+    return Restaurant.objects.filter(Q(name=name) | Q(slug=slugify(name))).exists()
+
 @ensure_csrf_cookie
+@throttle_password_form('email', 'cadastro.html')
 def cadastro(request):
     if request.method == 'POST':
         token_code = request.POST.get('token')
@@ -138,41 +312,43 @@ def cadastro(request):
             return render(request, 'cadastro.html')
         
         if User.objects.filter(email=email).exists():
-            messages.error(request, 'Este email já está cadastrado. Faça login ou use outro email.')
+            messages.error(request, EMAIL_TAKEN)
+            return render(request, 'cadastro.html')
+        
+        if _restaurant_name_taken(nome_restaurante):
+            messages.error(request, RESTAURANT_NAME_TAKEN)
             return render(request, 'cadastro.html')
         
         try:
-            token = Token.objects.get(code=token_code.upper())
-            valido, mensagem = token.is_valid()
-            
-            if not valido:
-                messages.error(request, f'Token inválido: {mensagem}')
-                return render(request, 'cadastro.html')
-            
-            usuario = User.objects.create_user(
-                username=email,
-                email=email,
-                password=senha,
-                first_name=nome
-            )
-            
-            restaurante = Restaurant.objects.create(
-                owner=usuario,
-                name=nome_restaurante
-            )
-            
-            token.is_used = True
-            token.used_by = usuario
-            token.used_at = timezone.now()
-            token.save()
-            
-            auth_login(request, usuario)
-            messages.success(request, f'🎉 Conta criada com sucesso! Bem-vindo ao PUC Eats, {nome}! Seu restaurante "{nome_restaurante}" foi cadastrado.')
-            return redirect('puceats:crud')
-            
-        except Token.DoesNotExist:
-            messages.error(request, 'Token não encontrado. Verifique se digitou corretamente ou entre em contato com o administrador.')
+            # Token inexistente ou usado é recusado antes do hash (PBKDF2 custa caro)
+            tokens.check(token_code)
+            # Hash da senha fora da transação: o lock de escrita fica só com os INSERTs e o UPDATE do token
+            usuario = User(username=User.normalize_username(email), email=User.objects.normalize_email(email), first_name=nome)
+            usuario.set_password(senha)
+            with transaction.atomic():
+                usuario.save()
+                tokens.redeem(token_code, usuario)
+                Restaurant.objects.create(owner=usuario, name=nome_restaurante)
+        except tokens.TokenError as e:
+            if e.reason == 'not_found':
+                messages.error(request, 'Token não encontrado. Verifique se digitou corretamente ou entre em contato com o administrador.')
+            elif e.reason == 'expired':
+                messages.error(request, 'Token inválido: Token expirado')
+            else:
+                messages.error(request, 'Token inválido: Token já foi utilizado')
+            return render(request, 'cadastro.html')
+        except IntegrityError:
+            # Outro cadastro gravou o mesmo email ou nome de restaurante entre a verificação e o INSERT
+            if User.objects.filter(email=email).exists():
+                messages.error(request, EMAIL_TAKEN)
+            else:
+                messages.error(request, RESTAURANT_NAME_TAKEN)
             return render(request, 'cadastro.html')
+
+        auth_login(request, usuario)
+        throttle.succeeded(request)
+        messages.success(request, f'🎉 Conta criada com sucesso! Bem-vindo ao PUC Eats, {nome}! Seu restaurante "{nome_restaurante}" foi cadastrado.')
+        return redirect('puceats:crud')
     
     return render(request, 'cadastro.html')
 
@@ -181,18 +357,9 @@ def esqueci_senha(request):
 
 def favoritos(request):
     """View de favoritos - busca restaurantes por IDs do localStorage"""
-    ids_param = request.GET.get('ids', '')
-    restaurants = []
-    
-    if ids_param:
-        try:
-            # Converter string "1,2,3" em lista de inteiros
-            ids = [int(id.strip()) for id in ids_param.split(',') if id.strip().isdigit()]
-            if ids:
-                # Buscar restaurantes pelos IDs
-                restaurants = Restaurant.objects.filter(id__in=ids)
-        except (ValueError, AttributeError):
-            pass
+    # Converter string "1,2,3" em lista de inteiros e buscar com os pratos
+    ids = menus.parse_ids(request.GET.get('ids', ''))
+    restaurants = menus.load_menus(ids)
     
     context = {
         'restaurants': restaurants,
@@ -290,11 +457,8 @@ def crud(request):
         })
     
     # GET - Passa lista de restaurantes e pratos do restaurante selecionado
-    # Debug: Verifica qual usuário está logado
-    print(f"DEBUG: Usuário logado = {request.user.username} (ID: {request.user.id})")
-    
     restaurantes = Restaurant.objects.filter(owner=request.user)
-    print(f"DEBUG: Encontrados {restaurantes.count()} restaurantes para o usuário {request.user.username}")
+    logger.debug('crud: usuário %s (id %s)', request.user.username, request.user.id)
     
     # Se tem um restaurant_id na query string, filtra os pratos
     selected_restaurant_id = request.GET.get('restaurant_id')
@@ -373,24 +537,6 @@ def add_restaurant(request):
             return redirect('puceats:crud')
         
         try:
-            # Valida o token
-            token = Token.objects.get(code=token_code.upper())
-            
-            # Verifica se o token é válido
-            is_valid, message = token.is_valid()
-            if not is_valid:
-                if 'expirado' in message.lower():
-                    messages.error(request, f'Token expirado. Este token expirou em {token.expires_at.strftime("%d/%m/%Y às %H:%M")}. Solicite um novo token ao administrador para continuar.')
-                else:
-                    messages.error(request, f'Token inválido. {message}. Entre em contato com o administrador para obter um token válido.')
-                return redirect('puceats:crud')
-            
-            if token.is_used:
-                used_info = f' por {token.used_by.username}' if token.used_by else ''
-                used_date = f' em {token.used_at.strftime("%d/%m/%Y às %H:%M")}' if token.used_at else ''
-                messages.error(request, f'Token já utilizado. Este token foi usado{used_info}{used_date}. Cada token pode ser usado apenas uma vez. Solicite um novo token ao administrador.')
-                return redirect('puceats:crud')
-            
             # Preparar dados do restaurante
             restaurant_data = {
                 'owner': request.user,
@@ -421,25 +567,27 @@ def add_restaurant(request):
                 except ValueError:
                     pass
             
-            # Cria o restaurante
-            restaurante = Restaurant.objects.create(**restaurant_data)
-            
-            # Upload de logo (se fornecido)
             if 'logo' in request.FILES:
-                restaurante.logo = request.FILES['logo']
-                restaurante.save()
+                restaurant_data['logo'] = request.FILES['logo']
             
-            # Marca o token como usado
-            token.is_used = True
-            token.used_by = request.user
-            token.used_at = timezone.now()
-            token.save()
+            # Resgata o token e cria o restaurante juntos: se um falhar, nada fica gravado
+            with transaction.atomic():
+                tokens.redeem(token_code, request.user)
+                restaurante = Restaurant.objects.create(**restaurant_data)
             
             messages.success(request, f'Restaurante "{nome_restaurante}" criado com sucesso. Você já pode começar a adicionar pratos ao cardápio.')
             return redirect(f'/puceats/crud/?restaurant_id={restaurante.id}')
             
-        except Token.DoesNotExist:
-            messages.error(request, f'Token não encontrado no sistema. O código "{token_code}" não existe ou foi digitado incorretamente. Verifique o código e tente novamente.')
+        except tokens.TokenError as e:
+            token = e.token
+            if e.reason == 'not_found':
+                messages.error(request, f'Token não encontrado no sistema. O código "{token_code}" não existe ou foi digitado incorretamente. Verifique o código e tente novamente.')
+            elif e.reason == 'expired':
+                messages.error(request, f'Token expirado. Este token expirou em {timezone.localtime(token.expires_at).strftime("%d/%m/%Y às %H:%M")}. Solicite um novo token ao administrador para continuar.')
+            else:
+                used_info = f' por {token.used_by.username}' if token.used_by else ''
+                used_date = f' em {timezone.localtime(token.used_at).strftime("%d/%m/%Y às %H:%M")}' if token.used_at else ''
+                messages.error(request, f'Token já utilizado. Este token foi usado{used_info}{used_date}. Cada token pode ser usado apenas uma vez. Solicite um novo token ao administrador.')
             return redirect('puceats:crud')
         except Restaurant.DoesNotExist:
             messages.error(request, 'Erro ao localizar o restaurante. Tente novamente.')
@@ -492,7 +640,7 @@ def admin_panel(request):
     tokens_available = total_tokens - tokens_used
     
     users = User.objects.all().order_by('-date_joined')
-    restaurants = Restaurant.objects.all().select_related('owner').prefetch_related('dishes').order_by('-id')
+    restaurants = RestaurantCard.objects.order_by('-restaurant_id')
     
     context = {
         'total_users': total_users,
@@ -507,6 +655,7 @@ def admin_panel(request):
     
     return render(request, 'admin.html', context)
 
+@replica_reads
 def restaurant_detail(request, slug):
     """
     Página de detalhes de um restaurante.
@@ -529,22 +678,14 @@ def restaurant_detail(request, slug):
 def dish_add(request):
     """Adicionar novo prato"""
     try:
-        # Debug: Logar todos os dados recebidos
-        print("=== DADOS RECEBIDOS NO SERVIDOR ===")
-        print("POST data:", dict(request.POST))
-        print("FILES:", dict(request.FILES))
-        print("====================================")
-        
+        logger.debug('dish_add: POST=%s FILES=%s', request.POST, list(request.FILES))
+
         restaurant_id = request.POST.get('restaurant', '').strip()
         category_id = request.POST.get('category', '').strip()
         name = request.POST.get('name', '').strip()
         description = request.POST.get('description', '').strip()
         price = request.POST.get('price', '').strip()
         
-        print(f"restaurant_id: '{restaurant_id}'")
-        print(f"name: '{name}'")
-        print(f"price: '{price}'")
-        
         # Validações específicas
         if not restaurant_id:
             return JsonResponse({'success': False, 'error': 'Restaurante é obrigatório'})
@@ -611,10 +752,11 @@ def dish_edit(request, dish_id):
         dish.description = request.POST.get('description', '').strip()
         
         try:
-            dish.price = float(price)
+            # Decimal como o campo, para o evento ao vivo mandar "13.00" e não 13.0
+            dish.price = Decimal(price.replace(',', '.')).quantize(Decimal('0.01'))
             if dish.price < 0:
                 return JsonResponse({'success': False, 'error': 'Preço não pode ser negativo'})
-        except (ValueError, TypeError):
+        except (InvalidOperation, ValueError, TypeError):
             return JsonResponse({'success': False, 'error': 'Preço inválido'})
         
         # Restaurante
@@ -659,6 +801,27 @@ def dish_delete(request, dish_id):
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+@login_required(login_url='/puceats/login/')
+@require_http_methods(["POST"])
+def dishes_batch(request):
+    """Aplica um lote de criações/edições/remoções de pratos numa transação só"""
+    try:
+        operations = dish_batch.parse(json.loads(request.body))
+    except dish_batch.BatchError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+
+    success, results = dish_batch.apply(operations, request.user)
+    if success:
+        return JsonResponse({'success': True, 'results': results})
+    errors = [result['error'] for result in results if result['error'] != dish_batch.NOT_APPLIED]
+    return JsonResponse({
+        'success': False,
+        'error': errors[0] if len(errors) == 1 else f'{len(errors)} operações inválidas; nada foi gravado',
+        'results': results,
+    }, status=400)
+
 # === CRUD de Restaurantes ===
 
 @require_http_methods(["POST"])